@@ -5,6 +5,7 @@ Generated by 'django-admin startproject' using Django 5.2.4.
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'
@@ -30,6 +31,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
 
     # Local apps
     'expenses',
@@ -37,6 +39,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'expenses.middleware.CompressionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,20 +55,50 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Same lookup as APP_DIRS, but the source is minified once and kept by the cached loader
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'expenses.loaders.FilesystemLoader',
+                    'expenses.loaders.AppDirectoriesLoader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'expenses.context_processors.fragment_cache',
                 # 'expenses.context_processors.global_settings',  # Optional custom context
             ],
         },
     },
+    {
+        # Optional engine for the hot pages, ported templates live in expenses/jinja2/
+        'BACKEND': 'django.template.backends.jinja2.Jinja2',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'environment': 'expenses.jinja_env.environment',
+            'context_processors': [
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'expenses.context_processors.fragment_cache',
+            ],
+        },
+    },
 ]
 
+# URL names of the views rendered through the Jinja2 engine (see expenses.rendering)
+# e.g. DJANGO_JINJA2_VIEWS=home,dashboard,planning_view,label_list
+JINJA2_VIEWS = {name for name in os.getenv('DJANGO_JINJA2_VIEWS', '').split(',') if name}
+
 WSGI_APPLICATION = 'core.wsgi.application'
 
+# Serve home, dashboard and planning_view from expenses.async_views; only worth it
+# under ASGI (e.g. `uvicorn core.asgi:application`), see `manage.py bench_async`
+ASYNC_VIEWS = os.getenv('DJANGO_ASYNC_VIEWS', '') == '1'
+
 # Database
 DATABASES = {
     'default': {
@@ -74,6 +107,50 @@ DATABASES = {
     }
 }
 
+# Cache
+# LocMemCache is per process: point DJANGO_CACHE_BACKEND at a shared cache
+# (file-based, redis, ...) when running several gunicorn workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', 'masroufy'),
+    }
+}
+
+# Live dashboard updates (expenses.live): the in-process broadcaster only reaches
+# clients of the same worker, use 'expenses.live.RedisBroadcaster' with several workers
+LIVE_UPDATES = {
+    'BACKEND': os.getenv('DJANGO_LIVE_BACKEND', 'expenses.live.InProcessBroadcaster'),
+    'LOCATION': os.getenv('DJANGO_LIVE_LOCATION', ''),
+}
+
+# Responses smaller than this are not worth compressing (see expenses.middleware)
+COMPRESSION_MIN_SIZE = 1024
+
+# Part of every ETag, so a deploy never answers 304 with markup from the previous release
+RELEASE = os.getenv('DJANGO_RELEASE', '')
+
+# Template fragments are keyed by version, so they can live for a long time
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Same for computed page data (expenses.caching.stamped_key), warmed up after login
+DATA_CACHE_TIMEOUT = 60 * 60 * 24
+WARMUP_CONCURRENCY = int(os.getenv('DJANGO_WARMUP_CONCURRENCY', '2'))
+# Off in the tests (see expenses/tests/helpers.py): no background threads querying their database
+WARMUP_ENABLED = os.getenv('DJANGO_WARMUP_ENABLED', '1') == '1'
+
+# REST API (expenses/api_urls.py): bearer tokens only, so API requests never load a session
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': ['rest_framework_simplejwt.authentication.JWTAuthentication'],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+}
+
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=15),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -109,5 +186,14 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Hashed names plus precompressed .gz/.br copies (run `manage.py build_assets` then collectstatic)
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'expenses.storage.CompressedManifestStaticFilesStorage'},
+}
+
+# Let Django serve STATIC_ROOT with far-future cache headers when there is no front web server
+SERVE_STATIC = os.getenv('DJANGO_SERVE_STATIC', '') == '1'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -14,13 +14,20 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
+from expenses import staticserve
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/v1/', include('expenses.api_urls')),
     path('', include('expenses.urls')),
     
 
 ]
+
+if settings.SERVE_STATIC:
+    urlpatterns.insert(0, path(f'{settings.STATIC_URL.strip("/")}/<path:path>', staticserve.serve))
 handler404 = 'expenses.views.custom_404_view'
@@ -1,3 +1,206 @@
-from django.contrib import admin
+# admin.py
+# 🛠️ Admin for support staff, usable on tables of millions of rows: no full
+# COUNT(*) per page (EstimatedCountPaginator, show_full_result_count=False),
+# related rows joined in the list query (list_select_related) and picked with
+# autocomplete widgets instead of <select>s of every user or label.
+from django.contrib import admin, messages
+from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 
-# Register your models here.
+from .jobs import enqueue
+from .models import (
+    CustomUser, DataStamp, Expense, Group, Income, Job, Label, LabelStats, PlanSummary, RecurrenceRule, Tombstone,
+)
+from .purge import count_rows
+from .views import save_expense
+
+# Filtered lists count at most this many rows
+COUNT_LIMIT = 10000
+
+
+def estimated_rows(model):
+    """A cheap approximation of the table's row count, None when the database has none."""
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+            row = cursor.fetchone()
+        # -1: never analyzed
+        return row[0] if row and row[0] >= 0 else None
+    if connection.vendor == 'sqlite':
+        # Rows are rarely deleted: the last id is close, and read from the primary key
+        return model._base_manager.aggregate(last=Max('pk'))['last'] or 0
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimated_rows(self.object_list.model)
+            if estimate is not None:
+                return estimate
+        return self.object_list[:COUNT_LIMIT].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+class UserDateAdmin(LargeTableAdmin):
+    """
+    Expenses and incomes: browsed per user (the user column links to the user's
+    rows, search is on the exact username), where the (user, date) index serves
+    the date order and the date hierarchy. Across all users the list is in id
+    order and has no hierarchy, which would scan the table.
+    """
+    date_hierarchy = 'date'
+    search_fields = ['=user__username']
+    autocomplete_fields = ['user']
+    raw_id_fields = ['recurrence']
+
+    def for_one_user(self, request):
+        return 'user__id__exact' in request.GET or bool(request.GET.get('q'))
+
+    def get_ordering(self, request):
+        return ['-date', '-pk'] if self.for_one_user(request) else ['-pk']
+
+    def get_changelist_instance(self, request):
+        changelist = super().get_changelist_instance(request)
+        if not self.for_one_user(request):
+            changelist.date_hierarchy = None
+        return changelist
+
+    @admin.display(description='user', ordering='user__username')
+    def user_rows(self, obj):
+        return format_html('<a href="?user__id__exact={}">{}</a>', obj.user_id, obj.user.username)
+
+
+# 👤 Users
+@admin.register(CustomUser)
+class CustomUserAdmin(UserAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    fieldsets = UserAdmin.fieldsets + (
+        ('Profile', {'fields': ('phone_number', 'profession', 'city', 'has_wife', 'kids', 'expected_monthly_income')}),
+    )
+
+    # user.delete() would load (and signal) every row of the account: the
+    # account is closed and expenses.purge deletes it in the background
+    def get_deleted_objects(self, objs, request):
+        model_count = {}
+        for user in objs:
+            for table, count in count_rows(user.pk).items():
+                model_count[table] = model_count.get(table, 0) + count
+        return [str(user) for user in objs], model_count, set(), []
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, CustomUser.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            user.is_active = False
+            user.save(update_fields=['is_active'])
+            enqueue('purge_account', user_id=user.pk)
+        self.message_user(request, "Accounts closed; their data is deleted by `manage.py run_workers`.", messages.WARNING)
+
+
+# 🗂️ Groups and labels (soft-deleted rows included)
+@admin.register(Group)
+class GroupAdmin(LargeTableAdmin):
+    list_display = ['name', 'user', 'order', 'code', 'protected', 'is_deleted']
+    list_filter = ['is_deleted', 'protected']
+    list_select_related = ['user']
+    search_fields = ['name', '=user__username']
+    autocomplete_fields = ['user']
+
+
+@admin.register(Label)
+class LabelAdmin(LargeTableAdmin):
+    list_display = ['name', 'group', 'user', 'expected_monthly', 'order', 'is_deleted']
+    list_filter = ['is_deleted']
+    list_select_related = ['user', 'group']
+    search_fields = ['name', '=user__username']
+    autocomplete_fields = ['user', 'group']
+
+
+# 💸 Expenses and incomes
+@admin.register(Expense)
+class ExpenseAdmin(UserDateAdmin):
+    list_display = ['date', 'label', 'amount', 'note', 'is_flagged', 'user_rows']
+    list_filter = ['is_flagged']
+    list_select_related = ['user', 'label']
+    autocomplete_fields = ['user', 'label']
+
+    # Like the expense views: keep the label statistics in step
+    def save_model(self, request, obj, form, change):
+        previous = (form.initial['label'], form.initial['amount']) if change else None
+        save_expense(obj, previous)
+
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Expense.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            LabelStats.remove_expenses(list(queryset))
+            queryset.delete()
+
+
+@admin.register(Income)
+class IncomeAdmin(UserDateAdmin):
+    list_display = ['date', 'amount', 'user_rows']
+    list_select_related = ['user']
+
+
+@admin.register(RecurrenceRule)
+class RecurrenceRuleAdmin(LargeTableAdmin):
+    list_display = ['__str__', 'user', 'next_date', 'end_date', 'is_active']
+    list_filter = ['is_active', 'interval_months']
+    list_select_related = ['user', 'label']
+    search_fields = ['=user__username']
+    autocomplete_fields = ['user', 'label']
+
+
+# ⚙️ Derived and bookkeeping rows
+@admin.register(LabelStats)
+class LabelStatsAdmin(LargeTableAdmin):
+    list_display = ['label', 'count', 'mean', 'recent_max']
+    list_select_related = ['label']
+    autocomplete_fields = ['label']
+
+
+@admin.register(PlanSummary)
+class PlanSummaryAdmin(LargeTableAdmin):
+    list_display = ['user', 'monthly_expected', 'annual_total', 'annual_monthly', 'updated_at']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
+
+
+@admin.register(DataStamp)
+class DataStampAdmin(LargeTableAdmin):
+    list_display = ['user', 'expenses_at', 'incomes_at', 'groups_at', 'labels_at']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
+
+
+@admin.register(Tombstone)
+class TombstoneAdmin(LargeTableAdmin):
+    list_display = ['kind', 'object_id', 'user', 'deleted_at']
+    list_filter = ['kind']
+    list_select_related = ['user']
+    search_fields = ['=user__username']
+    autocomplete_fields = ['user']
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ['name', 'user', 'status', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'name']
+    list_select_related = ['user']
+    autocomplete_fields = ['user']
+    readonly_fields = ['error', 'result', 'created_at', 'started_at', 'finished_at']
@@ -0,0 +1,21 @@
+# api_urls.py
+# Mounted under /api/v1/: obtain a token pair with POST token/ (username, password),
+# then send "Authorization: Bearer <access>"; POST token/refresh/ renews the access token.
+from django.urls import path
+from rest_framework.routers import DefaultRouter
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+
+from . import api_views
+
+router = DefaultRouter()
+router.register('incomes', api_views.IncomeViewSet, basename='api-income')
+router.register('expenses', api_views.ExpenseViewSet, basename='api-expense')
+router.register('groups', api_views.GroupViewSet, basename='api-group')
+router.register('labels', api_views.LabelViewSet, basename='api-label')
+
+urlpatterns = [
+    path('token/', TokenObtainPairView.as_view(), name='api_token'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='api_token_refresh'),
+    path('sync/', api_views.SyncView.as_view(), name='api_sync'),
+    *router.urls,
+]
@@ -0,0 +1,186 @@
+# api_views.py
+# 🔌 REST API (v1) over incomes, expenses, groups and labels, authenticated with
+# JWT (see api_urls.py). Every viewset is scoped with UserScopedManager.for_user;
+# `<resource>/bulk/` creates (POST a list), updates (PATCH a list of items with
+# their id) or deletes (DELETE {"ids": [...]}) up to BULK_MAX rows in one
+# transaction.
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import sync
+from .models import Expense, Group, Income, Label, LabelStats
+from .serializers import ExpenseSerializer, GroupSerializer, IncomeSerializer, LabelSerializer
+from .signals import bulk_delete
+
+BULK_MAX = 500
+
+
+class ApiCursorPagination(CursorPagination):
+    # Cursors stay fast on deep pages and stable while rows are added
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = BULK_MAX
+
+    def get_ordering(self, request, queryset, view):
+        return view.ordering
+
+
+class UserScopedViewSet(viewsets.ModelViewSet):
+    model = None
+    pagination_class = ApiCursorPagination
+
+    def get_queryset(self):
+        return self.model.objects.for_user(self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    def bulk_ids(self, values):
+        if not isinstance(values, list) or not 0 < len(values) <= BULK_MAX:
+            raise ValidationError(f"Expected a list of 1 to {BULK_MAX} items.")
+        if not all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+            raise ValidationError({'id': "Every item needs an integer id."})
+        rows = self.get_queryset().in_bulk(values)
+        missing = [value for value in values if value not in rows]
+        if missing:
+            raise ValidationError({'id': [f"Not found: {missing}"]})
+        return rows
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        try:
+            with transaction.atomic():
+                if request.method == 'DELETE':
+                    ids = request.data.get('ids') if isinstance(request.data, dict) else None
+                    self.perform_bulk_destroy(list(self.bulk_ids(ids).values()))
+                    return Response(status=status.HTTP_204_NO_CONTENT)
+
+                if not isinstance(request.data, list) or not 0 < len(request.data) <= BULK_MAX:
+                    raise ValidationError(f"Expected a list of 1 to {BULK_MAX} items.")
+                if request.method == 'POST':
+                    serializer = self.get_serializer(data=request.data, many=True)
+                    serializer.is_valid(raise_exception=True)
+                    serializer.save(user=request.user)
+                    return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+                ids = [item.get('id') if isinstance(item, dict) else None for item in request.data]
+                serializer = self.get_serializer(self.bulk_ids(ids), data=request.data, many=True, partial=True)
+                serializer.is_valid(raise_exception=True)
+                serializer.save()
+                return Response(serializer.data)
+        except IntegrityError:
+            # e.g. the same label name twice in one request
+            raise ValidationError("Conflicting rows in the request.")
+
+    def deletable(self, row):
+        return True
+
+    def perform_bulk_destroy(self, rows):
+        for row in rows:
+            self.perform_destroy(row)
+
+
+class IncomeViewSet(UserScopedViewSet):
+    model = Income
+    serializer_class = IncomeSerializer
+    ordering = ('-date', '-id')
+
+    def perform_bulk_destroy(self, rows):
+        bulk_delete(incomes=rows)
+
+
+class ExpenseViewSet(UserScopedViewSet):
+    model = Expense
+    serializer_class = ExpenseSerializer
+    ordering = ('-date', '-id')
+
+    def perform_destroy(self, instance):
+        self.perform_bulk_destroy([instance])
+
+    def perform_bulk_destroy(self, rows):
+        with transaction.atomic():
+            LabelStats.remove_expenses(rows)
+            bulk_delete(expenses=rows)
+
+
+class SoftDeleteViewSet(UserScopedViewSet):
+    """Groups and labels are only marked deleted (they can be restored from the site), like the views do."""
+    ordering = ('order', 'id')
+
+    def get_queryset(self):
+        return super().get_queryset().alive()
+
+    def perform_destroy(self, instance):
+        self.perform_bulk_destroy([instance])
+
+    def perform_bulk_destroy(self, rows):
+        with transaction.atomic():
+            for row in rows:
+                row.is_deleted = True
+                row.save()
+            self.renumber(rows)
+
+    def renumber(self, rows):
+        """Close the gaps the deleted rows leave in `order`; nothing to do for a model without one."""
+
+
+class GroupViewSet(SoftDeleteViewSet):
+    model = Group
+    serializer_class = GroupSerializer
+
+    def deletable(self, row):
+        return not row.protected
+
+    def perform_bulk_destroy(self, rows):
+        if not all(map(self.deletable, rows)):
+            raise PermissionDenied("⚠️ لا يمكن حذف هذه المجموعة لأنها محمية.")
+        super().perform_bulk_destroy(rows)
+
+    def renumber(self, rows):
+        groups = list(self.get_queryset().order_by('order'))
+        now = timezone.now()
+        for i, group in enumerate(groups, start=1):
+            group.order, group.updated_at = i, now
+        Group.objects.bulk_update(groups, ['order', 'updated_at'])
+
+
+class LabelViewSet(SoftDeleteViewSet):
+    model = Label
+    serializer_class = LabelSerializer
+
+    def renumber(self, rows):
+        labels = list(self.get_queryset().filter(group__in={label.group_id for label in rows}).order_by('group', 'order'))
+        position, now = {}, timezone.now()
+        for label in labels:
+            label.order = position[label.group_id] = position.get(label.group_id, 0) + 1
+            label.updated_at = now
+        Label.objects.bulk_update(labels, ['order', 'updated_at'])
+
+
+# 🔄 Delta sync (see sync.py); groups first, so a push deletes or renames them before their labels are checked
+SYNC_VIEWSETS = {'groups': GroupViewSet, 'labels': LabelViewSet, 'incomes': IncomeViewSet, 'expenses': ExpenseViewSet}
+
+
+class SyncView(APIView):
+    def viewsets(self, request):
+        return {kind: viewset(request=request, format_kwarg=None) for kind, viewset in SYNC_VIEWSETS.items()}
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        try:
+            since = sync.read_token(since) if since else None
+        except (ValueError, OverflowError, OSError):
+            raise ValidationError({'since': "Invalid sync token."})
+        return Response(sync.pull(self.viewsets(request), since))
+
+    def post(self, request):
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not 0 < len(operations) <= BULK_MAX:
+            raise ValidationError({'operations': f"Expected a list of 1 to {BULK_MAX} items."})
+        return Response({'results': sync.push(self.viewsets(request), operations)})
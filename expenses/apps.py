@@ -5,5 +5,6 @@ class ExpensesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'expenses'
 
-# def ready(self):
-#     import expenses.signals
+    def ready(self):
+        import expenses.signals  # noqa: F401
+        import expenses.tasks  # noqa: F401
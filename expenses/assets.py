@@ -0,0 +1,51 @@
+# assets.py
+from functools import lru_cache
+
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+# 📦 Third-party files vendored by `manage.py build_assets` into static/vendor/
+VENDOR = {
+    'bootstrap.rtl.min.css': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.rtl.min.css',
+    'bootstrap.bundle.min.js': 'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'chart.umd.min.js': 'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js',
+    'tajawal.css': 'https://fonts.googleapis.com/css2?family=Tajawal:wght@400;700&display=swap',
+}
+
+# Bundles and their parts, in load order: 'vendor/<name>' entries come from VENDOR,
+# everything else is one of our own static files
+BUNDLES = {
+    'base.css': ['vendor/tajawal.css', 'vendor/bootstrap.rtl.min.css', 'css/styles.css'],
+    'base.js': ['vendor/bootstrap.bundle.min.js', 'js/fragments.js'],
+    # Only the dashboards and the simulator draw charts
+    'charts.js': ['vendor/chart.umd.min.js', 'js/dashboard.js'],
+    'simulator.js': ['vendor/chart.umd.min.js', 'js/simulator.js'],
+}
+
+
+def part_url(part):
+    if part.startswith('vendor/') and not finders.find(part):
+        return VENDOR[part.removeprefix('vendor/')]
+    return static(part)
+
+
+@lru_cache
+def bundle_is_built(bundle):
+    return finders.find(f'bundles/{bundle}') is not None
+
+
+def bundle_urls(bundle):
+    """The built bundle when present, otherwise its parts (from the CDN until vendored)."""
+    if bundle_is_built(bundle):
+        return [static(f'bundles/{bundle}')]
+    return [part_url(part) for part in BUNDLES[bundle]]
+
+
+def asset_tags(bundle, defer=True):
+    urls = [(url,) for url in bundle_urls(bundle)]
+    if bundle.endswith('.css'):
+        return format_html_join('\n', '<link rel="stylesheet" href="{}">', urls)
+    if defer:
+        return format_html_join('\n', '<script src="{}" defer></script>', urls)
+    return format_html_join('\n', '<script src="{}"></script>', urls)
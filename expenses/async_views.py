@@ -0,0 +1,84 @@
+# async_views.py
+# Async counterparts of the read-heavy pages, used when settings.ASYNC_VIEWS is on
+# (serve core.asgi:application). Queries that do not depend on each other are
+# awaited together; contexts and templates are shared with the sync views.
+import asyncio
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.db.models import Sum
+
+from .caching import aget_or_compute
+from .conditional import user_data_condition
+from .dashboard import acached_chart_data, alist, yearly_tables
+from .forecast import label_forecasts
+from .live import live_url
+from .models import DataStamp, Group, Label, PlanSummary
+from .rendering import arender_view
+from .views import (
+    home_context, home_filters, home_querysets, home_totals_key,
+    planning_context, planning_key, planning_querysets,
+)
+
+
+async def total(queryset):
+    return (await queryset.aaggregate(total=Sum('amount')))['total'] or 0
+
+
+@login_required
+@user_data_condition('expenses', 'incomes', 'groups', 'labels',
+                     vary=lambda request: [request.GET.urlencode()], daily=True)
+async def home(request):
+    user = request.user
+    filters = home_filters(request)
+    expenses, incomes = home_querysets(user, *filters)
+
+    async def totals():
+        return await asyncio.gather(total(expenses), total(incomes))
+
+    (total_expense, total_income), expense_rows, groups, labels, forecasts = await asyncio.gather(
+        aget_or_compute(home_totals_key(user, request._data_stamp, filters), totals),
+        alist(expenses),
+        alist(Group.objects.for_user(user).alive()),
+        alist(Label.objects.for_user(user).alive()),
+        sync_to_async(label_forecasts)(user, request._data_stamp),
+    )
+    context = home_context(filters, total_expense, total_income, expense_rows, groups, labels)
+    context['forecasts'] = forecasts
+    return await arender_view(request, 'home.html', context, fragment_template='partials/home_results.html')
+
+
+@login_required
+@user_data_condition('groups', 'labels', 'expenses', vary=lambda request: [request.user.expected_monthly_income],
+                     daily=True)
+async def planning_view(request):
+    user = request.user
+
+    async def compute():
+        summary, groups, annual_labels = await asyncio.gather(
+            PlanSummary.afor_user(user), *map(alist, planning_querysets(user)),
+        )
+        return planning_context(user.expected_monthly_income, summary, groups, annual_labels)
+
+    context, forecasts = await asyncio.gather(
+        aget_or_compute(planning_key(user, request._data_stamp), compute),
+        sync_to_async(label_forecasts)(user, request._data_stamp),
+    )
+    return await arender_view(request, 'planning_page.html', {**context, 'forecasts': forecasts})
+
+
+@login_required
+async def yearly_dashboard_view(request):
+    user = await request.auser()
+    year = int(request.GET.get('year', date.today().year))
+
+    chart_data = await acached_chart_data(user, await DataStamp.afor_user(user), year)
+    context = {
+        'year': year,
+        'year_range': range(2020, 2031),  # 2031 is exclusive
+        'chart_data': chart_data,
+        'live_url': live_url(request),
+        **yearly_tables(chart_data),
+    }
+    return await arender_view(request, 'yearly_dashboard.html', context)
@@ -0,0 +1,42 @@
+# caching.py
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+CATEGORIES_VERSION_KEY = 'categories_version:{user_id}'
+
+
+def get_categories_version(user_id):
+    """Current version of a user's groups/labels, used to key cached fragments."""
+    key = CATEGORIES_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # A fresh timestamp never collides with fragments cached under an evicted version
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_categories_version(user_id):
+    cache.set(CATEGORIES_VERSION_KEY.format(user_id=user_id), time.time_ns(), None)
+
+
+# 🔥 Computed page data, keyed on the DataStamp fields it depends on: any write
+# moves the stamp and with it the key, so a cached value is always current
+def stamped_key(prefix, user_id, stamp, sources, *extra):
+    moments = [getattr(stamp, f'{source}_at').timestamp() for source in sources]
+    return ':'.join(map(str, [prefix, user_id, *moments, *extra]))
+
+
+def get_or_compute(key, compute):
+    return cache.get_or_set(key, compute, settings.DATA_CACHE_TIMEOUT)
+
+
+async def aget_or_compute(key, compute):
+    """Async get_or_compute; `compute` is a coroutine function."""
+    value = await cache.aget(key)
+    if value is None:
+        value = await compute()
+        await cache.aset(key, value, settings.DATA_CACHE_TIMEOUT)
+    return value
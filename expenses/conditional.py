@@ -0,0 +1,86 @@
+# conditional.py
+import hashlib
+from datetime import datetime, time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.utils import timezone
+from django.utils.cache import add_never_cache_headers
+from django.views.decorators.http import condition
+
+from .models import DataStamp
+from .rendering import FRAGMENT_HEADER
+
+
+def get_data_stamp(request):
+    # etag_func and last_modified_func share a single lookup per request
+    if not hasattr(request, '_data_stamp'):
+        request._data_stamp = DataStamp.for_user(request.user)
+    return request._data_stamp
+
+
+def has_pending_messages(request):
+    # len() does not mark the messages as shown: the page still displays them
+    return len(messages.get_messages(request)) > 0
+
+
+def user_data_condition(*sources, vary=None, daily=False):
+    """
+    Answer If-None-Match / If-Modified-Since with 304 before the view runs.
+
+    sources are the DataStamp fields the page depends on ('expenses', 'incomes',
+    'groups', 'labels'); vary(request) returns extra values the page output
+    depends on, and daily pages also change at midnight. Works on async views
+    too: the user and the stamp are loaded up front, so the checks stay sync.
+
+    A page carrying flash messages is not in the validators: while messages are
+    pending the view always runs and its response is never cached.
+    """
+    def last_modified(request, *args, **kwargs):
+        stamp = get_data_stamp(request)
+        moments = [getattr(stamp, f'{source}_at') for source in sources]
+        if daily:
+            moments.append(timezone.make_aware(datetime.combine(timezone.localdate(), time.min)))
+        return max(moments)
+
+    def etag(request, *args, **kwargs):
+        stamp = get_data_stamp(request)
+        parts = [
+            settings.RELEASE, request.resolver_match.view_name, request.user.pk,
+            request.headers.get(FRAGMENT_HEADER, ''), args, sorted(kwargs.items()),
+            *(getattr(stamp, f'{source}_at').isoformat() for source in sources),
+        ]
+        if daily:
+            parts.append(timezone.localdate().isoformat())
+        if vary:
+            parts.extend(vary(request))
+        return hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+
+    def decorator(view):
+        conditional_view = condition(etag_func=etag, last_modified_func=last_modified)(view)
+        if not iscoroutinefunction(view):
+            @wraps(view)
+            def inner(request, *args, **kwargs):
+                if has_pending_messages(request):
+                    response = view(request, *args, **kwargs)
+                    add_never_cache_headers(response)
+                    return response
+                return conditional_view(request, *args, **kwargs)
+
+            return inner
+
+        @wraps(view)
+        async def ainner(request, *args, **kwargs):
+            request.user = await request.auser()
+            request._data_stamp = await DataStamp.afor_user(request.user)
+            if await sync_to_async(has_pending_messages)(request):
+                response = await view(request, *args, **kwargs)
+                add_never_cache_headers(response)
+                return response
+            return await conditional_view(request, *args, **kwargs)
+
+        return ainner
+
+    return decorator
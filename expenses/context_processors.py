@@ -0,0 +1,17 @@
+# context_processors.py
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .caching import get_categories_version
+
+
+def fragment_cache(request):
+    user = getattr(request, 'user', None)
+    if not (user and user.is_authenticated):
+        return {'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT}
+
+    return {
+        'fragment_cache_timeout': settings.FRAGMENT_CACHE_TIMEOUT,
+        # Only hits the cache when a template actually keys a fragment on it
+        'categories_version': SimpleLazyObject(lambda: get_categories_version(user.pk)),
+    }
@@ -0,0 +1,163 @@
+# dashboard.py
+import asyncio
+from datetime import date
+
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth
+
+from .caching import aget_or_compute, get_or_compute, stamped_key
+from .models import Expense, Income, Label
+
+CHART_SOURCES = ('expenses', 'incomes', 'groups', 'labels')
+MONTHLY_GROUP_KINDS = {'monthly_fixed': 'fixed', 'monthly_variable': 'variable'}
+INSTALLMENT_LABEL = 'القسط الشهري للنفقات السنوية'
+SAVINGS_KEYWORD = 'ادخار'
+
+
+async def alist(queryset):
+    return [obj async for obj in queryset]
+
+
+def number(value):
+    """Decimal → int/float, so the JSON payload stays short ("12" rather than "12.00")."""
+    value = value or 0
+    return int(value) if value == int(value) else float(value)
+
+
+def label_kind(label):
+    """'fixed', 'variable' or 'installment' for the labels counted as monthly spending, '' otherwise."""
+    if label.name == INSTALLMENT_LABEL:
+        return 'installment'
+    return MONTHLY_GROUP_KINDS.get(label.group.code, '')
+
+
+def yearly_querysets(user, year):
+    spent_rows = (
+        Expense.objects.filter(user=user, date__year=year)
+        .annotate(month=ExtractMonth('date'))
+        .values('label_id', 'month')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    income_rows = (
+        Income.objects.filter(user=user, date__year=year)
+        .annotate(month=ExtractMonth('date'))
+        .values('month')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    labels = Label.objects.filter(user=user).select_related('group').order_by('group__order', 'order')
+    return spent_rows, income_rows, labels
+
+
+def yearly_chart_data(user, year):
+    return build_chart_data(year, *map(list, yearly_querysets(user, year)))
+
+
+async def ayearly_chart_data(user, year):
+    """Async variant: the three independent queries are awaited together."""
+    results = await asyncio.gather(*(alist(qs) for qs in yearly_querysets(user, year)))
+    return build_chart_data(year, *results)
+
+
+def cached_chart_data(user, stamp, year):
+    key = stamped_key('yearly_chart_data', user.pk, stamp, CHART_SOURCES, year)
+    return get_or_compute(key, lambda: yearly_chart_data(user, year))
+
+
+async def acached_chart_data(user, stamp, year):
+    key = stamped_key('yearly_chart_data', user.pk, stamp, CHART_SOURCES, year)
+    return await aget_or_compute(key, lambda: ayearly_chart_data(user, year))
+
+
+def build_chart_data(year, spent_rows, income_rows, labels):
+    """
+    Everything the yearly dashboard draws, normalized: every label appears once in
+    `labels` and the other series refer to it by index. `spent[i][m]` is the amount
+    spent on label i in month m; the client derives each chart from that matrix, and
+    can patch a single cell when an expense changes.
+    """
+    # Active labels, plus deleted ones that still carry expenses this year
+    used_ids = {row['label_id'] for row in spent_rows}
+    labels = [label for label in labels if not label.is_deleted or label.id in used_ids]
+    groups = []
+    group_index = {}
+    for label in labels:
+        if not label.group.is_deleted and label.group_id not in group_index:
+            group_index[label.group_id] = len(groups)
+            groups.append(label.group)
+
+    label_index = {label.id: i for i, label in enumerate(labels)}
+    spent = [[0] * 12 for _ in labels]
+    for row in spent_rows:
+        spent[label_index[row['label_id']]][row['month'] - 1] = number(row['total'])
+
+    income = [0] * 12
+    for row in income_rows:
+        income[row['month'] - 1] = number(row['total'])
+
+    savings = next(
+        (i for i, label in enumerate(labels) if not label.is_deleted and SAVINGS_KEYWORD in label.name),
+        None,
+    )
+    return {
+        'year': year,
+        'months': [date(year, month, 1).strftime('%B') for month in range(1, 13)],
+        'labels': {
+            'id': [label.id for label in labels],
+            'name': [label.name for label in labels],
+            'group': [group_index.get(label.group_id) for label in labels],
+            'expected': [number(label.expected_monthly * 12) for label in labels],
+            'active': [int(not label.is_deleted) for label in labels],
+            'kind': [label_kind(label) for label in labels],
+        },
+        'groups': {
+            'id': [group.id for group in groups],
+            'name': [group.name for group in groups],
+        },
+        'spent': spent,
+        'income': income,
+        'savings': savings,
+    }
+
+
+def yearly_tables(data):
+    """Server-rendered monthly breakdown and per-label comparison, from the same payload."""
+    labels = data['labels']
+
+    def monthly_total(kind, m):
+        return round(sum(row[m] for row, k in zip(data['spent'], labels['kind']) if k == kind), 2)
+
+    monthly_data = []
+    for m, name in enumerate(data['months']):
+        fixed = monthly_total('fixed', m)
+        variable = monthly_total('variable', m)
+        installment = monthly_total('installment', m)
+        monthly_data.append({
+            'name': name,
+            'income': data['income'][m],
+            'fixed': fixed,
+            'variable': variable,
+            'installment': installment,
+            'balance': round(data['income'][m] - (fixed + variable + installment), 2),
+        })
+
+    category_totals = {}
+    for i, name in enumerate(labels['name']):
+        if labels['active'][i]:
+            actual = round(sum(data['spent'][i]), 2)
+            category_totals[name] = {
+                'actual': actual,
+                'expected': labels['expected'][i],
+                'diff': actual - labels['expected'][i],
+            }
+
+    total_income = round(sum(data['income']), 2)
+    total_expense = round(sum(map(sum, data['spent'])), 2)
+    return {
+        'monthly_data': monthly_data,
+        'category_totals': category_totals,
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'balance': round(total_income - total_expense, 2),
+    }
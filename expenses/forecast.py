@@ -0,0 +1,201 @@
+# forecast.py
+# 🔮 Month-end and year-end spend per label. The history (this year's spend per
+# label and month, and seasonal averages from the FORECAST_YEARS before it) is
+# loaded in one grouped query and cached per user; expense writes patch the
+# cached arrays on commit (touch_expenses), so serving a forecast is a few
+# vectorized NumPy operations and no query. The history records the
+# DataStamp.expenses_at it is exact for, and is reloaded when that is stale.
+import calendar
+from datetime import date
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth, ExtractYear
+from django.utils import timezone
+
+from .models import ANNUAL_GROUP_CODE, DataStamp, Expense, Label
+
+FORECAST_KEY = 'forecast:{user_id}'
+FORECAST_YEARS = 3
+# A patch holds the per-user lock this long at most (a crashed worker's lock expires)
+PATCH_LOCK_SECONDS = 10
+# Paid once (rent, subscriptions, annual bills): the run-rate of what is already paid means nothing
+LUMPY_GROUP_CODES = {'monthly_fixed', ANNUAL_GROUP_CODE}
+
+
+def load_history(user, today):
+    """Arrays the forecasts are computed from, valid for `today`."""
+    labels = list(
+        Label.objects.for_user(user).alive().select_related('group').order_by('group__order', 'order')
+    )
+    rows = (
+        Expense.objects.filter(user=user, date__year__gte=today.year - FORECAST_YEARS, date__year__lte=today.year)
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .values_list('label_id', 'year', 'month')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+
+    index = {label.id: i for i, label in enumerate(labels)}
+    current = np.zeros((len(labels), 12))
+    prior = np.zeros((len(labels), 12))
+    recorded = np.zeros((FORECAST_YEARS, 12), dtype=bool)
+    for label_id, year, month, total in rows:
+        if year == today.year:
+            if label_id in index:
+                current[index[label_id], month - 1] = total
+            continue
+        # Any spending that month (deleted labels included) means the user was recording it
+        recorded[today.year - year - 1, month - 1] = True
+        if label_id in index:
+            prior[index[label_id], month - 1] += total
+
+    # Per month, annual labels included
+    expected = np.array([label.planned_monthly for label in labels], dtype=float)
+    years = recorded.sum(axis=0)
+    # Average of the same month in the prior years; the planned amount where there is no history
+    seasonal = np.where(years > 0, prior / np.maximum(years, 1), expected[:, None])
+
+    return {
+        'day': today,
+        'label_ids': [label.id for label in labels],
+        'names': [label.name for label in labels],
+        'groups': [label.group.name for label in labels],
+        'expected': expected,
+        'lumpy': np.array([label.group.code in LUMPY_GROUP_CODES for label in labels], dtype=bool),
+        'current': current,
+        'seasonal': seasonal,
+    }
+
+
+def cached_history(user, stamp, today):
+    key = FORECAST_KEY.format(user_id=user.pk)
+    history = cache.get(key)
+    # Reloaded every day (a new year starts, seasonal months roll), when labels change, and when
+    # expenses changed without patching this copy (another worker's cache, a write it missed)
+    if (history is None or history['day'] != today or history['labels_at'] != stamp.labels_at
+            or history['expenses_at'] != stamp.expenses_at):
+        history = load_history(user, today)
+        history['labels_at'], history['expenses_at'] = stamp.labels_at, stamp.expenses_at
+        # An expense committed while loading may or may not be in the arrays: only cache
+        # them when the stamp did not move, so the patches add each delta exactly once
+        if DataStamp.objects.filter(user=user).values_list('expenses_at', flat=True).first() == stamp.expenses_at:
+            cache.set(key, history, settings.DATA_CACHE_TIMEOUT)
+    return history
+
+
+class PatchHistory:
+    """
+    on_commit callback folding a transaction's expense deltas (see live.expense_deltas)
+    into the user's cached history. The history is only patched if it is exact for the
+    expenses_at from before the transaction, and then moves to the one it wrote.
+    """
+
+    def __init__(self, user_id, since):
+        self.user_id = user_id
+        self.since = self.until = since
+        self.events = []
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        key = FORECAST_KEY.format(user_id=self.user_id)
+        lock = f'{key}:patching'
+        if not cache.add(lock, 1, PATCH_LOCK_SECONDS):
+            # Another patch is reading the history: drop it rather than lose either delta
+            cache.delete(key)
+            return
+        try:
+            history = cache.get(key)
+            if history is None:
+                return
+            if history['expenses_at'] != self.since or not apply_expense_deltas(history, self.events):
+                cache.delete(key)
+                return
+            history['expenses_at'] = self.until
+            cache.set(key, history, settings.DATA_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock)
+
+    @classmethod
+    def pending(cls):
+        """{user_id: callback} of the current transaction."""
+        callbacks = transaction.get_connection().run_on_commit
+        return {func.user_id: func for _, func, *_ in callbacks if isinstance(func, cls) and not func.done}
+
+
+def touch_expenses(events):
+    """
+    Move DataStamp.expenses_at of the users in `events` ({user_id: expense deltas},
+    possibly empty) to now, and patch their cached histories with the deltas on
+    commit. Every expense write goes through here, not DataStamp.touch().
+    """
+    pending = PatchHistory.pending()
+    # The stamps from before the transaction: one query, for its first write only
+    new = DataStamp.objects.filter(user_id__in=set(events) - set(pending)).values_list('user_id', 'expenses_at')
+    new = {user_id: PatchHistory(user_id, since) for user_id, since in new}
+    now = timezone.now()
+    DataStamp.objects.filter(user_id__in=events).update(expenses_at=now)
+    for user_id, patch in {**pending, **new}.items():
+        if user_id in events:
+            patch.events += events[user_id]
+            patch.until = now
+    # Outside a transaction these run right away, after the UPDATE
+    for patch in new.values():
+        transaction.on_commit(patch)
+
+
+def apply_expense_deltas(history, events):
+    """Patch the history's arrays in place; False when that is not possible."""
+    index = {label_id: i for i, label_id in enumerate(history['label_ids'])}
+    for event in events:
+        if event['year'] != history['day'].year:
+            # A past year moves the seasonal averages: reload rather than patch
+            return False
+        if event['label'] in index:
+            history['current'][index[event['label']], event['month'] - 1] += event['amount']
+    return True
+
+
+def project(history, today):
+    """Month-end and year-end spend per label, as arrays."""
+    month = today.month - 1
+    days = calendar.monthrange(today.year, today.month)[1]
+    elapsed = today.day / days
+
+    spent = history['current'][:, month]
+    typical = history['seasonal'][:, month]
+    # Daily rate: this month's run-rate, trusted more as the month goes on, blended with the usual month
+    rate = elapsed * spent / today.day + (1 - elapsed) * typical / days
+    month_end = np.where(history['lumpy'], np.maximum(spent, typical), spent + rate * (days - today.day))
+
+    year_end = history['current'][:, :month].sum(axis=1) + month_end + history['seasonal'][:, month + 1:].sum(axis=1)
+    return spent, month_end, year_end
+
+
+def label_forecasts(user, stamp, today=None):
+    """Rows for partials/label_forecasts.html, only for labels with something spent or planned."""
+    today = today or date.today()
+    history = cached_history(user, stamp, today)
+    spent, month_end, year_end = (values.round().astype(int).tolist() for values in project(history, today))
+    expected = history['expected'].round().astype(int).tolist()
+    expected_year = (history['expected'] * 12).round().astype(int).tolist()
+
+    rows = []
+    for i, name in enumerate(history['names']):
+        if not (month_end[i] or year_end[i] or expected[i]):
+            continue
+        rows.append({
+            'label': name,
+            'group': history['groups'][i],
+            'spent': spent[i],
+            'month_end': month_end[i],
+            'expected': expected[i],
+            'year_end': year_end[i],
+            'expected_year': expected_year[i],
+            'over': bool(expected[i]) and month_end[i] > expected[i],
+        })
+    return rows
@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from .models import CustomUser, Income, Expense, Group, Label
+from .models import CustomUser, Income, Expense, Group, Label, RecurrenceRule
+from .simulator import HORIZONS
 
 # 🔐 User Forms
 class CustomUserCreationForm(UserCreationForm):
@@ -85,14 +86,14 @@ class LabelForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
-        self.fields['group'].queryset = Group.objects.filter(user=self.user, is_deleted=False)
+        self.fields['group'].queryset = Group.objects.for_user(self.user).alive()
 
     def clean(self):
         cleaned_data = super().clean()
         name = cleaned_data.get('name')
         group = cleaned_data.get('group')
         if self.user and name and group:
-            qs = Label.objects.filter(user=self.user, group=group, name__iexact=name, is_deleted=False)
+            qs = Label.objects.for_user(self.user).alive().filter(group=group, name__iexact=name)
             if self.instance.pk:
                 qs = qs.exclude(pk=self.instance.pk)
             if qs.exists():
@@ -105,17 +106,19 @@ class ExpenseForm(forms.ModelForm):
 
     class Meta:
         model = Expense
-        fields = ['group', 'label', 'amount', 'date']
+        fields = ['group', 'label', 'amount', 'date', 'note']
         labels = {
             'label': ' اسم المصروف',
             'amount': 'المبلغ',
             'date': 'التاريخ',
+            'note': 'ملاحظة',
         }
         widgets = {
             'group': forms.Select(attrs={'class': 'form-control', 'placeholder': 'اسم المجموعة '}),
             'amount': forms.NumberInput(attrs=  {'class': 'form-control',
                 'placeholder':'المبلغ'}),
                 'date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
+            'note': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'ملاحظة (اختياري)'}),
         }
 
     def __init__(self, *args, **kwargs):
@@ -126,24 +129,24 @@ class ExpenseForm(forms.ModelForm):
         self.fields['group'].widget.attrs.update({'class': 'form-control'})
         self.fields['label'].widget.attrs.update({'class': 'form-control'})
         
-        self.fields['group'].queryset = Group.objects.filter(user=user, is_deleted=False)
+        self.fields['group'].queryset = Group.objects.for_user(user).alive()
         self.fields['label'].queryset = Label.objects.none()
 
         if 'group' in self.data:
             try:
                 group_id = int(self.data.get('group'))
-                self.fields['label'].queryset = Label.objects.filter(group_id=group_id, user=user, is_deleted=False)
+                self.fields['label'].queryset = Label.objects.for_user(user).alive().filter(group_id=group_id)
             except (ValueError, TypeError):
                 pass
         elif self.instance.pk:
-            self.fields['label'].queryset = Label.objects.filter(group=self.instance.label.group, user=user, is_deleted=False)
+            self.fields['label'].queryset = Label.objects.for_user(user).alive().filter(group=self.instance.label.group)
             self.fields['group'].initial = self.instance.label.group
 
 # add_expense_view add multiple expenses to group
 class LabelExpenseForm(forms.Form):
     label_id = forms.IntegerField(widget=forms.HiddenInput)
     label_name = forms.CharField(disabled=True, required=False)
-    amount = forms.DecimalField(label='المبلغ', required=False, min_value=0)
+    amount = forms.IntegerField(label='المبلغ', required=False, min_value=0)
 from django.forms import formset_factory
 
 LabelExpenseFormSet = formset_factory(LabelExpenseForm, extra=0)
@@ -248,7 +251,7 @@ class AnnualLabelAddForm(forms.ModelForm):
 
     def clean_name(self):
         name = self.cleaned_data['name']
-        if Label.objects.filter(user=self.user, name__iexact=name, group__code='annual_expenses', is_deleted=False).exists():
+        if Label.objects.for_user(self.user).alive().filter(name__iexact=name, group__code='annual_expenses').exists():
             raise forms.ValidationError("❌ هذه التسمية موجودة بالفعل ضمن النفقات السنوية.")
         return name
 
@@ -291,7 +294,7 @@ class FixedLabelAddForm(forms.ModelForm):
 
     def clean_name(self):
         name = self.cleaned_data['name']
-        if Label.objects.filter(user=self.user, name__iexact=name, group__code='monthly_fixed', is_deleted=False).exists():
+        if Label.objects.for_user(self.user).alive().filter(name__iexact=name, group__code='monthly_fixed').exists():
             raise forms.ValidationError("❌ هذه التسمية موجودة بالفعل ضمن المصاريف الشهرية الثابتة.")
         return name
 
@@ -345,3 +348,125 @@ class MonthlyVariableExpenseForm(forms.ModelForm):
             'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'مثلاً: الكهرباء'}),
             'expected_monthly': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'مثلاً: 400'}),
         }
+
+
+# 🧪 budget_simulator_view
+class BudgetSimulatorForm(forms.Form):
+    horizon = forms.TypedChoiceField(
+        label='مدة التوقع', coerce=int, initial=12,
+        choices=[(months, f'{months} شهراً') for months in HORIZONS],
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    income_change = forms.DecimalField(
+        label='تغيير الدخل (%)', required=False, initial=0, min_value=-100, decimal_places=1,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.5'})
+    )
+
+    def __init__(self, *args, groups=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        # One "cut by %" field per group; negative values mean spending more
+        for group in groups:
+            self.fields[f'cut_{group.id}'] = forms.DecimalField(
+                label=group.name, required=False, initial=0, min_value=-100, max_value=100, decimal_places=1,
+                widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.5'})
+            )
+
+    def cuts(self):
+        return {
+            int(name.removeprefix('cut_')): float(value or 0)
+            for name, value in self.cleaned_data.items() if name.startswith('cut_')
+        }
+
+
+class NewRecurringLabelForm(forms.Form):
+    name = forms.CharField(label='تسمية جديدة', required=False, max_length=100,
+                           widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'مثلاً: اشتراك'}))
+    amount = forms.IntegerField(label='المبلغ الشهري', required=False, min_value=0,
+                                widget=forms.NumberInput(attrs={'class': 'form-control', 'placeholder': '0'}))
+
+
+NewRecurringLabelFormSet = formset_factory(NewRecurringLabelForm, extra=3)
+
+
+# 🔁 recurring_list
+class RecurrenceRuleForm(forms.ModelForm):
+    class Meta:
+        model = RecurrenceRule
+        fields = ['label', 'amount', 'interval_months', 'next_date', 'end_date']
+        labels = {
+            'label': 'التسمية',
+            'amount': 'المبلغ',
+            'interval_months': 'التكرار',
+            'next_date': 'تاريخ أول دفعة',
+            'end_date': 'تاريخ الانتهاء (اختياري)',
+        }
+        widgets = {
+            'label': forms.Select(attrs={'class': 'form-select'}),
+            'amount': forms.NumberInput(attrs={'class': 'form-control', 'placeholder': 'المبلغ'}),
+            'interval_months': forms.Select(attrs={'class': 'form-select'}),
+            'next_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
+            'end_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}, format='%Y-%m-%d'),
+        }
+
+    def __init__(self, *args, **kwargs):
+        user = kwargs.pop('user')
+        super().__init__(*args, **kwargs)
+        self.fields['label'].queryset = Label.objects.for_user(user).alive().select_related('group')
+        self.fields['label'].required = False
+        # No label: the rule generates an income (salary…)
+        self.fields['label'].empty_label = '💰 دخل'
+
+    def save(self, commit=True):
+        # Later occurrences fall on the same day of the month as the first one
+        self.instance.day_of_month = self.cleaned_data['next_date'].day
+        return super().save(commit)
+
+# 🔀 Merge a label into another one, or move it to another group
+class LabelMergeForm(forms.Form):
+    target = forms.ModelChoiceField(
+        queryset=Label.objects.none(), label='دمج في التسمية',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        self.label = kwargs.pop('label')
+        super().__init__(*args, **kwargs)
+        self.fields['target'].queryset = (
+            Label.objects.for_user(self.label.user).alive().exclude(pk=self.label.pk)
+            .select_related('group').order_by('group__order', 'order')
+        )
+        self.fields['target'].label_from_instance = lambda label: f"{label.group.name} / {label.name}"
+
+class LabelMoveForm(forms.Form):
+    group = forms.ModelChoiceField(
+        queryset=Group.objects.none(), label='نقل إلى المجموعة',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        self.label = kwargs.pop('label')
+        super().__init__(*args, **kwargs)
+        self.fields['group'].queryset = Group.objects.for_user(self.label.user).alive().exclude(pk=self.label.group_id)
+
+    def clean_group(self):
+        group = self.cleaned_data['group']
+        # (user, group, name) is unique, deleted labels included
+        if Label.objects.filter(group=group, name__iexact=self.label.name).exists():
+            raise forms.ValidationError("❌ هذا الاسم موجود بالفعل ضمن هذه المجموعة، استعمل الدمج بدلاً من النقل.")
+        return group
+
+# 🗑️ Account deletion, confirmed with the password
+class AccountDeleteForm(forms.Form):
+    password = forms.CharField(
+        label='🔑 كلمة المرور', widget=forms.PasswordInput(attrs={'class': 'form-control'}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        self.user = kwargs.pop('user')
+        super().__init__(*args, **kwargs)
+
+    def clean_password(self):
+        password = self.cleaned_data['password']
+        if not self.user.check_password(password):
+            raise forms.ValidationError("❌ كلمة المرور غير صحيحة.")
+        return password
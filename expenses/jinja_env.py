@@ -0,0 +1,44 @@
+# jinja_env.py
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template import defaultfilters
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.html import json_script
+from jinja2 import Environment
+from markupsafe import Markup
+
+from .assets import asset_tags
+from .loaders import MinifyingJinjaLoader
+
+
+def url(viewname, *args, **kwargs):
+    return reverse(viewname, args=args or None, kwargs=kwargs or None)
+
+
+def cached_fragment(fragment_name, *vary_on, caller):
+    """Jinja counterpart of Django's {% cache %}: {% call cached_fragment('name', ...) %}."""
+    key = make_template_fragment_key(f'jinja:{fragment_name}', vary_on)
+    value = cache.get(key)
+    if value is None:
+        value = caller()
+        cache.set(key, str(value), settings.FRAGMENT_CACHE_TIMEOUT)
+    return Markup(value)
+
+
+def environment(**options):
+    options['loader'] = MinifyingJinjaLoader(options['loader'])
+    env = Environment(**options)
+    env.globals.update({
+        'static': static,
+        'assets': asset_tags,
+        'url': url,
+        'cached_fragment': cached_fragment,
+    })
+    env.filters.update({
+        'floatformat': defaultfilters.floatformat,
+        'date': defaultfilters.date,
+        'json_script': json_script,
+    })
+    return env
@@ -0,0 +1,102 @@
+# jobs.py
+# ⚙️ Minimal background jobs: rows in the Job table, executed by `manage.py run_workers`.
+# Views enqueue work and return at once; clients poll the job status endpoints.
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+TASKS = {}
+
+# Seconds before the first retry; doubled on every further attempt
+RETRY_DELAY = 30
+
+
+def task(name, atomic=True):
+    """
+    Register `func(user, **payload)` as the job called `name`; its return value is
+    stored as the result. It runs in a transaction unless `atomic` is False (jobs
+    that commit as they go).
+    """
+    def register(func):
+        func.atomic = atomic
+        TASKS[name] = func
+        return func
+    return register
+
+
+def enqueue(name, user=None, max_attempts=3, **payload):
+    if name not in TASKS:
+        raise ValueError(f"Unknown job {name!r}")
+    return Job.objects.create(name=name, user=user, payload=payload, max_attempts=max_attempts)
+
+
+def claim_next():
+    """Atomically move the oldest due job to RUNNING; None when nothing is due."""
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'pk')
+    for job_id in due.values_list('pk', flat=True)[:10]:
+        # The status check in the UPDATE makes concurrent workers skip each other's claims
+        claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return job_id
+    return None
+
+
+def requeue_stale(older_than):
+    """Jobs left RUNNING by a worker that died: give them back to the queue."""
+    return Job.objects.filter(status=Job.RUNNING, started_at__lt=timezone.now() - older_than).update(status=Job.QUEUED)
+
+
+def execute(job_id):
+    """Run one claimed job; safe to call from a worker thread or process."""
+    close_old_connections()
+    try:
+        job = Job.objects.select_related('user').get(pk=job_id)
+        try:
+            func = TASKS[job.name]
+            with transaction.atomic() if func.atomic else nullcontext():
+                result = func(job.user, **job.payload)
+        except Exception:
+            job.error = traceback.format_exc()
+            if job.attempts < job.max_attempts:
+                job.status = Job.QUEUED
+                job.run_after = timezone.now() + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+            else:
+                job.status = Job.FAILED
+                job.finished_at = timezone.now()
+            job.save(update_fields=['status', 'error', 'run_after', 'finished_at'])
+            return job.status
+
+        job.status = Job.DONE
+        job.result = result
+        job.error = ''
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'result', 'error', 'finished_at'])
+        return job.status
+    finally:
+        close_old_connections()
+
+
+def job_status(job):
+    data = {
+        'id': job.pk,
+        'name': job.name,
+        'status': job.status,
+        'attempts': job.attempts,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    }
+    if job.status == Job.DONE:
+        data['result'] = job.result
+    elif job.error:
+        # Only the last line: the full traceback stays in the admin
+        data['error'] = job.error.strip().splitlines()[-1]
+    return data
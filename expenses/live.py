@@ -0,0 +1,174 @@
+# live.py
+# 📡 Live dashboard updates: Expense/Income writes are turned into small deltas
+# (label, month, amount change) and pushed over Server-Sent Events to the
+# dashboards the user has open, which patch their chart payload in place.
+import asyncio
+import json
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from .dashboard import label_kind
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # optional, only needed by RedisBroadcaster
+    redis = None
+
+# Comment line sent when nothing happened for a while, so proxies keep the stream open
+KEEPALIVE_SECONDS = 20
+
+
+class InProcessBroadcaster:
+    """Delivers events to subscribers in the same process (one worker, or runserver)."""
+
+    def __init__(self, **options):
+        self.subscribers = defaultdict(set)
+        self.lock = threading.Lock()
+
+    def publish(self, user_id, events):
+        # Called from sync code (signal handlers), possibly on another thread than the subscribers
+        with self.lock:
+            subscribers = list(self.subscribers.get(user_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(queue.put_nowait, events)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self.lock:
+            self.subscribers[user_id].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self.lock:
+                self.subscribers[user_id].discard(subscriber)
+                if not self.subscribers[user_id]:
+                    del self.subscribers[user_id]
+
+
+class RedisBroadcaster:
+    """Redis pub/sub, so events reach the dashboards connected to any worker."""
+
+    def __init__(self, location='', **options):
+        if redis is None:
+            raise ImproperlyConfigured("RedisBroadcaster needs the 'redis' package")
+        self.location = location or 'redis://localhost:6379/0'
+        self.client = redis.Redis.from_url(self.location)
+
+    def channel(self, user_id):
+        return f'masroufy:live:{user_id}'
+
+    def publish(self, user_id, events):
+        self.client.publish(self.channel(user_id), json.dumps(events))
+
+    @asynccontextmanager
+    async def subscribe(self, user_id):
+        queue = asyncio.Queue()
+        client = aioredis.Redis.from_url(self.location)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(self.channel(user_id))
+
+        async def relay():
+            async for message in pubsub.listen():
+                queue.put_nowait(json.loads(message['data']))
+
+        task = asyncio.create_task(relay())
+        try:
+            yield queue
+        finally:
+            task.cancel()
+            await pubsub.aclose()
+            await client.aclose()
+
+
+@lru_cache
+def get_broadcaster():
+    options = dict(settings.LIVE_UPDATES)
+    return import_string(options.pop('BACKEND'))(**{key.lower(): value for key, value in options.items()})
+
+
+# 🧮 Deltas
+def expense_deltas(old, new):
+    """
+    Events for an expense going from `old` to `new` (either may be None for a
+    create/delete): a change of label or month is a removal plus an addition.
+    """
+    events = []
+    if old is not None:
+        events.append({
+            'type': 'expense', 'label': old.label_id,
+            'year': old.date.year, 'month': old.date.month, 'amount': -old.amount,
+        })
+    if new is not None:
+        label = new.label
+        events.append({
+            'type': 'expense', 'label': label.id,
+            'year': new.date.year, 'month': new.date.month, 'amount': new.amount,
+            # Lets a dashboard add a label it has not drawn yet
+            'name': label.name, 'group': label.group_id, 'kind': label_kind(label),
+            'expected': label.expected_monthly * 12,
+        })
+    return merge(events)
+
+
+def income_deltas(old, new):
+    events = []
+    if old is not None:
+        events.append({'type': 'income', 'year': old.date.year, 'month': old.date.month, 'amount': -old.amount})
+    if new is not None:
+        events.append({'type': 'income', 'year': new.date.year, 'month': new.date.month, 'amount': new.amount})
+    return merge(events)
+
+
+def merge(events):
+    """Fold the deltas on the same cell (a removal and an addition, or a whole batch) into one; drop no-ops."""
+    cells = {}
+    for event in events:
+        key = (event['type'], event.get('label'), event['year'], event['month'])
+        if key in cells:
+            # The addition's fields (name, group...) win over the removal's
+            event = {**cells[key], **event, 'amount': cells[key]['amount'] + event['amount']}
+        cells[key] = event
+    return [event for event in cells.values() if event['amount']]
+
+
+# 🔌 SSE endpoint. Only served under ASGI: each open dashboard holds the
+# connection, which under WSGI would be a worker thread for as long as the tab is open
+def live_url(request):
+    """The stream's URL for the dashboard to connect to, '' when live updates are off."""
+    return reverse('live_updates') if isinstance(request, ASGIRequest) else ''
+
+
+@login_required
+async def live_updates(request):
+    if not isinstance(request, ASGIRequest):
+        # 204 tells EventSource to stop reconnecting (pages from before a switch to WSGI)
+        return HttpResponse(status=204)
+    user = await request.auser()
+
+    async def stream():
+        async with get_broadcaster().subscribe(user.pk) as queue:
+            yield 'retry: 5000\n: connected\n\n'
+            while True:
+                try:
+                    events = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+                except TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield f'data: {json.dumps(events)}\n\n'
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,56 @@
+# loaders.py
+import re
+
+from django.template.loaders import app_directories, filesystem
+from jinja2 import BaseLoader
+
+# Whitespace inside these elements is significant (or JS), so they are left untouched
+PRESERVED = re.compile(r'(<(pre|textarea|script)\b.*?</\2>)', re.S | re.I)
+HTML_COMMENT = re.compile(r'<!--(?!\[if).*?-->', re.S)
+INDENT = re.compile(r'\s*\n\s*')
+
+
+def minify_html(source):
+    """
+    Strip indentation, blank lines and HTML comments from template source.
+
+    Newlines are kept, so inline whitespace still renders the same and
+    template tags are never joined or split.
+    """
+    parts = PRESERVED.split(source)
+    out = []
+    # split() yields text, full match, tag name, text, full match, tag name, ...
+    for i in range(0, len(parts), 3):
+        text = parts[i]
+        text = HTML_COMMENT.sub(lambda m: m.group(0) if '{%' in m.group(0) else '', text)
+        out.append(INDENT.sub('\n', text))
+        if i + 1 < len(parts):
+            out.append(parts[i + 1])
+    return ''.join(out).strip() + '\n'
+
+
+class MinifyMixin:
+    def get_contents(self, origin):
+        return minify_html(super().get_contents(origin))
+
+
+class FilesystemLoader(MinifyMixin, filesystem.Loader):
+    pass
+
+
+class AppDirectoriesLoader(MinifyMixin, app_directories.Loader):
+    pass
+
+
+class MinifyingJinjaLoader(BaseLoader):
+    """Wraps the Jinja2 loader Django builds; Jinja caches the compiled result per template."""
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = self.loader.get_source(environment, template)
+        return minify_html(source), filename, uptodate
+
+    def list_templates(self):
+        return self.loader.list_templates()
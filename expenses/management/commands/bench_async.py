@@ -0,0 +1,98 @@
+import asyncio
+import statistics
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import path
+
+from core import urls as core_urls
+from expenses import async_views, views
+from expenses.models import CustomUser
+
+PAGES = {'home': '/', 'dashboard': '/dashboard/', 'planning_view': '/planning_view/'}
+
+
+def urlconf(module):
+    """The project URLconf with the three read-heavy pages taken from `module`."""
+    conf = types.ModuleType(f'bench_{module.__name__.rpartition(".")[2]}_urls')
+    conf.urlpatterns = [
+        path('', module.home, name='home'),
+        path('dashboard/', module.yearly_dashboard_view, name='dashboard'),
+        path('planning_view/', module.planning_view, name='planning_view'),
+        *core_urls.urlpatterns,
+    ]
+    return conf
+
+
+class Command(BaseCommand):
+    help = "Load-test home, dashboard and planning_view: sync views through WSGI vs async views through ASGI"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help="username whose data the pages show")
+        parser.add_argument('--requests', type=int, default=300, help="requests per page")
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            user = CustomUser.objects.get(username=options['user'])
+        except CustomUser.DoesNotExist:
+            raise CommandError(f"No user named {options['user']!r}")
+
+        login = Client()
+        login.force_login(user)
+        self.session_key = login.cookies[settings.SESSION_COOKIE_NAME].value
+        self.concurrency = options['concurrency']
+
+        self.stdout.write(f"{'page':<16}{'mode':<7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}")
+        for name, url in PAGES.items():
+            urls = [url] * options['requests']
+            with override_settings(ROOT_URLCONF=urlconf(views)):
+                self.report(name, 'wsgi', *self.run_wsgi(urls))
+            with override_settings(ROOT_URLCONF=urlconf(async_views)):
+                self.report(name, 'asgi', *asyncio.run(self.run_asgi(urls)))
+
+    def report(self, name, mode, elapsed, latencies):
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f"{name:<16}{mode:<7}{len(latencies) / elapsed:>9.1f}"
+            f"{statistics.median(latencies) * 1000:>9.1f}{p95 * 1000:>9.1f}"
+        )
+
+    def ensure_ok(self, response):
+        if response.status_code != 200:
+            raise CommandError(f"{response.request['PATH_INFO']} answered {response.status_code}")
+
+    def run_wsgi(self, urls):
+        def fetch(url):
+            client = Client()
+            client.cookies[settings.SESSION_COOKIE_NAME] = self.session_key
+            start = time.perf_counter()
+            self.ensure_ok(client.get(url))
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            start = time.perf_counter()
+            latencies = list(pool.map(fetch, urls))
+        return time.perf_counter() - start, latencies
+
+    async def run_asgi(self, urls):
+        queue = list(urls)
+        latencies = []
+
+        async def worker():
+            client = AsyncClient()
+            client.cookies[settings.SESSION_COOKIE_NAME] = self.session_key
+            while queue:
+                url = queue.pop()
+                request_start = time.perf_counter()
+                self.ensure_ok(await client.get(url))
+                latencies.append(time.perf_counter() - request_start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+        return time.perf_counter() - start, latencies
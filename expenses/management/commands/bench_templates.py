@@ -0,0 +1,136 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.test import RequestFactory, override_settings
+
+from expenses.dashboard import build_chart_data, yearly_tables
+from expenses.models import CustomUser, Expense, Group, Label
+
+
+def prefetched(instance, name, objects):
+    """Attach objects as if they came from prefetch_related(), so no query runs."""
+    qs = getattr(instance, name).all()
+    qs._result_cache = list(objects)
+    qs._prefetch_done = True
+    instance._prefetched_objects_cache = {name: qs}
+
+
+class Command(BaseCommand):
+    help = "Compare Django and Jinja2 render times of the hot templates on production-sized contexts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--groups', type=int, default=8)
+        parser.add_argument('--labels-per-group', type=int, default=12)
+        parser.add_argument('--expenses', type=int, default=1500)
+
+    def handle(self, *args, **options):
+        user = CustomUser(pk=1, username='bench', expected_monthly_income=12000)
+        request = RequestFactory().get('/')
+        request.user = user
+
+        groups, labels = self.build_categories(user, options['groups'], options['labels_per_group'])
+        forecasts = self.forecasts(labels)
+        contexts = {
+            'home.html': {**self.home_context(groups, labels, options['expenses']), 'forecasts': forecasts},
+            'label/label_list.html': {'groups': groups},
+            'planning_page.html': {**self.planning_context(user, groups), 'forecasts': forecasts},
+            'yearly_dashboard.html': self.dashboard_context(labels),
+        }
+
+        # Fragment caching would hide the engine cost after the first render
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}):
+            self.stdout.write(f"{'template':<26}{'django ms':>12}{'jinja2 ms':>12}{'speedup':>10}")
+            for name, context in contexts.items():
+                timings = [self.time_render(engine, name, context, request, options['iterations'])
+                           for engine in ('django', 'jinja2')]
+                self.stdout.write(f"{name:<26}{timings[0]:>12.2f}{timings[1]:>12.2f}{timings[0] / timings[1]:>9.1f}x")
+
+    def time_render(self, engine, name, context, request, iterations):
+        template = engines[engine].get_template(name)
+        template.render(context, request)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            template.render(context, request)
+        return (time.perf_counter() - start) * 1000 / iterations
+
+    def build_categories(self, user, group_count, labels_per_group):
+        groups, labels = [], []
+        for g in range(1, group_count + 1):
+            group = Group(pk=g, user=user, name=f'مجموعة {g}', order=g)
+            group_labels = [
+                Label(pk=g * 100 + l, user=user, group=group, name=f'تسمية {g}-{l}',
+                      expected_monthly=random.randint(0, 3000), order=l)
+                for l in range(1, labels_per_group + 1)
+            ]
+            prefetched(group, 'labels', group_labels)
+            group.total_expected = sum(label.expected_monthly for label in group_labels)
+            groups.append(group)
+            labels.extend(group_labels)
+        return groups, labels
+
+    def home_context(self, groups, labels, expense_count):
+        today = date.today()
+        grouped_expenses = {}
+        for i in range(expense_count):
+            label = labels[i % len(labels)]
+            expense = Expense(pk=i + 1, label=label, amount=random.randint(1, 900),
+                              date=today - timedelta(days=i % 30))
+            data = grouped_expenses.setdefault(label, {'items': [], 'total': 0})
+            data['items'].append(expense)
+            data['total'] += expense.amount
+        total_expense = sum(data['total'] for data in grouped_expenses.values())
+        return {
+            'start_date': today.replace(day=1).isoformat(),
+            'end_date': today.isoformat(),
+            'total_expense': total_expense,
+            'total_income': 15000,
+            'balance': 15000 - total_expense,
+            'grouped_expenses': grouped_expenses,
+            'groups': groups,
+            'labels': labels,
+            'selected_group': '',
+            'selected_label': '',
+        }
+
+    def planning_context(self, user, groups):
+        annual_labels = groups[0].labels.all()
+        annual_total = sum(label.expected_monthly for label in annual_labels)
+        monthly_expense_total = sum(group.total_expected for group in groups[1:]) + annual_total / 12
+        return {
+            'monthly_income': user.expected_monthly_income,
+            'monthly_expense_total': monthly_expense_total,
+            'net_balance': user.expected_monthly_income - monthly_expense_total,
+            'groups': groups[1:],
+            'annual_labels': annual_labels,
+            'annual_total': annual_total,
+            'annual_monthly_equiv': annual_total / 12,
+        }
+
+    def forecasts(self, labels):
+        rows = []
+        for label in labels:
+            month_end = random.randint(0, 3000)
+            rows.append({
+                'label': label.name, 'group': label.group.name, 'spent': month_end // 2,
+                'month_end': month_end, 'expected': label.expected_monthly, 'year_end': month_end * 12,
+                'expected_year': label.expected_monthly * 12, 'over': month_end > label.expected_monthly,
+            })
+        return rows
+
+    def dashboard_context(self, labels):
+        spent_rows = [
+            {'label_id': label.pk, 'month': month, 'total': random.randint(0, 3000)}
+            for label in labels for month in range(1, 13)
+        ]
+        income_rows = [{'month': month, 'total': 15000} for month in range(1, 13)]
+        chart_data = build_chart_data(2025, spent_rows, income_rows, labels)
+        return {
+            'year': 2025,
+            'year_range': range(2020, 2031),
+            'chart_data': chart_data,
+            **yearly_tables(chart_data),
+        }
@@ -0,0 +1,15 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from expenses.models import Tombstone
+from expenses.sync import TOMBSTONE_DAYS
+
+
+class Command(BaseCommand):
+    help = f"Delete the sync tombstones older than {TOMBSTONE_DAYS} days (older sync tokens get a full sync)"
+
+    def handle(self, *args, **options):
+        deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=TOMBSTONE_DAYS)).delete()
+        self.stdout.write(f"Deleted {deleted} tombstone(s)")
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from expenses.jobs import enqueue
+from expenses.models import CustomUser
+from expenses.purge import PURGE_BATCH, PURGE_PAUSE, count_rows, purge_user
+
+
+class Command(BaseCommand):
+    help = "Delete an account and all its data table by table, in small batches (see expenses.purge)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--dry-run', action='store_true', help="only count the rows that would be deleted")
+        parser.add_argument('--keep-account', action='store_true',
+                            help="delete the data only; the account starts over with the default groups")
+        parser.add_argument('--async', action='store_true', dest='run_async',
+                            help="enqueue a job for `manage.py run_workers` instead of purging now")
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH)
+        parser.add_argument('--pause', type=float, default=PURGE_PAUSE, help="seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        user_id = CustomUser.objects.filter(username=options['username']).values_list('pk', flat=True).first()
+        if user_id is None:
+            raise CommandError(f"No user {options['username']!r}")
+
+        if options['dry_run']:
+            counts = count_rows(user_id)
+            for table, count in counts.items():
+                self.stdout.write(f"{table}: {count}")
+            self.stdout.write(f"Would delete {sum(counts.values())} row(s)")
+            return
+
+        if options['run_async']:
+            job = enqueue('purge_account', user_id=user_id, keep_account=options['keep_account'])
+            self.stdout.write(f"Enqueued job {job.pk}")
+            return
+
+        deleted = purge_user(
+            user_id, keep_account=options['keep_account'], batch_size=options['batch_size'], pause=options['pause'],
+        )
+        for table, count in deleted.items():
+            self.stdout.write(f"{table}: {count}")
+        self.stdout.write(f"Deleted {sum(deleted.values())} row(s)")
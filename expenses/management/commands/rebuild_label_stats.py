@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from expenses.models import Expense, Label, LabelStats
+
+
+class Command(BaseCommand):
+    help = "Recompute LabelStats from the stored expenses (after imports or other bulk changes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="username; all users when omitted")
+
+    def handle(self, *args, **options):
+        labels = Label.objects.all()
+        if options['user']:
+            labels = labels.filter(user__username=options['user'])
+
+        # One pass over the amounts, in entry order so recent_max decays as it would have live
+        amounts = (
+            Expense.objects.filter(label__in=labels)
+            .order_by('label_id', 'date', 'pk')
+            .values_list('label_id', 'amount')
+            .iterator(chunk_size=5000)
+        )
+        stats = {}
+        for label_id, amount in amounts:
+            if label_id not in stats:
+                stats[label_id] = LabelStats(label_id=label_id)
+            stats[label_id].add(amount)
+
+        with transaction.atomic():
+            LabelStats.objects.filter(label__in=labels).delete()
+            LabelStats.objects.bulk_create(stats.values(), batch_size=500)
+
+        self.stdout.write(f"Rebuilt stats of {len(stats)} label(s)")
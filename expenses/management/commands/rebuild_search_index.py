@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from expenses.models import Expense
+from expenses.search import SEARCH_TABLE, index_expenses, is_indexed
+
+
+class Command(BaseCommand):
+    help = "Rebuild the expense search index from the Expense table"
+
+    def handle(self, *args, **options):
+        if not is_indexed():
+            self.stdout.write(f"No search index on {connection.vendor}: search uses plain lookups")
+            return
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+            index_expenses(Expense.objects.all())
+        self.stdout.write("Search index rebuilt")
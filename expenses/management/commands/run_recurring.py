@@ -0,0 +1,101 @@
+from collections import defaultdict
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from expenses.models import Expense, Income, LabelStats, RecurrenceRule
+from expenses.signals import after_bulk_write
+
+
+class Command(BaseCommand):
+    help = "Create the expenses and incomes of every due recurrence rule (safe to run again: one row per rule and period)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="generate what is due by this day (default: today)")
+        parser.add_argument('--batch-size', type=int, default=2000, help="rules per transaction")
+
+    def handle(self, *args, **options):
+        today = options['date'] or date.today()
+        due = RecurrenceRule.objects.filter(
+            Q(label__isnull=True) | Q(label__is_deleted=False), is_active=True, next_date__lte=today,
+        ).order_by('pk')
+
+        last_pk, created = 0, {'expenses': 0, 'incomes': 0}
+        while rules := list(due.filter(pk__gt=last_pk)[:options['batch_size']]):
+            last_pk = rules[-1].pk
+            expenses, incomes = [], []
+            for rule in rules:
+                for period in rule.due_periods(today):
+                    row = {'user_id': rule.user_id, 'amount': rule.amount, 'date': rule.occurrence_date(period),
+                           'recurrence': rule, 'period': period}
+                    if rule.is_income:
+                        incomes.append(Income(**row))
+                    else:
+                        expenses.append(Expense(label_id=rule.label_id, **row))
+
+            with transaction.atomic():
+                # A concurrent run waits for this batch's rules, then finds what this one created
+                list(RecurrenceRule.objects.select_for_update().filter(pk__in=[rule.pk for rule in rules]).values('pk'))
+                expenses, incomes = self.not_created_yet(Expense, expenses), self.not_created_yet(Income, incomes)
+                # The unique (recurrence, period) constraints are the last line against duplicates
+                last_ids = self.last_id(Expense), self.last_id(Income)
+                Expense.objects.bulk_create(expenses, batch_size=500, ignore_conflicts=True)
+                Income.objects.bulk_create(incomes, batch_size=500, ignore_conflicts=True)
+                expenses = self.inserted(Expense, expenses, last_ids[0])
+                incomes = self.inserted(Income, incomes, last_ids[1])
+                self.advance(rules)
+                self.after_bulk_create(expenses, incomes)
+
+            created['expenses'] += len(expenses)
+            created['incomes'] += len(incomes)
+
+        self.stdout.write(f"Generated {created['expenses']} expense(s) and {created['incomes']} income(s)")
+
+    def not_created_yet(self, model, rows):
+        """Drop the occurrences an earlier (interrupted) run already created, one query per batch."""
+        if not rows:
+            return rows
+        existing = set(model.objects.filter(
+            recurrence__in={row.recurrence_id for row in rows}, period__in={row.period for row in rows},
+        ).values_list('recurrence_id', 'period'))
+        return [row for row in rows if (row.recurrence_id, row.period) not in existing]
+
+    def last_id(self, model):
+        return model.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    def inserted(self, model, rows, last_id):
+        """
+        The rows bulk_create(ignore_conflicts=True) did insert, with the ids it could
+        not set: a conflicting row from before the insert has an id up to last_id.
+        """
+        if not rows:
+            return rows
+        ids = {
+            (recurrence_id, period): pk for pk, recurrence_id, period in model.objects.filter(
+                recurrence__in={row.recurrence_id for row in rows}, period__in={row.period for row in rows},
+                pk__gt=last_id,
+            ).values_list('pk', 'recurrence_id', 'period')
+        }
+        inserted = []
+        for row in rows:
+            row.pk = ids.get((row.recurrence_id, row.period))
+            if row.pk is not None:
+                inserted.append(row)
+        return inserted
+
+    def advance(self, rules):
+        # Most rules of a batch share their next date: one UPDATE per distinct value, not a CASE per rule
+        by_value = defaultdict(list)
+        for rule in rules:
+            by_value[rule.next_date, rule.is_active].append(rule.pk)
+        for (next_date, is_active), pks in by_value.items():
+            RecurrenceRule.objects.filter(pk__in=pks).update(next_date=next_date, is_active=is_active)
+
+    def after_bulk_create(self, expenses, incomes):
+        amounts = defaultdict(list)
+        for expense in expenses:
+            amounts[expense.label_id].append(expense.amount)
+        LabelStats.add_many(amounts)
+        after_bulk_write(expenses, incomes)
@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from expenses.jobs import claim_next, execute, requeue_stale
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (Job table) on a local thread or process pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--processes', action='store_true', help="use processes instead of threads")
+        parser.add_argument('--poll', type=float, default=1.0, help="seconds to sleep when the queue is empty")
+        parser.add_argument('--stale-after', type=int, default=3600,
+                            help="requeue jobs left running longer than this many seconds (crashed worker)")
+        parser.add_argument('--once', action='store_true', help="exit when no job is due")
+
+    def handle(self, *args, **options):
+        requeued = requeue_stale(timedelta(seconds=options['stale_after']))
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+        if options['processes']:
+            # Forked children must not share the parent's database connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(options['workers'])
+        else:
+            pool = ThreadPoolExecutor(options['workers'])
+
+        running = {}
+        try:
+            while True:
+                while len(running) < options['workers'] and (job_id := claim_next()):
+                    running[pool.submit(execute, job_id)] = job_id
+                    if options['processes']:
+                        connections.close_all()
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll'])
+                    continue
+
+                done, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        self.stdout.write(f"job {job_id}: {future.result()}")
+                    except Exception as exc:  # the job row could not even be updated
+                        self.stderr.write(f"job {job_id}: worker error: {exc!r}")
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping, waiting for running jobs…")
+        finally:
+            pool.shutdown(wait=True)
@@ -1,6 +1,21 @@
 # managers.py
 from django.db import models
 
-class UserScopedManager(models.Manager):
+class UserScopedQuerySet(models.QuerySet):
     def for_user(self, user):
-        return self.get_queryset().filter(user=user)
+        return self.filter(user=user)
+
+class UserScopedManager(models.Manager.from_queryset(UserScopedQuerySet)):
+    pass
+
+# 🗑️ Groups and labels are soft-deleted: alive() is what the pages show, and
+# what the partial (user, ...order) indexes cover
+class SoftDeleteQuerySet(UserScopedQuerySet):
+    def alive(self):
+        return self.filter(is_deleted=False)
+
+    def deleted(self):
+        return self.filter(is_deleted=True)
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    pass
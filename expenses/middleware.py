@@ -0,0 +1,101 @@
+# middleware.py
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import cc_delim_re, patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # optional, gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+# Event streams must reach the client event by event, never buffered by a compressor
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+re_accepts_br = _lazy_re_compile(r'\bbr\b')
+
+
+class BrotliStream:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=5)
+
+    def process(self, chunk):
+        return self.compressor.process(chunk) + self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+def no_transform(response):
+    directives = cc_delim_re.split(response.get('Cache-Control', ''))
+    return any(directive.strip().lower() == 'no-transform' for directive in directives)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Django's GZipMiddleware, with brotli in front when installed and accepted.
+
+    Only 200 responses of text-like types at least settings.COMPRESSION_MIN_SIZE
+    long are compressed, never event streams nor responses marked
+    Cache-Control: no-transform. Brotli has no equivalent of the random padding
+    GZipMiddleware adds against BREACH, so pages holding a CSRF token always
+    get gzip.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or response.status_code != 200:
+            return response
+
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES) or content_type.startswith(UNCOMPRESSED_TYPES):
+            return response
+
+        if no_transform(response):
+            return response
+
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        # CsrfViewMiddleware (re)sets the cookie whenever a token was put in the page
+        accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli and re_accepts_br.search(accept) and settings.CSRF_COOKIE_NAME not in response.cookies:
+            patch_vary_headers(response, ('Accept-Encoding',))
+            return self.brotli_response(response)
+        return super().process_response(request, response)
+
+    def brotli_response(self, response):
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.acompress_sequence(response.streaming_content, BrotliStream())
+            else:
+                response.streaming_content = self.compress_sequence(response.streaming_content, BrotliStream())
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content, quality=5)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The representation changed, so a strong ETag is no longer valid for it
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+    @staticmethod
+    def compress_sequence(sequence, stream):
+        for chunk in sequence:
+            data = stream.process(chunk)
+            if data:
+                yield data
+        yield stream.finish()
+
+    @staticmethod
+    async def acompress_sequence(sequence, stream):
+        async for chunk in sequence:
+            data = stream.process(chunk)
+            if data:
+                yield data
+        yield stream.finish()
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:38
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataStamp',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('expenses_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('incomes_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('groups_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('labels_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='data_stamp', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0003_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('monthly_expected', models.PositiveIntegerField(default=0)),
+                ('annual_total', models.PositiveIntegerField(default=0)),
+                ('annual_monthly', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='plan_summary', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 14:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0004_plansummary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='is_flagged',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='LabelStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('mean', models.FloatField(default=0)),
+                ('m2', models.FloatField(default=0)),
+                ('recent_max', models.FloatField(default=0)),
+                ('label', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='expenses.label')),
+            ],
+        ),
+    ]
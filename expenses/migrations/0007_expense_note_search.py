@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:04
+
+from django.db import migrations, models
+
+from expenses import search
+
+
+def create_search_table(apps, schema_editor):
+    search.create_table(schema_editor)
+    search.index_expenses(apps.get_model('expenses', 'Expense').objects.all())
+
+
+def drop_search_table(apps, schema_editor):
+    search.drop_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0006_recurrencerule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='note',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
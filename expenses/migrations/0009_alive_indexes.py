@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-19 15:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0008_sync'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['user', 'order'], name='group_alive_order'),
+        ),
+        migrations.AddIndex(
+            model_name='label',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['user', 'group', 'order'], name='label_alive_order'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from expenses import search
+
+
+def rebuild_search_table(apps, schema_editor):
+    # Only the FTS5 table changes: its owner token column and prefix indexes
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    search.drop_table(schema_editor)
+    search.create_table(schema_editor)
+    search.index_expenses(apps.get_model('expenses', 'Expense').objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expenses', '0010_user_date_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_search_table, migrations.RunPython.noop),
+    ]
@@ -1,8 +1,52 @@
+import calendar
+from datetime import date
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
-from expenses.managers import UserScopedManager
+from expenses.managers import SoftDeleteManager, UserScopedManager
+
+
+# 📸 Field values as last read from or written to the database, so signal
+# receivers can tell what a save changes without querying the row again
+class LoadedValuesMixin:
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def loaded_values(self, *attnames):
+        """{attname: value} as stored, None when the instance was not loaded with all of them."""
+        loaded = getattr(self, '_loaded_values', {})
+        if not all(attname in loaded for attname in attnames):
+            return None
+        return {attname: loaded[attname] for attname in attnames}
+
+    def remember_loaded_values(self, field_names=None):
+        deferred = self.get_deferred_fields()
+        values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+            if field.attname not in deferred
+            and (field_names is None or field.name in field_names or field.attname in field_names)
+        }
+        if field_names is None:
+            self._loaded_values = values
+        else:
+            self._loaded_values = {**getattr(self, '_loaded_values', {}), **values}
+
+    def save(self, *args, update_fields=None, **kwargs):
+        super().save(*args, update_fields=update_fields, **kwargs)
+        self.remember_loaded_values(update_fields)
+
+    def refresh_from_db(self, *args, fields=None, **kwargs):
+        super().refresh_from_db(*args, fields=fields, **kwargs)
+        self.remember_loaded_values(fields)
 
 # 🧑‍💼 Custom user model
 class CustomUser(AbstractUser):
@@ -18,10 +62,15 @@ class CustomUser(AbstractUser):
         return self.username
 
 # 💰 Income model
-class Income(models.Model):
+class Income(LoadedValuesMixin, models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='incomes')
     amount = models.PositiveIntegerField(default=0)
     date = models.DateField(default=timezone.now)
+    # Set on the rows generated by `manage.py run_recurring`: one per rule and period
+    recurrence = models.ForeignKey('RecurrenceRule', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    period = models.DateField(null=True, blank=True)
+    # Set by save() and bulk_create(); bulk_update() and update() callers set it themselves (sync, see expenses.sync)
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = UserScopedManager()
 
@@ -37,9 +86,13 @@ class Income(models.Model):
 
     class Meta:
         ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['recurrence', 'period'], name='unique_income_occurrence'),
+        ]
+        indexes = [models.Index(fields=['user', 'updated_at']), models.Index(fields=['user', 'date'])]
 
 # 🗂️ Group model (category container)
-class Group(models.Model):
+class Group(LoadedValuesMixin, models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     order = models.PositiveIntegerField()
@@ -48,8 +101,9 @@ class Group(models.Model):
     # Internal logic fields
     code = models.CharField(max_length=50, blank=True, null=True)
     protected = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
-    objects = UserScopedManager()
+    objects = SoftDeleteManager()
 
     def save(self, *args, **kwargs):
         if not self.user:
@@ -59,21 +113,26 @@ class Group(models.Model):
     class Meta:
         ordering = ['order']
         unique_together = ('user', 'code')  # ensures code is unique per user
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', 'order'], condition=models.Q(is_deleted=False), name='group_alive_order'),
+        ]
 
     def __str__(self):
         return self.name
 
 # 🏷️ Label model (subcategory with budget)
-class Label(models.Model):
+class Label(LoadedValuesMixin, models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     group = models.ForeignKey(Group, on_delete=models.CASCADE, related_name='labels')
     name = models.CharField(max_length=100)
     expected_monthly = models.PositiveIntegerField(default=0)
     order = models.PositiveIntegerField()
     is_deleted = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
 
-    objects = UserScopedManager()
+    objects = SoftDeleteManager()
 
 
     def save(self, *args, **kwargs):
@@ -84,16 +143,88 @@ class Label(models.Model):
     class Meta:
         ordering = ['order']
         unique_together = ('user', 'group', 'name')
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', 'group', 'order'], condition=models.Q(is_deleted=False),
+                         name='label_alive_order'),
+        ]
 
     def __str__(self):
         return self.name
 
+    @property
+    def planned_monthly(self):
+        """expected_monthly per month: labels of the annual group hold a yearly amount there."""
+        if self.group.code == ANNUAL_GROUP_CODE:
+            return self.expected_monthly / 12
+        return self.expected_monthly
+
+# 🔁 Recurring expense (label set) or income (no label), generated by `manage.py run_recurring`
+class RecurrenceRule(models.Model):
+    INTERVAL_CHOICES = [
+        (1, 'شهرياً'),
+        (3, 'كل ثلاثة أشهر'),
+        (6, 'كل ستة أشهر'),
+        (12, 'سنوياً'),
+    ]
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='recurrence_rules')
+    label = models.ForeignKey('Label', on_delete=models.CASCADE, null=True, blank=True, related_name='recurrence_rules')
+    amount = models.PositiveIntegerField()
+    # Day of the occurrence, moved to the last day in shorter months
+    day_of_month = models.PositiveSmallIntegerField(default=1)
+    interval_months = models.PositiveSmallIntegerField(choices=INTERVAL_CHOICES, default=1)
+    # Date of the next occurrence to generate; the scheduler only looks at rules where it is due
+    next_date = models.DateField()
+    end_date = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    objects = UserScopedManager()
+
+    class Meta:
+        ordering = ['next_date']
+        indexes = [models.Index(fields=['is_active', 'next_date'])]
+
+    @property
+    def is_income(self):
+        return self.label_id is None
+
+    def occurrence_date(self, period):
+        last_day = calendar.monthrange(period.year, period.month)[1]
+        return period.replace(day=min(self.day_of_month, last_day))
+
+    def due_periods(self, today):
+        """
+        First days of the months with an occurrence due by `today`; moves next_date
+        past them, and retires the rule once its end_date is passed.
+        """
+        periods = []
+        period = self.next_date.replace(day=1)
+        while self.occurrence_date(period) <= today:
+            periods.append(period)
+            month = period.month - 1 + self.interval_months
+            period = date(period.year + month // 12, month % 12 + 1, 1)
+        self.next_date = self.occurrence_date(period)
+        if self.end_date:
+            periods = [p for p in periods if self.occurrence_date(p) <= self.end_date]
+            self.is_active = self.next_date <= self.end_date
+        return periods
+
+    def __str__(self):
+        return f"{self.label or 'دخل'} → {self.amount} / {self.interval_months}m"
+
 # 💸 Expense model
-class Expense(models.Model):
+class Expense(LoadedValuesMixin, models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)
     label = models.ForeignKey(Label, on_delete=models.CASCADE, related_name='expenses')
     date = models.DateField(default=timezone.now)
     amount = models.PositiveIntegerField()
+    note = models.CharField(max_length=255, blank=True, default='')
+    # Unusually large for its label when entered (see LabelStats), until dismissed on the review page
+    is_flagged = models.BooleanField(default=False)
+    recurrence = models.ForeignKey('RecurrenceRule', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    period = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     objects = UserScopedManager()
 
@@ -108,3 +239,227 @@ class Expense(models.Model):
 
     class Meta:
         ordering = ['-date']
+        constraints = [
+            models.UniqueConstraint(fields=['recurrence', 'period'], name='unique_expense_occurrence'),
+        ]
+        indexes = [models.Index(fields=['user', 'updated_at']), models.Index(fields=['user', 'date'])]
+
+# 🪦 A hard-deleted Expense/Income/Group/Label, so sync clients learn about the deletion (see expenses.sync)
+class Tombstone(models.Model):
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='+')
+    # Sync name of the model: 'expenses', 'incomes', 'groups' or 'labels'
+    kind = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'deleted_at'])]
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id} deleted"
+
+# 🕒 Per-user last-modified stamps (conditional GET)
+class DataStamp(models.Model):
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='data_stamp')
+    expenses_at = models.DateTimeField(default=timezone.now)
+    incomes_at = models.DateTimeField(default=timezone.now)
+    groups_at = models.DateTimeField(default=timezone.now)
+    labels_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def for_user(cls, user):
+        # A missing row is created "now", which is newer than any earlier change
+        stamp, _ = cls.objects.get_or_create(user=user)
+        return stamp
+
+    @classmethod
+    async def afor_user(cls, user):
+        stamp, _ = await cls.objects.aget_or_create(user=user)
+        return stamp
+
+    @classmethod
+    def touch(cls, user_id, *fields):
+        """Mark data as changed, e.g. touch(user.id, 'groups', 'labels') (expenses: forecast.touch_expenses)."""
+        now = timezone.now()
+        cls.objects.filter(user_id=user_id).update(**{f'{field}_at': now for field in fields})
+
+    def __str__(self):
+        return f"{self.user_id} stamps"
+
+# 📋 Per-user planning totals, kept up to date by signals on Label/Group writes
+ANNUAL_GROUP_CODE = 'annual_expenses'
+
+
+class PlanSummary(models.Model):
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, related_name='plan_summary')
+    # Sum of expected_monthly over the labels of every group but the annual one
+    monthly_expected = models.PositiveIntegerField(default=0)
+    # Annual labels hold a yearly amount in expected_monthly
+    annual_total = models.PositiveIntegerField(default=0)
+    annual_monthly = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def monthly_expense_total(self):
+        return self.monthly_expected + self.annual_monthly
+
+    @classmethod
+    def totals(cls, user_id):
+        annual = models.Q(group__code=ANNUAL_GROUP_CODE)
+        totals = Label.objects.alive().filter(user_id=user_id, group__is_deleted=False).aggregate(
+            annual_total=models.Sum('expected_monthly', filter=annual, default=0),
+            monthly_expected=models.Sum('expected_monthly', filter=~annual, default=0),
+        )
+        totals['annual_monthly'] = round(Decimal(totals['annual_total']) / 12, 2)
+        return totals
+
+    @classmethod
+    def for_user(cls, user):
+        summary = cls.objects.filter(user=user).first()
+        return summary or cls.recompute(user.pk)
+
+    @classmethod
+    async def afor_user(cls, user):
+        summary = await cls.objects.filter(user=user).afirst()
+        return summary or await sync_to_async(cls.recompute)(user.pk)
+
+    @classmethod
+    def recompute(cls, user_id):
+        summary, _ = cls.objects.update_or_create(user_id=user_id, defaults=cls.totals(user_id))
+        return summary
+
+    def __str__(self):
+        return f"{self.user_id} plan"
+
+# ⚙️ Background job (see expenses.jobs and `manage.py run_workers`)
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'في الانتظار'),
+        (RUNNING, 'قيد التنفيذ'),
+        (DONE, 'تم'),
+        (FAILED, 'فشل'),
+    ]
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+# 🚨 Running statistics of a label's expense amounts (Welford's algorithm), so a
+# new expense is checked for being unusually large in constant time
+class LabelStats(models.Model):
+    # Too few expenses say nothing about what is usual
+    MIN_COUNT = 5
+    # Flag amounts more than this many standard deviations above the mean...
+    Z_THRESHOLD = 3
+    # ...where the deviation is at least this share of the mean (labels with identical amounts)
+    MIN_SPREAD = 0.1
+    # recent_max shrinks by this factor on every new expense, so an old outlier fades
+    RECENT_DECAY = 0.9
+
+    label = models.OneToOneField(Label, on_delete=models.CASCADE, related_name='stats')
+    count = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0)
+    # Sum of squared differences from the mean
+    m2 = models.FloatField(default=0)
+    recent_max = models.FloatField(default=0)
+
+    @property
+    def std(self):
+        return (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0
+
+    def threshold(self):
+        return self.mean + self.Z_THRESHOLD * max(self.std, self.MIN_SPREAD * self.mean)
+
+    def is_anomaly(self, amount):
+        amount = float(amount)
+        return self.count >= self.MIN_COUNT and amount > self.threshold() and amount >= self.recent_max
+
+    def add(self, amount):
+        amount = float(amount)
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        self.recent_max = max(amount, self.recent_max * self.RECENT_DECAY)
+
+    def remove(self, amount):
+        """Undo add(amount) for an edited or deleted expense (recent_max is left as is)."""
+        amount = float(amount)
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0, 0
+            return
+        previous_mean = self.mean
+        self.count -= 1
+        self.mean = (previous_mean * (self.count + 1) - amount) / self.count
+        self.m2 = max(self.m2 - (amount - previous_mean) * (amount - self.mean), 0)
+
+    def merge(self, other):
+        """Fold in the stats of another label whose expenses move here (label merge)."""
+        count = self.count + other.count
+        if not other.count:
+            return
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.recent_max = max(self.recent_max, other.recent_max)
+
+    @classmethod
+    def add_many(cls, amounts_by_label):
+        """add() for expenses created in bulk: {label_id: [amount, ...]}, in a few queries."""
+        stats = cls.locked(amounts_by_label)
+        for label_id, amounts in amounts_by_label.items():
+            for amount in amounts:
+                stats[label_id].add(amount)
+        cls.objects.bulk_update(stats.values(), ['count', 'mean', 'm2', 'recent_max'], batch_size=500)
+
+    @classmethod
+    def locked(cls, label_ids):
+        """for_label() for many labels at once: {label_id: stats}, in two queries."""
+        cls.objects.bulk_create([cls(label_id=label_id) for label_id in label_ids], ignore_conflicts=True)
+        return cls.objects.select_for_update().in_bulk(label_ids, field_name='label_id')
+
+    @classmethod
+    def add_expenses(cls, expenses):
+        """What save_expense does, for new expenses about to be bulk created: flag each one, then add it."""
+        stats = cls.locked({expense.label_id for expense in expenses})
+        for expense in expenses:
+            expense.is_flagged = stats[expense.label_id].is_anomaly(expense.amount)
+            stats[expense.label_id].add(expense.amount)
+        cls.objects.bulk_update(stats.values(), ['count', 'mean', 'm2', 'recent_max'], batch_size=500)
+
+    @classmethod
+    def remove_expenses(cls, expenses):
+        stats = cls.locked({expense.label_id for expense in expenses})
+        for expense in expenses:
+            stats[expense.label_id].remove(expense.amount)
+        cls.objects.bulk_update(stats.values(), ['count', 'mean', 'm2', 'recent_max'], batch_size=500)
+
+    @classmethod
+    def for_label(cls, label_id):
+        """Locked for the rest of the transaction, so concurrent writes on a label do not lose updates."""
+        cls.objects.get_or_create(label_id=label_id)
+        return cls.objects.select_for_update().get(label_id=label_id)
+
+    def __str__(self):
+        return f"{self.label_id} stats ({self.count})"
@@ -0,0 +1,88 @@
+# purge.py
+# 🧹 Deleting an account (or only its data) table by table. user.delete() goes
+# through Django's collector, which loads every related row to send its signals
+# and holds the write lock until the last one is gone; here each table is
+# emptied with plain DELETEs of at most `batch_size` rows, every batch its own
+# transaction, so other requests get the database between batches. Nothing is
+# signalled: the caches the receivers would update are reset at the end.
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from .caching import bump_categories_version
+from .forecast import FORECAST_KEY
+from .models import (
+    CustomUser, DataStamp, Expense, Group, Income, Job, Label, LabelStats, PlanSummary, RecurrenceRule, Tombstone,
+)
+from .search import SEARCH_TABLE, is_indexed, owned_by
+from .utils import create_default_categories
+
+PURGE_BATCH = 2000
+# Seconds to sleep between batches, for the writers waiting on the lock
+PURGE_PAUSE = 0.02
+
+
+def purge_tables():
+    """(table, key column, WHERE clause on the user id): rows pointing at others first."""
+    q = connection.ops.quote_name
+    label_ids = f"{q('label_id')} IN (SELECT {q('id')} FROM {q(Label._meta.db_table)} WHERE {q('user_id')} = %s)"
+    tables = [(SEARCH_TABLE, 'rowid', owned_by())] if is_indexed() else []
+    tables.append((LabelStats._meta.db_table, 'id', label_ids))
+    for model in (Expense, Income, RecurrenceRule, Label, Group, Tombstone, PlanSummary, DataStamp, Job):
+        tables.append((model._meta.db_table, 'id', f"{q('user_id')} = %s"))
+    return tables
+
+
+def count_rows(user_id):
+    """What a purge would delete: {table: rows} (the dry run)."""
+    counts = {}
+    with connection.cursor() as cursor:
+        for table, _, where in purge_tables():
+            cursor.execute(f"SELECT count(*) FROM {connection.ops.quote_name(table)} WHERE {where}", [user_id])
+            counts[table] = cursor.fetchone()[0]
+    return counts
+
+
+def delete_batches(table, key, where, user_id, batch_size, pause):
+    q = connection.ops.quote_name
+    sql = (
+        f"DELETE FROM {q(table)} WHERE {key} IN "
+        f"(SELECT {key} FROM {q(table)} WHERE {where} LIMIT %s)"
+    )
+    deleted = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(sql, [user_id, batch_size])
+            count = cursor.rowcount
+        deleted += count
+        if count < batch_size:
+            return deleted
+        time.sleep(pause)
+
+
+def purge_user(user_id, keep_account=False, batch_size=PURGE_BATCH, pause=PURGE_PAUSE):
+    """
+    Delete the user's rows, then the user itself unless `keep_account` (the
+    account then starts over with the default groups). Must not run inside a
+    transaction, or the batches would not release the lock; an interrupted purge
+    can simply be run again. Returns {table: deleted rows}.
+    """
+    if connection.in_atomic_block:
+        raise RuntimeError("purge_user() commits every batch: call it outside transaction.atomic()")
+
+    deleted = {}
+    for table, key, where in purge_tables():
+        deleted[table] = delete_batches(table, key, where, user_id, batch_size, pause)
+
+    cache.delete(FORECAST_KEY.format(user_id=user_id))
+    bump_categories_version(user_id)
+
+    if keep_account:
+        user = CustomUser.objects.get(pk=user_id)
+        with transaction.atomic():
+            create_default_categories(user)
+    else:
+        # Only the user row and the auth tables are left: the collector has nothing to load
+        deleted[CustomUser._meta.db_table], _ = CustomUser.objects.filter(pk=user_id).delete()
+    return deleted
@@ -0,0 +1,39 @@
+# rendering.py
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+
+# Sent by static/js/fragments.js when only the changed regions of a page are wanted
+FRAGMENT_HEADER = 'X-Fragment'
+
+
+def is_fragment_request(request):
+    return request.headers.get(FRAGMENT_HEADER) == '1'
+
+
+def render_view(request, template_name, context=None, fragment_template=None):
+    """
+    Render with the engine configured for the current view.
+
+    Views listed (by URL name) in settings.JINJA2_VIEWS render the ported
+    template from expenses/jinja2/, everything else uses the Django engine.
+    When fragment_template is given, fragment requests get that template
+    instead of the full page.
+    """
+    url_name = request.resolver_match.url_name if request.resolver_match else None
+    using = 'jinja2' if url_name in settings.JINJA2_VIEWS else 'django'
+
+    if fragment_template is None:
+        return render(request, template_name, context, using=using)
+
+    if is_fragment_request(request):
+        template_name = fragment_template
+    response = render(request, template_name, context, using=using)
+    patch_vary_headers(response, [FRAGMENT_HEADER])
+    return response
+
+
+async def arender_view(request, template_name, context=None, fragment_template=None):
+    """render_view for async views: templates may still touch the ORM (cached nav fragments)."""
+    return await sync_to_async(render_view)(request, template_name, context, fragment_template)
@@ -0,0 +1,172 @@
+# search.py
+# 🔎 Full-text search over expenses (note, label name, group name). The text is
+# normalized in Python (Arabic letter variants, diacritics, digits) and kept in
+# a side table synced on write (see signals.py): an FTS5 virtual table on
+# SQLite, a tsvector GIN index on PostgreSQL. Other databases fall back to
+# icontains lookups.
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Expense
+
+SEARCH_TABLE = 'expenses_search'
+
+# Harakat, superscript alef, Quranic marks and tatweel carry no meaning for search
+ARABIC_MARKS = re.compile('[\u0610-\u061a\u0640\u064b-\u065f\u0670\u06d6-\u06ed]')
+LETTER_VARIANTS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+    **{chr(0x0660 + d): str(d) for d in range(10)},  # Arabic-Indic digits
+    **{chr(0x06f0 + d): str(d) for d in range(10)},  # Persian digits
+})
+TOKEN = re.compile(r'\w+')
+# Definite article, alone or after a conjunction/preposition: "الكهرباء" is also found as "كهرباء"
+ARTICLE = re.compile(r'^(?:[وفبكل]?ال|لل)(?=\w{2})')
+
+
+def normalize(text):
+    return ARABIC_MARKS.sub('', text or '').translate(LETTER_VARIANTS).lower()
+
+
+def tokens(text):
+    return TOKEN.findall(normalize(text))
+
+
+def indexed_text(text):
+    """The normalized tokens, plus each one without its article."""
+    words = []
+    for word in tokens(text):
+        words.append(word)
+        if (bare := ARTICLE.sub('', word)) != word:
+            words.append(bare)
+    return ' '.join(words)
+
+
+# 🧱 Side table
+def create_table(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        # The owner is an indexed token ("u<id>", see owner()) so a query only reads
+        # that user's documents; short prefixes, the commonest as-you-type queries,
+        # have their own index. bm25 weights follow the column order: owner, note, label, group
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+            "owner, note, label, grp, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE {SEARCH_TABLE} (rowid bigint PRIMARY KEY, user_id bigint NOT NULL, "
+            "note text NOT NULL, label text NOT NULL, grp text NOT NULL, document tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', label), 'A') || setweight(to_tsvector('simple', grp), 'B') || "
+            "setweight(to_tsvector('simple', note), 'B')) STORED)"
+        )
+        schema_editor.execute(f"CREATE INDEX {SEARCH_TABLE}_document ON {SEARCH_TABLE} USING gin (document)")
+        schema_editor.execute(f"CREATE INDEX {SEARCH_TABLE}_user ON {SEARCH_TABLE} (user_id)")
+
+
+def drop_table(schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+
+def is_indexed():
+    return connection.vendor in ('sqlite', 'postgresql')
+
+
+def owner(user_id):
+    return f'u{user_id}'
+
+
+def owned_by():
+    """WHERE clause for the indexed rows of the user id given as its one parameter."""
+    if connection.vendor == 'sqlite':
+        return f"{SEARCH_TABLE} MATCH 'owner : u' || %s"
+    return 'user_id = %s'
+
+
+def index_rows(rows):
+    """rows: (expense id, user id, note, label name, group name)."""
+    if not is_indexed() or not rows:
+        return
+    sqlite = connection.vendor == 'sqlite'
+    user_column = 'owner' if sqlite else 'user_id'
+    rows = [
+        (pk, owner(user_id) if sqlite else user_id, indexed_text(note), indexed_text(label), indexed_text(group))
+        for pk, user_id, note, label, group in rows
+    ]
+    with connection.cursor() as cursor:
+        # FTS5 has no upsert: replace = delete + insert
+        cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(row[0],) for row in rows])
+        cursor.executemany(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, {user_column}, note, label, grp) VALUES (%s, %s, %s, %s, %s)", rows
+        )
+
+
+def index_expenses(queryset):
+    """(Re)index the expenses of a queryset, e.g. after a label rename or a bulk_create."""
+    rows = queryset.values_list('pk', 'user_id', 'note', 'label__name', 'label__group__name').order_by()
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        batch.append(row)
+        if len(batch) == 2000:
+            index_rows(batch)
+            batch = []
+    index_rows(batch)
+
+
+def unindex(pks):
+    if is_indexed() and pks:
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [(pk,) for pk in pks])
+
+
+# 🔎 Queries
+def search(user, query, offset=0, limit=20):
+    """Best matches first: (expenses, total number of matches)."""
+    # Each word as typed or without what looks like an article: "والدين" is
+    # indexed as is inside "بر الوالدين", but would also lose "وال" to ARTICLE
+    forms = [sorted({word, ARTICLE.sub('', word)}) for word in tokens(query)]
+    if not forms:
+        return [], 0
+
+    if connection.vendor == 'sqlite':
+        # Every word must match, as a token prefix of the note, label or group, in the user's rows
+        words = ' AND '.join('(' + ' OR '.join(f'"{form}"*' for form in word) + ')' for word in forms)
+        match = f'owner : "{owner(user.pk)}" AND {{note label grp}} : ({words})'
+        where = f"{SEARCH_TABLE} MATCH %s"
+        params = [match]
+        rank = f"bm25({SEARCH_TABLE}, 0, 1.0, 4.0, 2.0)"
+    elif connection.vendor == 'postgresql':
+        match = ' & '.join('(' + ' | '.join(f"{form}:*" for form in word) + ')' for word in forms)
+        where = "document @@ to_tsquery('simple', %s) AND user_id = %s"
+        params = [match, user.pk]
+        rank = "-ts_rank(document, to_tsquery('simple', %s))"
+    else:
+        # Substrings: the shortest form matches both
+        return fallback_search(user, [min(word, key=len) for word in forms], offset, limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {where}", params)
+        total = cursor.fetchone()[0]
+        rank_params = [match] if connection.vendor == 'postgresql' else []
+        cursor.execute(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {where} ORDER BY {rank}, rowid DESC LIMIT %s OFFSET %s",
+            params + rank_params + [limit, offset],
+        )
+        pks = [row[0] for row in cursor.fetchall()]
+
+    expenses = Expense.objects.select_related('label', 'label__group').in_bulk(pks)
+    return [expenses[pk] for pk in pks if pk in expenses], total
+
+
+def fallback_search(user, words, offset, limit):
+    # Unranked: newest first, each word in the note, label or group name (stored text is not normalized)
+    queryset = Expense.objects.filter(user=user).select_related('label', 'label__group')
+    for word in words:
+        queryset = queryset.filter(
+            Q(note__icontains=word) | Q(label__name__icontains=word) | Q(label__group__name__icontains=word)
+        )
+    queryset = queryset.order_by('-date', '-pk')
+    return list(queryset[offset:offset + limit]), queryset.count()
@@ -0,0 +1,184 @@
+# serializers.py
+# 🔌 Serializers of the REST API (see api_views.py). Related rows are checked
+# against the user's own groups/labels, loaded once per request so a bulk write
+# of hundreds of items does not look each one up; many=True writes go through
+# BulkListSerializer.
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Expense, Group, Income, Label, LabelStats
+from .signals import after_bulk_write
+from .views import save_expense
+
+
+class SparseFieldsMixin:
+    """`?fields=id,amount` on a GET keeps only those fields in the response."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method != 'GET' or not request.query_params.get('fields'):
+            return
+        wanted = set(request.query_params['fields'].split(','))
+        for name in set(self.fields) - wanted:
+            self.fields.pop(name)
+
+
+class UserRowField(serializers.PrimaryKeyRelatedField):
+    """A group/label id of the requesting user, not deleted."""
+
+    def get_queryset(self):
+        return super().get_queryset().for_user(self.context['request'].user).alive()
+
+    def to_internal_value(self, data):
+        # With many=True, one field instance validates every item: load the rows once
+        if not hasattr(self, 'rows'):
+            self.rows = self.get_queryset().in_bulk()
+        if isinstance(data, bool) or not isinstance(data, (int, str)) or not str(data).isdigit():
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if int(data) not in self.rows:
+            self.fail('does_not_exist', pk_value=data)
+        return self.rows[int(data)]
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    many=True writes. For an update, `instance` is {pk: row} and every item of
+    the data carries the id of the row it changes.
+    """
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            # Uniqueness checks exclude the row being changed
+            self.child.instance = self.instance[int(data['id'])]
+        return super().run_child_validation(data)
+
+    def update(self, instance, validated_data):
+        return self.update_rows([instance[int(item['id'])] for item in self.initial_data], validated_data)
+
+    def update_rows(self, rows, validated_data):
+        return [self.child.update(row, attrs) for row, attrs in zip(rows, validated_data)]
+
+
+class IncomeListSerializer(BulkListSerializer):
+    def create(self, validated_data):
+        incomes = Income.objects.bulk_create([Income(**attrs) for attrs in validated_data], batch_size=500)
+        after_bulk_write(incomes=incomes)
+        return incomes
+
+
+class IncomeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Income
+        fields = ['id', 'amount', 'date', 'updated_at']
+        list_serializer_class = IncomeListSerializer
+
+
+class ExpenseListSerializer(BulkListSerializer):
+    def create(self, validated_data):
+        expenses = [Expense(**attrs) for attrs in validated_data]
+        LabelStats.add_expenses(expenses)
+        Expense.objects.bulk_create(expenses, batch_size=500)
+        after_bulk_write(expenses=expenses)
+        return expenses
+
+    def update_rows(self, rows, validated_data):
+        expenses, changed, previous = [], [], []
+        for expense, attrs in zip(rows, validated_data):
+            before = (expense.label_id, expense.amount)
+            for name, value in attrs.items():
+                setattr(expense, name, value)
+            expenses.append(expense)
+            # Like save_expense: only a new label or amount moves the stats
+            if before != (expense.label_id, expense.amount):
+                changed.append(expense)
+                previous.append(Expense(label_id=before[0], amount=before[1]))
+        if changed:
+            LabelStats.remove_expenses(previous)
+            LabelStats.add_expenses(changed)
+        now = timezone.now()
+        for expense in expenses:
+            expense.updated_at = now
+        Expense.objects.bulk_update(
+            expenses, ['label', 'date', 'amount', 'note', 'is_flagged', 'updated_at'], batch_size=500,
+        )
+        after_bulk_write(expenses=expenses)
+        return expenses
+
+
+class ExpenseSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    label = UserRowField(queryset=Label.objects.all())
+
+    class Meta:
+        model = Expense
+        fields = ['id', 'label', 'date', 'amount', 'note', 'is_flagged', 'updated_at']
+        read_only_fields = ['is_flagged']
+        list_serializer_class = ExpenseListSerializer
+
+    def create(self, validated_data):
+        expense = Expense(**validated_data)
+        save_expense(expense)
+        return expense
+
+    def update(self, instance, validated_data):
+        previous = (instance.label_id, instance.amount)
+        for name, value in validated_data.items():
+            setattr(instance, name, value)
+        save_expense(instance, previous)
+        return instance
+
+
+class GroupSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Group
+        fields = ['id', 'name', 'order', 'code', 'protected', 'updated_at']
+        read_only_fields = ['order', 'code', 'protected']
+        list_serializer_class = BulkListSerializer
+
+    def validate_name(self, name):
+        # Same rules as GroupForm
+        if self.instance and self.instance.protected:
+            return self.instance.name
+        duplicates = Group.objects.filter(user=self.context['request'].user, name__iexact=name)
+        if self.instance:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError("❌ هذه التسمية موجودة بالفعل.")
+        return name
+
+    def create(self, validated_data):
+        user = validated_data['user']
+        last = Group.objects.for_user(user).alive().aggregate(Max('order'))['order__max']
+        return super().create({**validated_data, 'order': (last or 0) + 1})
+
+
+class LabelSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    group = UserRowField(queryset=Group.objects.all())
+
+    class Meta:
+        model = Label
+        fields = ['id', 'group', 'name', 'expected_monthly', 'order', 'updated_at']
+        read_only_fields = ['order']
+        list_serializer_class = BulkListSerializer
+
+    def validate(self, attrs):
+        # Same rules as LabelForm
+        group_id = attrs['group'].pk if 'group' in attrs else self.instance.group_id
+        name = attrs['name'] if 'name' in attrs else self.instance.name
+        # Deleted labels too: (user, group, name) stays unique while they can be restored
+        duplicates = Label.objects.for_user(self.context['request'].user).filter(group_id=group_id, name__iexact=name)
+        if self.instance:
+            duplicates = duplicates.exclude(pk=self.instance.pk)
+        duplicates = list(duplicates.values_list('name', 'is_deleted'))
+        if any(not is_deleted for _, is_deleted in duplicates):
+            raise serializers.ValidationError("❌ هذا الاسم موجود بالفعل ضمن هذه المجموعة.")
+        if (name, True) in duplicates:
+            raise serializers.ValidationError("❌ توجد تسمية محذوفة بهذا الاسم ضمن هذه المجموعة، قم باسترجاعها بدلاً من ذلك.")
+        return attrs
+
+    def create(self, validated_data):
+        last = Label.objects.for_user(validated_data['user']).alive().filter(
+            group=validated_data['group'],
+        ).aggregate(Max('order'))['order__max']
+        return super().create({**validated_data, 'order': (last or 0) + 1})
@@ -1,16 +1,250 @@
-# from django.db.models.signals import post_save
-# from django.dispatch import receiver
-# from .models import Label, Group, CustomUser
-
-# @receiver(post_save, sender=Label)
-# def update_annual_expense_totals(sender, instance, **kwargs):
-#     group = instance.group
-#     user = instance.user
-
-#     if group.name == 'النفقات السنوية':
-#         labels = Label.objects.filter(group=group, user=user, is_deleted=False)
-#         total = sum(label.expected_monthly for label in labels)
-
-#         user.expected_annual_expenses = total
-#         user.expected_annual_divided_monthly = round(total / 12)
-#         user.save()
+from collections import defaultdict
+
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .caching import bump_categories_version
+from .forecast import touch_expenses
+from .search import index_expenses, unindex
+from .live import expense_deltas, get_broadcaster, income_deltas, merge
+from .models import CustomUser, DataStamp, Expense, Group, Income, Label, PlanSummary, Tombstone
+from .warmup import schedule_warmup
+
+
+def saves_any(update_fields, attnames):
+    """Whether a save with these update_fields (None: every field) writes one of `attnames`."""
+    if update_fields is None:
+        return True
+    names = {attname.removesuffix('_id') for attname in attnames}
+    return any(field.removesuffix('_id') in names for field in update_fields)
+
+
+def deleted_with_user(origin):
+    return isinstance(origin, CustomUser) or getattr(origin, 'model', None) is CustomUser
+
+
+# 🧊 Invalidate cached category fragments (navigation selectors, list cards)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Label)
+@receiver(post_delete, sender=Label)
+def invalidate_category_fragments(sender, instance, **kwargs):
+    bump_categories_version(instance.user_id)
+
+
+# 🕒 Last-modified stamps behind the ETag / Last-Modified headers
+STAMP_FIELDS = {Expense: 'expenses', Income: 'incomes', Group: 'groups', Label: 'labels'}
+
+
+# Expenses are stamped by publish_deltas, through touch_expenses: their cached forecasts move with the stamp
+@receiver(post_save, sender=Income)
+@receiver(post_delete, sender=Income)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Label)
+@receiver(post_delete, sender=Label)
+def touch_data_stamp(sender, instance, **kwargs):
+    DataStamp.touch(instance.user_id, STAMP_FIELDS[sender])
+
+
+# 🪦 Hard deletes, for sync clients (STAMP_FIELDS names are the sync kinds too)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Group)
+@receiver(post_delete, sender=Label)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    # Rows deleted along with their user have nobody left to sync them
+    if deleted_with_user(origin):
+        return
+    Tombstone.objects.create(user_id=instance.user_id, kind=STAMP_FIELDS[sender], object_id=instance.pk)
+
+
+# 📋 Planning totals shown by planning_view
+# What PlanSummary.totals() reads from each row
+PLAN_FIELDS = {Group: ('code', 'is_deleted'), Label: ('group_id', 'expected_monthly', 'is_deleted')}
+
+
+class RecomputePlanSummary:
+    """on_commit callback, so a transaction saving many labels recomputes the totals once."""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        PlanSummary.recompute(self.user_id)
+
+    @classmethod
+    def schedule(cls, user_id):
+        callbacks = transaction.get_connection().run_on_commit
+        if not any(isinstance(func, cls) and func.user_id == user_id and not func.done for _, func, *_ in callbacks):
+            transaction.on_commit(cls(user_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Label)
+@receiver(post_delete, sender=Label)
+def update_plan_summary(sender, instance, created=False, update_fields=None, origin=None, **kwargs):
+    if kwargs['signal'] is post_delete:
+        if deleted_with_user(origin):
+            return
+    elif not created:
+        fields = PLAN_FIELDS[sender]
+        if not saves_any(update_fields, fields):
+            return
+        # Reordering and renaming leave the totals as they are
+        previous = instance.loaded_values(*fields)
+        if previous is not None and all(getattr(instance, field) == value for field, value in previous.items()):
+            return
+    RecomputePlanSummary.schedule(instance.user_id)
+
+
+# 📡 Deltas for the dashboards listening on the live updates stream, and for the cached forecasts
+DELTAS = {Expense: expense_deltas, Income: income_deltas}
+# What the deltas are computed from
+DELTA_FIELDS = {Expense: ('label_id', 'date', 'amount'), Income: ('date', 'amount')}
+
+
+@receiver(pre_save, sender=Expense)
+@receiver(pre_save, sender=Income)
+def remember_previous_row(sender, instance, update_fields=None, **kwargs):
+    if not saves_any(update_fields, DELTA_FIELDS[sender]):
+        return
+    previous = instance.loaded_values(*DELTA_FIELDS[sender])
+    # Only rows not read through the ORM (or read with .only()) cost a query
+    if previous is None and instance.pk is not None:
+        previous = sender.objects.filter(pk=instance.pk).values(*DELTA_FIELDS[sender]).first()
+    instance._previous_row = sender(**previous) if previous else None
+
+
+@receiver(post_save, sender=Expense)
+@receiver(post_save, sender=Income)
+@receiver(post_delete, sender=Expense)
+@receiver(post_delete, sender=Income)
+def publish_deltas(sender, instance, update_fields=None, **kwargs):
+    if not saves_any(update_fields, DELTA_FIELDS[sender]):
+        events = []
+    elif kwargs['signal'] is post_delete:
+        events = DELTAS[sender](instance, None)
+    else:
+        events = DELTAS[sender](getattr(instance, '_previous_row', None), instance)
+    user_id = instance.user_id
+    if sender is Expense:
+        touch_expenses({user_id: events})
+    if events:
+        transaction.on_commit(lambda: get_broadcaster().publish(user_id, events))
+
+
+# 📦 bulk_create/bulk_update send no post_save: callers run this once per batch instead
+def after_bulk_write(expenses=(), incomes=()):
+    """
+    Do what the Expense/Income receivers above would (LabelStats is the caller's)
+    for rows with their ids. Updated rows are diffed against their loaded values,
+    like remember_previous_row does; rows without any are new.
+    """
+    DataStamp.objects.filter(user_id__in={income.user_id for income in incomes}).update(incomes_at=timezone.now())
+
+    # One query for the labels of the whole batch, and one delta per cell for each user
+    labels = Label.objects.select_related('group').in_bulk({expense.label_id for expense in expenses})
+    expense_events, income_events = defaultdict(list), defaultdict(list)
+    for expense in expenses:
+        previous = expense.loaded_values(*DELTA_FIELDS[Expense])
+        new = Expense(label=labels[expense.label_id], date=expense.date, amount=expense.amount)
+        expense_events[expense.user_id] += expense_deltas(Expense(**previous) if previous else None, new)
+        expense.remember_loaded_values(DELTA_FIELDS[Expense])
+    for income in incomes:
+        previous = income.loaded_values(*DELTA_FIELDS[Income])
+        income_events[income.user_id] += income_deltas(Income(**previous) if previous else None, income)
+        income.remember_loaded_values(DELTA_FIELDS[Income])
+    publish_batch(expense_events, income_events)
+    if expenses:
+        index_expenses(Expense.objects.filter(pk__in=[expense.pk for expense in expenses]))
+
+
+def bulk_delete(expenses=(), incomes=()):
+    """
+    Delete these rows with one DELETE per table, and do what the post_delete
+    receivers above would (LabelStats is the caller's) once for the batch.
+    """
+    expense_events, income_events = defaultdict(list), defaultdict(list)
+    for expense in expenses:
+        expense_events[expense.user_id] += expense_deltas(expense, None)
+    for income in incomes:
+        income_events[income.user_id] += income_deltas(income, None)
+    DataStamp.objects.filter(user_id__in=income_events).update(incomes_at=timezone.now())
+    Tombstone.objects.bulk_create([
+        Tombstone(user_id=row.user_id, kind=STAMP_FIELDS[type(row)], object_id=row.pk)
+        for row in [*expenses, *incomes]
+    ], batch_size=500)
+    # No cascades to run: nothing references an expense or an income
+    for model, rows in ((Expense, expenses), (Income, incomes)):
+        if rows:
+            queryset = model.objects.filter(pk__in=[row.pk for row in rows])
+            queryset._raw_delete(queryset.db)
+    unindex([expense.pk for expense in expenses])
+    publish_batch(expense_events, income_events)
+
+
+def publish_batch(expense_events, income_events):
+    """Stamp, publish and warm up once per user for a batch: {user_id: [delta, ...]} of each type."""
+    expense_events = {user_id: merge(user_events) for user_id, user_events in expense_events.items()}
+    if expense_events:
+        touch_expenses(expense_events)
+    events = {
+        user_id: expense_events.get(user_id, []) + merge(income_events.get(user_id, []))
+        for user_id in expense_events.keys() | income_events.keys()
+    }
+
+    def after_commit():
+        for user_id, user_events in events.items():
+            if user_events:
+                get_broadcaster().publish(user_id, user_events)
+            # Every cached page of these users is stale now: recompute them before they are opened
+            schedule_warmup(user_id)
+
+    transaction.on_commit(after_commit)
+
+
+# 🔥 Most logins go straight to home, then dashboard/planning: compute them ahead
+@receiver(user_logged_in)
+def warm_up_after_login(sender, request, user, **kwargs):
+    # Once the login (and whatever the request wrote with it) is committed
+    user_id = user.pk
+    transaction.on_commit(lambda: schedule_warmup(user_id))
+
+
+# 🔎 Search index (expenses.search): an expense's row holds its label and group names
+@receiver(post_save, sender=Expense)
+def index_expense(sender, instance, **kwargs):
+    index_expenses(Expense.objects.filter(pk=instance.pk))
+
+
+@receiver(post_delete, sender=Expense)
+def unindex_expense(sender, instance, **kwargs):
+    unindex([instance.pk])
+
+
+@receiver(pre_save, sender=Label)
+@receiver(pre_save, sender=Group)
+def remember_previous_name(sender, instance, update_fields=None, **kwargs):
+    if not saves_any(update_fields, ['name']):
+        return
+    previous = instance.loaded_values('name')
+    if previous is None and instance.pk is not None:
+        previous = sender.objects.filter(pk=instance.pk).values('name').first()
+    instance._previous_name = previous['name'] if previous else None
+
+
+@receiver(post_save, sender=Label)
+@receiver(post_save, sender=Group)
+def reindex_renamed(sender, instance, created, update_fields=None, **kwargs):
+    if created or not saves_any(update_fields, ['name']):
+        return
+    if instance.name != instance._previous_name:
+        lookup = 'label' if sender is Label else 'label__group'
+        index_expenses(Expense.objects.filter(**{lookup: instance}))
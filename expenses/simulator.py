@@ -0,0 +1,151 @@
+# simulator.py
+# 🧪 What-if budget simulator. The user's spend per label over the last
+# HISTORY_MONTHS months is loaded once (a few grouped queries) into arrays; a
+# scenario is then one row of small matrices, so hundreds of them are evaluated
+# together with NumPy instead of going back to the database for each one.
+from datetime import date
+
+import numpy as np
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+from .caching import get_or_compute, stamped_key
+from .models import Expense, Group, Income, Label
+
+SIMULATOR_SOURCES = ('expenses', 'incomes', 'groups', 'labels')
+HISTORY_MONTHS = 12
+HORIZONS = (12, 24, 36, 48, 60)
+# Extra cut applied to one group at a time in the sensitivity table, in percent
+SENSITIVITY_STEPS = tuple(range(0, 55, 5))
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def load_history(user, today=None):
+    """
+    Arrays the scenarios are evaluated against:
+    - seasonal: (labels, 12) spend per label for each calendar month (0 = January)
+    - label_groups: index of each label's group in group_ids
+    - income: average monthly income, balance: all income minus all expenses
+    """
+    this_month = (today or date.today()).replace(day=1)
+    window_start = add_months(this_month, -HISTORY_MONTHS)
+
+    groups = list(Group.objects.for_user(user).alive().order_by('order'))
+    labels = list(
+        Label.objects.for_user(user).alive().filter(group__in=groups)
+        .select_related('group').order_by('group__order', 'order')
+    )
+    in_window = {'user': user, 'date__gte': window_start, 'date__lt': this_month}
+    spent_rows = (
+        Expense.objects.filter(label__in=labels, **in_window)
+        .annotate(month=TruncMonth('date'))
+        .values_list('label_id', 'month')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    income_rows = (
+        Income.objects.filter(**in_window)
+        .annotate(month=TruncMonth('date'))
+        .values_list('month')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+
+    def position(month):
+        return (month.year - window_start.year) * 12 + month.month - window_start.month
+
+    label_index = {label.id: i for i, label in enumerate(labels)}
+    spent = np.zeros((len(labels), HISTORY_MONTHS))
+    for label_id, month, total in spent_rows:
+        spent[label_index[label_id], position(month)] = total
+    income = np.zeros(HISTORY_MONTHS)
+    for month, total in income_rows:
+        income[position(month)] = total
+
+    # Months before the user's first record say nothing about their habits: leave them out
+    recorded = np.flatnonzero(spent.sum(axis=0) + income)
+    covered = np.arange(HISTORY_MONTHS) >= (recorded[0] if recorded.size else HISTORY_MONTHS)
+    expected = np.array([label.planned_monthly for label in labels], dtype=float)
+    monthly_income = 0
+    if covered.any():
+        spent[:, ~covered] = spent[:, covered].mean(axis=1, keepdims=True)
+        monthly_income = income[covered].mean()
+    # Labels with no spending yet are projected at their planned amount
+    unused = ~spent.any(axis=1)
+    spent[unused] = expected[unused, None]
+    if not monthly_income:
+        monthly_income = user.expected_monthly_income or 0
+
+    seasonal = np.empty_like(spent)
+    seasonal[:, (window_start.month - 1 + np.arange(HISTORY_MONTHS)) % 12] = spent
+
+    total_income = Income.objects.filter(user=user).aggregate(total=Sum('amount'))['total'] or 0
+    total_spent = Expense.objects.filter(user=user).aggregate(total=Sum('amount'))['total'] or 0
+
+    group_index = {group.id: i for i, group in enumerate(groups)}
+    return {
+        'start': this_month,
+        'group_ids': [group.id for group in groups],
+        'group_names': [group.name for group in groups],
+        'label_groups': np.array([group_index[label.group_id] for label in labels], dtype=int),
+        'seasonal': seasonal,
+        'income': float(monthly_income),
+        'balance': float(total_income - total_spent),
+    }
+
+
+def cached_history(user, stamp):
+    key = stamped_key('simulator', user.pk, stamp, SIMULATOR_SOURCES, date.today().isoformat())
+    return get_or_compute(key, lambda: load_history(user))
+
+
+def scenario(cuts=None, income_change=0, new_labels=()):
+    """
+    One what-if: `cuts` maps group id → percent cut of that group's spending
+    (negative to spend more), `income_change` is a percent change of income and
+    `new_labels` are the monthly amounts of recurring labels not created yet.
+    """
+    return {'cuts': cuts or {}, 'income_change': income_change, 'extra': sum(new_labels)}
+
+
+def evaluate(history, scenarios, horizon):
+    """
+    Project every scenario over `horizon` months at once; each array has one
+    row per scenario and one column per month.
+    """
+    group_ids = history['group_ids']
+    cuts = np.array([[s['cuts'].get(group_id, 0) for group_id in group_ids] for s in scenarios],
+                    dtype=float).reshape(len(scenarios), len(group_ids))
+    factors = np.clip(1 - cuts / 100, 0, None)[:, history['label_groups']]      # (scenarios, labels)
+    calendar = (history['start'].month - 1 + np.arange(horizon)) % 12
+    schedule = history['seasonal'][:, calendar]                                  # (labels, months)
+
+    extra = np.array([s['extra'] for s in scenarios], dtype=float)
+    income = history['income'] * (1 + np.array([s['income_change'] for s in scenarios], dtype=float) / 100)
+
+    spending = factors @ schedule + extra[:, None]
+    savings = np.cumsum(income[:, None] - spending, axis=1)
+    return {
+        'months': [add_months(history['start'], i).strftime('%Y-%m') for i in range(horizon)],
+        'income': income,
+        'spending': spending,
+        'savings': savings,
+        'balance': history['balance'] + savings,
+    }
+
+
+def sensitivity(history, base, horizon):
+    """End-of-horizon balance when one more group is cut by each of SENSITIVITY_STEPS, on top of `base`."""
+    scenarios = [
+        {**base, 'cuts': {**base['cuts'], group_id: base['cuts'].get(group_id, 0) + step}}
+        for group_id in history['group_ids']
+        for step in SENSITIVITY_STEPS
+    ]
+    if not scenarios:
+        return np.zeros((0, len(SENSITIVITY_STEPS)))
+    final = evaluate(history, scenarios, horizon)['balance'][:, -1]
+    return final.reshape(len(history['group_ids']), len(SENSITIVITY_STEPS))
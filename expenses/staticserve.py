@@ -0,0 +1,48 @@
+# staticserve.py
+import mimetypes
+import re
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+
+# Files named by ManifestStaticFilesStorage carry a 12 character content hash
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+SHORT = 'public, max-age=3600'
+
+
+def serve(request, path):
+    """
+    Serve collected static files for deployments without a front web server.
+
+    Picks the precompressed .br/.gz sibling written by collectstatic when the
+    client accepts it, and lets hashed files be cached for a year.
+    """
+    try:
+        fullpath = Path(safe_join(settings.STATIC_ROOT, path))
+    except SuspiciousFileOperation:
+        raise Http404(path)
+    if not fullpath.is_file():
+        raise Http404(path)
+
+    content_type = mimetypes.guess_type(fullpath.name)[0] or 'application/octet-stream'
+    accept = request.headers.get('Accept-Encoding', '')
+    encoding = None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        variant = fullpath.with_name(fullpath.name + suffix)
+        if candidate in accept and variant.is_file():
+            fullpath, encoding = variant, candidate
+            break
+
+    response = FileResponse(fullpath.open('rb'), content_type=content_type)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    patch_vary_headers(response, ('Accept-Encoding',))
+    response.headers['Cache-Control'] = IMMUTABLE if HASHED_NAME.search(path) else SHORT
+    response.headers['Last-Modified'] = http_date(fullpath.stat().st_mtime)
+    return response
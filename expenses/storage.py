@@ -0,0 +1,32 @@
+# storage.py
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from .middleware import brotli
+
+PRECOMPRESSED_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.map')
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hashed file names plus .gz (and .br when brotli is installed) siblings, written at collectstatic."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not dry_run and hashed_name and not isinstance(processed, Exception):
+                if hashed_name.endswith(PRECOMPRESSED_EXTENSIONS):
+                    self.write_compressed(hashed_name)
+            yield name, hashed_name, processed
+
+    def write_compressed(self, name):
+        with self.open(name) as f:
+            data = f.read()
+        variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli:
+            variants['.br'] = brotli.compress(data, quality=11)
+        for suffix, compressed in variants.items():
+            if len(compressed) < len(data):
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
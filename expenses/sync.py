@@ -0,0 +1,137 @@
+# sync.py
+# 🔄 Delta sync for offline clients (GET/POST /api/v1/sync/, see api_views.SyncView).
+# A pull returns the rows changed since the client's token (updated_at) and the
+# ids deleted since (soft-deleted groups/labels, Tombstone rows for the rest),
+# instead of every list in full. A push applies a batch of client changes; an
+# update or delete made against a row that changed on the server since the
+# client saw it is refused as a conflict, with the server's row.
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import Tombstone
+
+# Rows saved just before a pull may commit after it: every pull looks back this far again
+SYNC_OVERLAP = timedelta(seconds=30)
+# Tombstones are pruned after this long (`manage.py prune_tombstones`); older tokens get a full sync
+TOMBSTONE_DAYS = 90
+
+
+def make_token(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def read_token(token):
+    if not token.isdigit():
+        raise ValueError(token)
+    return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+
+
+def pull(viewsets, since=None):
+    """
+    {'token', 'full', 'changed': {kind: rows}, 'deleted': {kind: ids}} for the
+    viewsets' user. `full` means `changed` holds every row: the client replaces
+    its copy (no token, or one older than the tombstones).
+    """
+    now = timezone.now()
+    if since is not None and since < now - timedelta(days=TOMBSTONE_DAYS):
+        since = None
+    result = {'token': make_token(now), 'full': since is None, 'changed': {}, 'deleted': {}}
+
+    for kind, viewset in viewsets.items():
+        if since is None:
+            rows = viewset.get_queryset()
+        else:
+            # Soft-deleted rows included: they are reported as deleted
+            rows = viewset.model.objects.for_user(viewset.request.user).filter(updated_at__gte=since - SYNC_OVERLAP)
+        rows = list(rows.order_by('pk'))
+        alive = [row for row in rows if not getattr(row, 'is_deleted', False)]
+        result['changed'][kind] = viewset.get_serializer(alive, many=True).data
+        result['deleted'][kind] = [row.pk for row in rows if getattr(row, 'is_deleted', False)]
+
+    if since is not None:
+        user = next(iter(viewsets.values())).request.user
+        tombstones = Tombstone.objects.filter(user=user, deleted_at__gte=since - SYNC_OVERLAP)
+        for kind, object_id in tombstones.values_list('kind', 'object_id'):
+            if kind in result['deleted']:
+                result['deleted'][kind].append(object_id)
+    return result
+
+
+def is_current(row, seen):
+    """The client's copy of the row (its updated_at) is still the server's."""
+    return isinstance(seen, str) and parse_datetime(seen) == row.updated_at
+
+
+def push(viewsets, operations):
+    """
+    Apply operations ({'kind', 'op': 'create'|'update'|'delete', 'id', 'updated_at',
+    'data'}) kind by kind, in the order of `viewsets`; one result per operation:
+    'ok' (with the saved row), 'conflict' (with the server's row, None if deleted)
+    or 'invalid' (with the errors).
+    """
+    results = [{'status': 'invalid', 'errors': "Unknown kind or op."} for _ in operations]
+
+    for kind, viewset in viewsets.items():
+        ops = [(i, op) for i, op in enumerate(operations) if isinstance(op, dict) and op.get('kind') == kind]
+        if not ops:
+            continue
+        rows = viewset.get_queryset().in_bulk([op['id'] for _, op in ops if isinstance(op.get('id'), int)])
+        creating = viewset.get_serializer(many=True)
+        updating = viewset.get_serializer(many=True, partial=True)
+        creates, updates, deletes = [], [], []
+
+        for i, op in ops:
+            if op.get('op') == 'create':
+                attrs = validate(creating.child, op.get('data'), results, i)
+                if attrs is not None:
+                    creates.append((i, {**attrs, 'user': viewset.request.user}))
+                continue
+            if op.get('op') not in ('update', 'delete'):
+                continue
+            row = rows.get(op.get('id'))
+            if row is None or not is_current(row, op.get('updated_at')):
+                current = viewset.get_serializer(row).data if row is not None else None
+                results[i] = {'status': 'conflict', 'current': current}
+            elif op['op'] == 'delete':
+                if viewset.deletable(row):
+                    deletes.append((i, row))
+                else:
+                    results[i] = {'status': 'invalid', 'errors': "This row cannot be deleted."}
+            else:
+                updating.child.instance = row
+                attrs = validate(updating.child, op.get('data'), results, i)
+                if attrs is not None:
+                    updates.append((i, row, attrs))
+
+        try:
+            with transaction.atomic():
+                created = creating.create([attrs for _, attrs in creates]) if creates else []
+                updated = []
+                if updates:
+                    updated = updating.update_rows([row for _, row, _ in updates], [attrs for *_, attrs in updates])
+                if deletes:
+                    viewset.perform_bulk_destroy([row for _, row in deletes])
+        except IntegrityError:
+            # e.g. the same label created twice in the batch: none of this kind's writes are applied
+            for i in [i for i, _ in creates] + [i for i, *_ in updates] + [i for i, _ in deletes]:
+                results[i] = {'status': 'invalid', 'errors': "Conflicting rows in the request."}
+            continue
+
+        saved = viewset.get_serializer([*created, *updated], many=True).data
+        for i, row in zip([i for i, _ in creates] + [i for i, *_ in updates], saved):
+            results[i] = {'status': 'ok', 'row': row}
+        for i, _ in deletes:
+            results[i] = {'status': 'ok'}
+    return results
+
+
+def validate(serializer, data, results, i):
+    try:
+        return serializer.run_validation(data if isinstance(data, dict) else {})
+    except ValidationError as error:
+        results[i] = {'status': 'invalid', 'errors': error.detail}
+        return None
@@ -0,0 +1,21 @@
+# tasks.py
+# Jobs runnable by `manage.py run_workers` (registered on import, see expenses.apps)
+from .dashboard import yearly_chart_data, yearly_tables
+from .jobs import task
+from .purge import purge_user
+
+
+@task('yearly_report')
+def yearly_report(user, year):
+    """The yearly dashboard figures (monthly breakdown, per-label comparison, totals)."""
+    return yearly_tables(yearly_chart_data(user, year))
+
+
+@task('purge_account', atomic=False)
+def purge_account(user, user_id, keep_account=False):
+    """
+    Delete an account's rows batch by batch (see expenses.purge). The job is
+    enqueued without a user, so that deleting the account does not delete it.
+    """
+    deleted = purge_user(user_id, keep_account=keep_account)
+    return {'deleted': deleted, 'rows': sum(deleted.values())}
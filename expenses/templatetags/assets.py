@@ -0,0 +1,11 @@
+from django import template
+
+from expenses.assets import asset_tags
+
+register = template.Library()
+
+
+@register.simple_tag
+def assets(bundle, defer=True):
+    """{% assets 'base.css' %} -> the built bundle, or its parts until `manage.py build_assets` ran."""
+    return asset_tags(bundle, defer)
@@ -1,84 +0,0 @@
-# how can i always force the retrieval of the current user data in all models or views
-# To always enforce retrieval of the current user's data across your Django models and views — especially in a privacy-first, multi-tenant architecture like yours — you’ll want to build automated safeguards that make it nearly impossible to forget scoping by user.
-
-# Here’s a modular, scalable approach that fits your philosophy:
-
-# ✅ 1. Use a Custom Manager for User-Scoped Queries
-# python
-# # managers.py
-# from django.db import models
-
-# class UserScopedManager(models.Manager):
-#     def for_user(self, user):
-#         return self.get_queryset().filter(user=user)
-# Then in your model:
-
-# python
-# class Group(models.Model):
-#     name = models.CharField(...)
-#     user = models.ForeignKey(User, on_delete=models.CASCADE)
-
-#     objects = UserScopedManager()
-# Now in views:
-
-# python
-# groups = Group.objects.for_user(request.user)
-# This makes scoping explicit and reusable.
-
-# ✅ 2. Use a Base View Mixin for Auto-Scoping
-# python
-# # mixins.py
-# class UserQueryMixin:
-#     def get_queryset(self):
-#         qs = super().get_queryset()
-#         return qs.filter(user=self.request.user)
-# Apply it to class-based views:
-
-# python
-# class GroupListView(UserQueryMixin, ListView):
-#     model = Group
-# This ensures every query is scoped without repeating yourself.
-
-# ✅ 3. Override save() to Auto-Assign user
-# In models where user is required:
-
-# python
-# class Expense(models.Model):
-#     ...
-#     user = models.ForeignKey(User, on_delete=models.CASCADE)
-
-#     def save(self, *args, **kwargs):
-#         if not self.user and hasattr(self, '_current_user'):
-#             self.user = self._current_user
-#         super().save(*args, **kwargs)
-# Then in your view:
-
-# python
-# expense = Expense(...)
-# expense._current_user = request.user
-# expense.save()
-# Or use a custom form that injects user on save(commit=False).
-
-# ✅ 4. Middleware for Multi-Tenant Isolation (Optional)
-# If you scale to tenant-level isolation:
-
-# python
-# class CurrentUserMiddleware:
-#     def __init__(self, get_response):
-#         self.get_response = get_response
-
-#     def __call__(self, request):
-#         UserContext.set(request.user)
-#         return self.get_response(request)
-# Then use UserContext.get() inside models or managers.
-
-# 🧠 Why This Works for You
-# Automates safety: You won’t forget to filter by user
-
-# Modular: Reusable across apps (expenses, labels, groups)
-
-# Scalable: Ready for multi-tenant logic
-
-# Privacy-first: Prevents accidental data leakage
-
-# Want help packaging this into a reusable Django app (django-user-scope) for future projects? I can sketch the structure and setup for you.
\ No newline at end of file
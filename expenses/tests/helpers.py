@@ -0,0 +1,65 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from expenses.models import CustomUser, Group, Label
+from expenses.utils import create_default_categories
+
+PASSWORD = 'Xx12345678!a'
+# Tests render pages without running collectstatic: no manifest to look names up in
+STATIC_STORAGE = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
+
+def make_user(username='user', **fields):
+    """A user with the default groups and labels, as register_view creates them."""
+    user = CustomUser.objects.create_user(username, password=PASSWORD, **fields)
+    create_default_categories(user)
+    return user
+
+
+def label(user, name):
+    return Label.objects.get(user=user, name=name)
+
+
+def group(user, code):
+    return Group.objects.get(user=user, code=code)
+
+
+@override_settings(STORAGES=STATIC_STORAGE, WARMUP_ENABLED=False)
+class UserTestCase(TestCase):
+    """A logged-in user with the default categories, and an empty cache (and no warm-ups)."""
+
+    def setUp(self):
+        cache.clear()
+        # As at signup: the on_commit work (planning totals) is done
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user = make_user()
+        self.client.force_login(self.user)
+
+
+class ApiTestCase(UserTestCase):
+    """UserTestCase with an authenticated API client, and the live updates broadcaster mocked."""
+
+    def setUp(self):
+        super().setUp()
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.fuel = label(self.user, 'بنزين')
+        self.rent = label(self.user, 'إيجار')
+        self.broadcaster = mock.Mock()
+        self.enterContext(mock.patch('expenses.signals.get_broadcaster', return_value=self.broadcaster))
+
+    def published(self):
+        return [event for call in self.broadcaster.publish.call_args_list for event in call.args[1]]
+
+    def cells(self):
+        return sorted((e['type'], e.get('label'), e['month'], e['amount']) for e in self.published())
+
+    def bulk(self, method, resource, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.api, method)(f'/api/v1/{resource}/bulk/', data, format='json')
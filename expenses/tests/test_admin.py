@@ -0,0 +1,92 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib import admin
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from expenses.admin import EstimatedCountPaginator
+from expenses.models import CustomUser, Expense, Job, LabelStats
+from expenses.views import save_expense
+
+from .helpers import UserTestCase, label, make_user
+
+
+def changelist(model):
+    return reverse(f'admin:{model._meta.app_label}_{model._meta.model_name}_changelist')
+
+
+class AdminTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.staff = CustomUser.objects.create_superuser('staff', password='x')
+        self.client.force_login(self.staff)
+        self.fuel = label(self.user, 'بنزين')
+
+    def add(self, amount, day=1):
+        expense = Expense(user=self.user, label=self.fuel, amount=amount, date=date(2024, 1, day))
+        save_expense(expense)
+        return expense
+
+    def test_every_changelist_opens(self):
+        self.add(10)
+        for model in admin.site._registry:
+            if model._meta.app_label == 'expenses':
+                with self.subTest(model.__name__):
+                    self.assertEqual(self.client.get(changelist(model)).status_code, 200)
+
+    def test_expense_list_queries_do_not_grow_with_the_rows(self):
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.client.get(changelist(Expense))
+            return len(captured)
+
+        self.add(10)
+        few = queries()
+        for day in range(2, 20):
+            self.add(10, day)
+        self.assertEqual(queries(), few)
+
+    def test_date_hierarchy_only_for_one_user(self):
+        self.add(10)
+        response = self.client.get(changelist(Expense))
+        self.assertIsNone(response.context['cl'].date_hierarchy)
+        response = self.client.get(changelist(Expense), {'user__id__exact': self.user.pk})
+        self.assertEqual(response.context['cl'].date_hierarchy, 'date')
+
+    def test_estimated_counts(self):
+        for day in range(1, 6):
+            self.add(10, day)
+        rows = Expense.objects.order_by('pk')
+        if connection.vendor == 'sqlite':
+            self.assertEqual(EstimatedCountPaginator(rows, 2).count, rows.last().pk)
+        with mock.patch('expenses.admin.COUNT_LIMIT', 3):
+            self.assertEqual(EstimatedCountPaginator(rows.filter(user=self.user), 2).count, 3)
+
+    def test_expense_edits_keep_the_stats(self):
+        expense = self.add(10)
+        url = reverse('admin:expenses_expense_change', args=[expense.pk])
+        self.client.post(url, {'user': self.user.pk, 'label': self.fuel.pk, 'amount': 30, 'date': '2024-01-01',
+                               'note': '', 'recurrence': ''})
+        expense.refresh_from_db()
+        self.assertEqual(expense.amount, 30)
+        self.assertEqual(LabelStats.objects.get(label=self.fuel).mean, 30)
+
+        self.client.post(reverse('admin:expenses_expense_delete', args=[expense.pk]), {'post': 'yes'})
+        self.assertFalse(Expense.objects.exists())
+        self.assertEqual(LabelStats.objects.get(label=self.fuel).count, 0)
+
+    def test_deleting_a_user_closes_it_and_enqueues_the_purge(self):
+        self.add(10)
+        other = make_user('other')
+        url = reverse('admin:expenses_customuser_delete', args=[self.user.pk])
+        # The confirmation counts the rows to purge, without collecting them
+        self.assertIn((Expense._meta.db_table, 1), self.client.get(url).context['model_count'])
+        self.client.post(url, {'post': 'yes'})
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 1)
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.payload['user_id']), ('purge_account', self.user.pk))
+        self.assertTrue(CustomUser.objects.get(pk=other.pk).is_active)
@@ -0,0 +1,101 @@
+import statistics
+from datetime import date
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from expenses.models import Expense, LabelStats
+
+from .helpers import UserTestCase, label
+
+AMOUNTS = [120, 95, 130, 110, 87, 143, 101, 99]
+
+
+class WelfordTests(SimpleTestCase):
+    """Running mean and deviation match the statistics module, through adds, removes and merges."""
+
+    def assertMatches(self, stats, amounts):
+        self.assertEqual(stats.count, len(amounts))
+        self.assertAlmostEqual(stats.mean, statistics.mean(amounts))
+        self.assertAlmostEqual(stats.std, statistics.stdev(amounts))
+
+    def stats_of(self, amounts):
+        stats = LabelStats()
+        for amount in amounts:
+            stats.add(amount)
+        return stats
+
+    def test_add(self):
+        self.assertMatches(self.stats_of(AMOUNTS), AMOUNTS)
+
+    def test_remove_undoes_add(self):
+        stats = self.stats_of(AMOUNTS)
+        stats.remove(130)
+        stats.remove(87)
+        self.assertMatches(stats, [a for a in AMOUNTS if a not in (130, 87)])
+
+    def test_remove_down_to_nothing(self):
+        stats = self.stats_of([50, 60])
+        stats.remove(50)
+        stats.remove(60)
+        self.assertEqual((stats.count, stats.mean, stats.m2), (0, 0, 0))
+
+    def test_merge(self):
+        stats = self.stats_of(AMOUNTS[:5])
+        stats.merge(self.stats_of(AMOUNTS[5:]))
+        self.assertMatches(stats, AMOUNTS)
+        stats.merge(LabelStats())
+        self.assertMatches(stats, AMOUNTS)
+
+    def test_anomaly_needs_history_and_spread(self):
+        self.assertFalse(self.stats_of(AMOUNTS[:4]).is_anomaly(10000))
+        stats = self.stats_of(AMOUNTS)
+        self.assertTrue(stats.is_anomaly(1000))
+        self.assertFalse(stats.is_anomaly(150))
+        # Identical amounts: the deviation floor keeps a small rise from being flagged
+        same = self.stats_of([100] * 10)
+        self.assertFalse(same.is_anomaly(120))
+        self.assertTrue(same.is_anomaly(200))
+
+
+class AnomalyViewTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fuel = label(self.user, 'بنزين')
+        for amount in AMOUNTS:
+            self.add(amount)
+
+    def add(self, amount):
+        return self.client.post(reverse('expense_add'), {
+            'group': self.fuel.group_id, 'label': self.fuel.pk, 'amount': amount,
+            'date': date(2024, 5, 1).isoformat(), 'note': '',
+        }, follow=True)
+
+    def test_large_expense_is_flagged_and_dismissed(self):
+        response = self.add(5000)
+        self.assertContains(response, 'مبلغ غير معتاد')
+        expense = Expense.objects.get(amount=5000)
+        self.assertTrue(expense.is_flagged)
+        self.assertContains(self.client.get(reverse('expense_anomalies')), '5000')
+
+        self.client.post(reverse('expense_anomaly_dismiss', args=[expense.pk]))
+        expense.refresh_from_db()
+        self.assertFalse(expense.is_flagged)
+
+    def test_stats_follow_edits_and_match_a_rebuild(self):
+        expense = Expense.objects.filter(label=self.fuel, amount=130).get()
+        self.client.post(reverse('expense_edit', args=[expense.pk]), {
+            'group': self.fuel.group_id, 'label': self.fuel.pk, 'amount': 200,
+            'date': expense.date.isoformat(), 'note': '',
+        })
+        amounts = [200 if a == 130 else a for a in AMOUNTS]
+        live = LabelStats.objects.get(label=self.fuel)
+        self.assertEqual(live.count, len(amounts))
+        self.assertAlmostEqual(live.mean, statistics.mean(amounts))
+
+        call_command('rebuild_label_stats', user=self.user.username, stdout=StringIO())
+        rebuilt = LabelStats.objects.get(label=self.fuel)
+        self.assertAlmostEqual(rebuilt.mean, live.mean)
+        self.assertAlmostEqual(rebuilt.m2, live.m2)
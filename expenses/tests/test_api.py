@@ -0,0 +1,131 @@
+from datetime import date
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from expenses.models import Expense, Income, Label, LabelStats, Tombstone
+from expenses.search import search
+
+from .helpers import ApiTestCase, label, make_user
+
+
+class ScopeTests(ApiTestCase):
+    def test_other_users_rows_are_invisible(self):
+        other = make_user('other')
+        theirs = Expense.objects.create(user=other, label=label(other, 'بنزين'), amount=5, date=date(2024, 1, 1))
+        self.assertEqual(self.api.get('/api/v1/expenses/').json()['results'], [])
+        self.assertEqual(self.api.get(f'/api/v1/expenses/{theirs.pk}/').status_code, 404)
+        response = self.api.post('/api/v1/expenses/', {'label': label(other, 'إيجار').pk, 'amount': 1,
+                                                       'date': '2024-01-01'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_sparse_fields(self):
+        Expense.objects.create(user=self.user, label=self.fuel, amount=5, date=date(2024, 1, 1))
+        row, = self.api.get('/api/v1/expenses/?fields=id,amount').json()['results']
+        self.assertEqual(set(row), {'id', 'amount'})
+
+
+class BulkExpenseTests(ApiTestCase):
+    def items(self, count):
+        return [{'label': self.fuel.pk, 'amount': 10, 'date': f'2024-03-{day:02}'} for day in range(1, count + 1)]
+
+    def test_create_publishes_one_delta_per_cell(self):
+        response = self.bulk('post', 'expenses', [*self.items(3), {'label': self.rent.pk, 'amount': 700,
+                                                                   'date': '2024-04-01'}])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 4)
+        self.broadcaster.publish.assert_called_once()
+        self.assertEqual(self.cells(), sorted([('expense', self.fuel.pk, 3, 30), ('expense', self.rent.pk, 4, 700)]))
+        self.assertEqual(LabelStats.objects.get(label=self.fuel).count, 3)
+
+    def test_create_queries_do_not_grow_with_the_batch(self):
+        def queries(count):
+            with CaptureQueriesContext(connection) as captured:
+                self.bulk('post', 'expenses', self.items(count))
+            return len(captured)
+
+        self.assertEqual(queries(2), queries(20))
+
+    def test_update_publishes_the_differences(self):
+        created = self.bulk('post', 'expenses', self.items(2)).json()
+        self.broadcaster.reset_mock()
+        response = self.bulk('patch', 'expenses', [
+            {'id': created[0]['id'], 'amount': 25},
+            {'id': created[1]['id'], 'label': self.rent.pk},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cells(), sorted([
+            ('expense', self.fuel.pk, 3, 5), ('expense', self.rent.pk, 3, 10),
+        ]))
+        self.assertEqual(LabelStats.objects.get(label=self.rent).count, 1)
+
+    def test_delete(self):
+        ids = [row['id'] for row in self.bulk('post', 'expenses', self.items(2)).json()]
+        self.broadcaster.reset_mock()
+        self.assertEqual(self.bulk('delete', 'expenses', {'ids': ids}).status_code, 204)
+        self.assertFalse(Expense.objects.exists())
+        self.assertEqual(sum(e['amount'] for e in self.published()), -20)
+        self.assertEqual(set(Tombstone.objects.filter(kind='expenses').values_list('object_id', flat=True)), set(ids))
+        self.assertEqual(search(self.user, 'بنزين'), ([], 0))
+        self.assertEqual(LabelStats.objects.get(label=self.fuel).count, 0)
+
+    def test_delete_queries_do_not_grow_with_the_batch(self):
+        def queries(count):
+            ids = [row['id'] for row in self.bulk('post', 'expenses', self.items(count)).json()]
+            with CaptureQueriesContext(connection) as captured:
+                self.bulk('delete', 'expenses', {'ids': ids})
+            return len(captured)
+
+        self.assertEqual(queries(2), queries(20))
+
+    def test_invalid_items_write_nothing(self):
+        response = self.bulk('post', 'expenses', [*self.items(2), {'label': self.fuel.pk, 'amount': -1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Expense.objects.exists())
+        self.broadcaster.publish.assert_not_called()
+
+
+class BulkIncomeTests(ApiTestCase):
+    def test_create_and_update_publish(self):
+        created = self.bulk('post', 'incomes', [{'amount': 100, 'date': '2024-02-01'},
+                                                {'amount': 50, 'date': '2024-02-15'}]).json()
+        self.assertEqual(self.cells(), [('income', None, 2, 150)])
+        self.broadcaster.reset_mock()
+        self.bulk('patch', 'incomes', [{'id': created[0]['id'], 'amount': 120}])
+        self.assertEqual(self.cells(), [('income', None, 2, 20)])
+        self.assertEqual(Income.objects.get(pk=created[0]['id']).amount, 120)
+
+    def test_delete(self):
+        ids = [row['id'] for row in self.bulk('post', 'incomes', [{'amount': 100, 'date': '2024-02-01'},
+                                                                   {'amount': 50, 'date': '2024-03-01'}]).json()]
+        self.broadcaster.reset_mock()
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.bulk('delete', 'incomes', {'ids': ids}).status_code, 204)
+        self.assertFalse(Income.objects.exists())
+        self.assertEqual(self.cells(), [('income', None, 2, -100), ('income', None, 3, -50)])
+        self.assertEqual(Tombstone.objects.filter(kind='incomes').count(), 2)
+        self.assertEqual(sum('DELETE' in query['sql'] for query in captured), 1)
+
+
+class SoftDeleteTests(ApiTestCase):
+    def test_deleted_labels_are_kept_and_the_rest_renumbered(self):
+        labels = list(Label.objects.filter(group=self.fuel.group).order_by('order'))
+        self.assertEqual(self.bulk('delete', 'labels', {'ids': [labels[0].pk]}).status_code, 204)
+        labels[0].refresh_from_db()
+        self.assertTrue(labels[0].is_deleted)
+        orders = list(Label.objects.filter(group=self.fuel.group, is_deleted=False)
+                      .order_by('order').values_list('order', flat=True))
+        self.assertEqual(orders, list(range(1, len(labels))))
+
+    def test_protected_groups_cannot_be_deleted(self):
+        response = self.bulk('delete', 'groups', {'ids': [self.fuel.group_id]})
+        self.assertEqual(response.status_code, 403)
+
+    def test_names_of_deleted_labels_are_refused(self):
+        self.bulk('delete', 'labels', {'ids': [self.fuel.pk]})
+        response = self.api.post('/api/v1/labels/', {'group': self.fuel.group_id, 'name': self.fuel.name}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('استرجاعها', str(response.json()))
+        other = Label.objects.for_user(self.user).alive().filter(group=self.fuel.group).first()
+        response = self.api.patch(f'/api/v1/labels/{other.pk}/', {'name': self.fuel.name}, format='json')
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,64 @@
+import gzip
+import tempfile
+from pathlib import Path
+
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from expenses import staticserve
+from expenses.assets import VENDOR, asset_tags, bundle_is_built
+
+from .helpers import STATIC_STORAGE
+
+
+@override_settings(STORAGES=STATIC_STORAGE)
+class AssetTagTests(SimpleTestCase):
+    def setUp(self):
+        bundle_is_built.cache_clear()
+
+    def test_unbuilt_bundle_lists_its_parts(self):
+        tags = asset_tags('base.css')
+        self.assertIn('css/styles.css', tags)
+        self.assertIn(VENDOR['bootstrap.rtl.min.css'], tags)
+        self.assertEqual(tags.count('<link'), 3)
+
+    def test_scripts_are_deferred_unless_asked(self):
+        self.assertIn(' defer></script>', asset_tags('base.js'))
+        self.assertNotIn('defer', asset_tags('base.js', defer=False))
+
+
+class StaticServeTests(SimpleTestCase):
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.root = Path(root.name)
+        (self.root / 'app.0123456789ab.js').write_bytes(b'let x = 1;' * 100)
+        (self.root / 'app.0123456789ab.js.gz').write_bytes(gzip.compress(b'let x = 1;' * 100))
+        (self.root / 'robots.txt').write_bytes(b'User-agent: *')
+        self.enterContext(override_settings(STATIC_ROOT=self.root))
+
+    def serve(self, path, accept=''):
+        request = RequestFactory().get('/static/' + path, HTTP_ACCEPT_ENCODING=accept)
+        response = staticserve.serve(request, path)
+        self.addCleanup(response.close)
+        return response
+
+    def test_precompressed_sibling_when_accepted(self):
+        response = self.serve('app.0123456789ab.js', accept='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('javascript', response['Content-Type'])
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), b'let x = 1;' * 100)
+
+    def test_plain_file_otherwise(self):
+        response = self.serve('app.0123456789ab.js')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_hashed_names_are_immutable(self):
+        self.assertEqual(self.serve('app.0123456789ab.js')['Cache-Control'], staticserve.IMMUTABLE)
+        self.assertEqual(self.serve('robots.txt')['Cache-Control'], staticserve.SHORT)
+
+    def test_missing_and_outside_files_are_404(self):
+        for path in ('missing.js', '../secret.txt'):
+            with self.subTest(path), self.assertRaises(Http404):
+                self.serve(path)
@@ -0,0 +1,62 @@
+from datetime import date
+
+from django.test import override_settings
+from django.urls import include, path, reverse
+
+from expenses import async_views
+from expenses.models import Expense, Income
+
+from .helpers import UserTestCase, label
+
+urlpatterns = [
+    path('async/', async_views.home, name='async_home'),
+    path('async/planning/', async_views.planning_view, name='async_planning'),
+    path('async/dashboard/', async_views.yearly_dashboard_view, name='async_dashboard'),
+    path('', include('core.urls')),
+]
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class AsyncViewTests(UserTestCase):
+    """The async pages show what the sync ones do."""
+
+    def setUp(self):
+        super().setUp()
+        rent = label(self.user, 'إيجار')
+        rent.expected_monthly = 2500
+        rent.save()
+        self.fuel = label(self.user, 'بنزين')
+        Expense.objects.create(user=self.user, label=self.fuel, amount=432, date=date.today())
+        Income.objects.create(user=self.user, amount=9876, date=date.today())
+
+    async def get_both(self, sync_name, async_name, data=None):
+        await self.async_client.aforce_login(self.user)
+        sync_response = await self.async_client.get(reverse(sync_name), data)
+        async_response = await self.async_client.get(reverse(async_name), data)
+        self.assertEqual(sync_response.status_code, 200)
+        self.assertEqual(async_response.status_code, 200)
+        return sync_response.content.decode(), async_response.content.decode()
+
+    async def test_home(self):
+        for texts, data in ((['432', '9876', 'بنزين'], None), (['432'], {'label': self.fuel.pk})):
+            sync_content, async_content = await self.get_both('home', 'async_home', data)
+            for text in texts:
+                self.assertIn(text, sync_content)
+                self.assertIn(text, async_content)
+
+    async def test_planning(self):
+        sync_content, async_content = await self.get_both('planning_view', 'async_planning')
+        for text in ('إيجار', '2500'):
+            self.assertIn(text, sync_content)
+            self.assertIn(text, async_content)
+
+    async def test_dashboard(self):
+        year = {'year': date.today().year}
+        sync_content, async_content = await self.get_both('dashboard', 'async_dashboard', year)
+        for text in ('9876', 'dashboard-data'):
+            self.assertIn(text, sync_content)
+            self.assertIn(text, async_content)
+
+    async def test_login_required(self):
+        response = await self.async_client.get(reverse('async_home'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,33 @@
+from django.urls import reverse
+
+from expenses.caching import get_categories_version
+
+from .helpers import UserTestCase, label, make_user
+
+
+class CategoryFragmentTests(UserTestCase):
+    def test_version_is_stable_until_categories_change(self):
+        version = get_categories_version(self.user.pk)
+        self.assertEqual(get_categories_version(self.user.pk), version)
+
+        rent = label(self.user, 'إيجار')
+        rent.name = 'كراء'
+        rent.save()
+        self.assertNotEqual(get_categories_version(self.user.pk), version)
+
+    def test_versions_are_per_user(self):
+        other = make_user('other')
+        version = get_categories_version(other.pk)
+        label(self.user, 'إيجار').save()
+        self.assertEqual(get_categories_version(other.pk), version)
+
+    def test_renamed_label_replaces_cached_selector(self):
+        self.assertContains(self.client.get(reverse('home')), '>إيجار<')
+
+        rent = label(self.user, 'إيجار')
+        rent.name = 'كراء المنزل'
+        rent.save()
+
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, 'كراء المنزل')
+        self.assertNotContains(response, '>إيجار<')
@@ -0,0 +1,61 @@
+from datetime import date
+
+from django.test import override_settings
+from django.urls import include, path, reverse
+
+from expenses import async_views
+from expenses.models import Expense, Group
+
+from .helpers import UserTestCase, label
+
+# The async views next to the project's, whatever ASYNC_VIEWS says
+urlpatterns = [
+    path('async/', async_views.home, name='async_home'),
+    path('', include('core.urls')),
+]
+
+
+class ConditionalTests(UserTestCase):
+    """Pages answer 304 until their data changes, and never while messages are pending."""
+
+    def protected_group_warning(self):
+        protected = Group.objects.for_user(self.user).filter(protected=True).first()
+        self.client.get(reverse('group_delete', args=[protected.pk]))
+
+    def test_unchanged_page_is_not_modified(self):
+        etag = self.client.get(reverse('label_list'))['ETag']
+        response = self.client.get(reverse('label_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_data_change_changes_the_etag(self):
+        etag = self.client.get(reverse('home'))['ETag']
+        Expense.objects.create(user=self.user, label=label(self.user, 'بنزين'), amount=50, date=date.today())
+        response = self.client.get(reverse('home'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pending_messages_skip_the_304(self):
+        etag = self.client.get(reverse('label_list'))['ETag']
+        self.protected_group_warning()
+
+        response = self.client.get(reverse('label_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('لا يمكن حذف هذه المجموعة', response.content.decode())
+        self.assertIn('no-store', response['Cache-Control'])
+        self.assertFalse(response.has_header('ETag'))
+
+        # Shown once: the next request is back on the validators
+        response = self.client.get(reverse('label_list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(ROOT_URLCONF=__name__)
+    async def test_async_views_skip_the_304_with_messages(self):
+        await self.async_client.aforce_login(self.user)
+        etag = (await self.async_client.get('/async/'))['ETag']
+        self.assertEqual((await self.async_client.get('/async/', headers={'If-None-Match': etag})).status_code, 304)
+
+        protected = await Group.objects.for_user(self.user).filter(protected=True).afirst()
+        await self.async_client.get(reverse('group_delete', args=[protected.pk]))
+        response = await self.async_client.get('/async/', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-store', response['Cache-Control'])
@@ -0,0 +1,64 @@
+import json
+from datetime import date
+
+from django.urls import reverse
+
+from expenses.dashboard import yearly_chart_data, yearly_tables
+from expenses.models import Expense, Income
+
+from .helpers import UserTestCase, label
+
+
+class ChartPayloadTests(UserTestCase):
+    """One payload: every label once, spent[label][month], income per month."""
+
+    def setUp(self):
+        super().setUp()
+        self.fuel, self.rent = label(self.user, 'بنزين'), label(self.user, 'إيجار')
+        self.rent.expected_monthly = 2000
+        self.rent.save()
+        for month, amount in ((1, 100), (1, 50), (3, 75)):
+            Expense.objects.create(user=self.user, label=self.fuel, amount=amount, date=date(2024, month, 5))
+        Expense.objects.create(user=self.user, label=self.rent, amount=2000, date=date(2024, 1, 1))
+        Expense.objects.create(user=self.user, label=self.rent, amount=999, date=date(2023, 12, 1))
+        Income.objects.create(user=self.user, amount=8000, date=date(2024, 1, 25))
+
+    def test_spent_matrix_and_income(self):
+        with self.assertNumQueries(3):
+            data = yearly_chart_data(self.user, 2024)
+        names = data['labels']['name']
+        self.assertEqual(len(names), len(set(names)))
+        fuel, rent = names.index('بنزين'), names.index('إيجار')
+        self.assertEqual(data['spent'][fuel][:3], [150, 0, 75])
+        self.assertEqual(data['spent'][rent], [2000] + [0] * 11)
+        self.assertEqual(data['income'][0], 8000)
+        self.assertEqual(data['labels']['kind'][fuel], 'variable')
+        self.assertEqual(data['labels']['kind'][rent], 'fixed')
+        self.assertEqual(data['labels']['expected'][rent], 24000)
+        self.assertEqual(data['groups']['name'][data['labels']['group'][fuel]], 'المصاريف الشهرية المتغيرة')
+
+    def test_deleted_labels_only_when_they_carry_expenses(self):
+        self.fuel.is_deleted = True
+        self.fuel.save()
+        unused = label(self.user, 'فواكه')
+        unused.is_deleted = True
+        unused.save()
+        data = yearly_chart_data(self.user, 2024)
+        self.assertIn('بنزين', data['labels']['name'])
+        self.assertNotIn('فواكه', data['labels']['name'])
+        self.assertEqual(data['labels']['active'][data['labels']['name'].index('بنزين')], 0)
+
+    def test_tables_derive_from_the_payload(self):
+        tables = yearly_tables(yearly_chart_data(self.user, 2024))
+        january = tables['monthly_data'][0]
+        self.assertEqual((january['fixed'], january['variable'], january['balance']), (2000, 150, 5850))
+        self.assertEqual(tables['category_totals']['إيجار'], {'actual': 2000, 'expected': 24000, 'diff': -22000})
+        self.assertEqual(tables['total_expense'], 2225)
+        self.assertEqual(tables['balance'], 8000 - 2225)
+
+    def test_page_embeds_the_payload_once(self):
+        content = self.client.get(reverse('dashboard'), {'year': 2024}).content.decode()
+        self.assertEqual(content.count('id="dashboard-data"'), 1)
+        start = content.index('id="dashboard-data"')
+        payload = content[content.index('>', start) + 1:content.index('</script>', start)]
+        self.assertEqual(json.loads(payload)['year'], 2024)
@@ -0,0 +1,105 @@
+from datetime import date
+
+from django.core.cache import cache
+
+from expenses.forecast import FORECAST_KEY, PatchHistory, cached_history, label_forecasts
+from expenses.models import DataStamp, Expense
+
+from .helpers import UserTestCase, label
+
+TODAY = date(2024, 7, 15)
+
+
+class ForecastTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fuel = label(self.user, 'بنزين')
+        self.stamp = DataStamp.for_user(self.user)
+
+    def set_expected(self, name, amount):
+        row = label(self.user, name)
+        row.expected_monthly = amount
+        row.save()
+        self.stamp = DataStamp.for_user(self.user)
+
+    def forecast(self, name):
+        rows = label_forecasts(self.user, self.stamp, TODAY)
+        return next(row for row in rows if row['label'] == name)
+
+    def test_annual_labels_are_planned_per_month(self):
+        self.set_expected('عطلة', 12000)
+        row = self.forecast('عطلة')
+        self.assertEqual((row['expected'], row['expected_year']), (1000, 12000))
+        # Nothing paid yet: the monthly share for July and each month left
+        self.assertEqual((row['month_end'], row['year_end']), (1000, 6000))
+
+    def test_monthly_labels(self):
+        self.set_expected('إيجار', 3000)
+        row = self.forecast('إيجار')
+        self.assertEqual((row['expected'], row['expected_year'], row['year_end']), (3000, 36000, 18000))
+
+    def test_run_rate_blends_with_the_seasonal_month(self):
+        # Last July cost 310 (10 a day); 150 spent by mid-July this year
+        Expense.objects.create(user=self.user, label=self.fuel, amount=310, date=date(2023, 7, 20))
+        Expense.objects.create(user=self.user, label=self.fuel, amount=150, date=date(2024, 7, 2))
+        row = self.forecast('بنزين')
+        elapsed = 15 / 31
+        rate = elapsed * 150 / 15 + (1 - elapsed) * 310 / 31
+        self.assertEqual(row['spent'], 150)
+        self.assertEqual(row['month_end'], round(150 + rate * 16))
+        self.assertFalse(row['over'])
+
+    def current(self, history):
+        return history['current'][history['label_ids'].index(self.fuel.pk), date.today().month - 1]
+
+    def test_expense_writes_patch_the_cached_history(self):
+        cached_history(self.user, self.stamp, date.today())
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(user=self.user, label=self.fuel, amount=75, date=date.today())
+        history = cache.get(FORECAST_KEY.format(user_id=self.user.pk))
+        self.assertEqual(self.current(history), 75)
+        # Patched up to the new stamp: served as is
+        stamp = DataStamp.for_user(self.user)
+        self.assertEqual(history['expenses_at'], stamp.expenses_at)
+        with self.assertNumQueries(0):
+            cached_history(self.user, stamp, date.today())
+
+    def test_saves_in_one_transaction_patch_once(self):
+        cached_history(self.user, self.stamp, date.today())
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for amount in (10, 20):
+                Expense.objects.create(user=self.user, label=self.fuel, amount=amount, date=date.today())
+        self.assertEqual(len([callback for callback in callbacks if isinstance(callback, PatchHistory)]), 1)
+        self.assertEqual(self.current(cached_history(self.user, DataStamp.for_user(self.user), date.today())), 30)
+
+    def test_histories_missing_a_write_are_reloaded(self):
+        stale = cached_history(self.user, self.stamp, date.today())
+        # Another worker's cache: the write is not patched into this one
+        Expense.objects.create(user=self.user, label=self.fuel, amount=75, date=date.today())
+        self.assertEqual(self.current(cached_history(self.user, DataStamp.for_user(self.user), date.today())), 75)
+
+        # A history loaded before the write, stored after its patch
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(user=self.user, label=self.fuel, amount=5, date=date.today())
+        cache.set(FORECAST_KEY.format(user_id=self.user.pk), stale)
+        self.assertEqual(self.current(cached_history(self.user, DataStamp.for_user(self.user), date.today())), 80)
+
+    def test_concurrent_patches_drop_the_history(self):
+        cached_history(self.user, self.stamp, date.today())
+        cache.add(FORECAST_KEY.format(user_id=self.user.pk) + ':patching', 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(user=self.user, label=self.fuel, amount=75, date=date.today())
+        self.assertIsNone(cache.get(FORECAST_KEY.format(user_id=self.user.pk)))
+
+    def test_histories_loaded_during_a_write_are_not_cached(self):
+        stamp = self.stamp
+        Expense.objects.create(user=self.user, label=self.fuel, amount=75, date=date.today())
+        # Read with the stamp from before the write, which the arrays already hold
+        self.assertEqual(self.current(cached_history(self.user, stamp, date.today())), 75)
+        self.assertIsNone(cache.get(FORECAST_KEY.format(user_id=self.user.pk)))
+
+    def test_past_year_writes_drop_the_cached_history(self):
+        cached_history(self.user, self.stamp, date.today())
+        with self.captureOnCommitCallbacks(execute=True):
+            Expense.objects.create(user=self.user, label=self.fuel, amount=75, date=date(2020, 1, 1))
+        self.assertIsNone(cache.get(FORECAST_KEY.format(user_id=self.user.pk)))
@@ -0,0 +1,43 @@
+from django.urls import reverse
+
+from expenses.models import Group, Label
+from expenses.rendering import FRAGMENT_HEADER
+
+from .helpers import UserTestCase, group, label
+
+FRAGMENT = {'HTTP_X_FRAGMENT': '1'}
+
+
+class FragmentTests(UserTestCase):
+    """X-Fragment requests get the changed region only, full pages otherwise."""
+
+    def test_home_fragment_is_the_results_region(self):
+        page = self.client.get(reverse('home'))
+        fragment = self.client.get(reverse('home'), **FRAGMENT)
+        self.assertIn('<html', page.content.decode())
+        content = fragment.content.decode()
+        self.assertNotIn('<html', content)
+        self.assertIn('id="home-totals"', content)
+        self.assertIn('id="home-expenses"', content)
+        self.assertIn(FRAGMENT_HEADER, page['Vary'])
+        self.assertIn(FRAGMENT_HEADER, fragment['Vary'])
+
+    def test_move_label_up_returns_the_reordered_list(self):
+        first, second = Label.objects.filter(group=group(self.user, 'monthly_variable')).order_by('order')[:2]
+        response = self.client.get(reverse('move_label_up', args=[second.pk]), **FRAGMENT)
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        self.assertTrue(content.lstrip().startswith('<div id="label-list">'))
+        self.assertLess(content.index(second.name), content.index(first.name))
+
+    def test_move_label_down_without_fragment_redirects(self):
+        rent = label(self.user, 'إيجار')
+        response = self.client.get(reverse('move_label_down', args=[rent.pk]))
+        self.assertRedirects(response, reverse('label_list'), fetch_redirect_response=False)
+
+    def test_move_group_down_returns_the_reordered_list(self):
+        first, second = Group.objects.for_user(self.user).alive().order_by('order')[:2]
+        response = self.client.get(reverse('move_group_down', args=[first.pk]), **FRAGMENT)
+        content = response.content.decode()
+        self.assertIn('id="group-list"', content)
+        self.assertLess(content.index(second.name), content.index(first.name))
@@ -0,0 +1,47 @@
+from datetime import date
+
+from django.test import override_settings
+from django.urls import reverse
+
+from expenses.models import Expense, Income
+
+from .helpers import UserTestCase, label
+
+JINJA2_VIEWS = {'home', 'dashboard', 'planning_view', 'label_list'}
+
+
+class Jinja2ViewTests(UserTestCase):
+    """The ported templates show the same data as the Django ones."""
+
+    def setUp(self):
+        super().setUp()
+        Expense.objects.create(user=self.user, label=label(self.user, 'بنزين'), amount=432, date=date.today())
+        Income.objects.create(user=self.user, amount=9876, date=date.today())
+
+    def render(self, name, engine_views):
+        with override_settings(JINJA2_VIEWS=engine_views):
+            response = self.client.get(reverse(name))
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_pages_render_with_both_engines(self):
+        expected = {
+            'home': ['بنزين', '432', '9876'],
+            'dashboard': ['بنزين', '9444'],
+            'planning_view': ['المصاريف الشهرية الثابتة', 'إيجار'],
+            'label_list': ['بنزين', 'إيجار', 'الطوارئ'],
+        }
+        for name, texts in expected.items():
+            for engine_views in (set(), JINJA2_VIEWS):
+                with self.subTest(view=name, jinja2=bool(engine_views)):
+                    content = self.render(name, engine_views)
+                    for text in texts:
+                        self.assertIn(text, content)
+
+    def test_jinja2_templates_are_used(self):
+        with override_settings(JINJA2_VIEWS={'label_list'}):
+            response = self.client.get(reverse('label_list'))
+        self.assertEqual(response.templates, [])  # only Django templates are recorded by the test client
+        with override_settings(JINJA2_VIEWS=set()):
+            response = self.client.get(reverse('label_list'))
+        self.assertIn('label/label_list.html', [template.name for template in response.templates])
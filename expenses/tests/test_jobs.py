@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from django.urls import reverse
+from django.utils import timezone
+
+from expenses import jobs
+from expenses.jobs import claim_next, enqueue, execute, requeue_stale, task
+from expenses.models import Expense, Job
+
+from .helpers import UserTestCase, label
+
+
+def failing(user, **payload):
+    raise ValueError("boom")
+
+
+class JobTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.enterContext(mock.patch.dict(jobs.TASKS))
+        task('failing')(failing)
+
+    def run_next(self):
+        job_id = claim_next()
+        self.assertIsNotNone(job_id)
+        return execute(job_id)
+
+    def test_unknown_job(self):
+        with self.assertRaises(ValueError):
+            enqueue('nope')
+
+    def test_claims_in_order_and_once(self):
+        first, second = enqueue('failing'), enqueue('failing')
+        self.assertEqual(claim_next(), first.pk)
+        self.assertEqual(claim_next(), second.pk)
+        self.assertIsNone(claim_next())
+        self.assertEqual(Job.objects.get(pk=first.pk).status, Job.RUNNING)
+
+    def test_future_jobs_wait(self):
+        Job.objects.create(name='failing', run_after=timezone.now() + timedelta(minutes=1))
+        self.assertIsNone(claim_next())
+
+    def test_failures_retry_with_backoff_then_fail(self):
+        job = enqueue('failing', max_attempts=2)
+        self.assertEqual(self.run_next(), Job.QUEUED)
+        job.refresh_from_db()
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=jobs.RETRY_DELAY - 5))
+        self.assertIn('ValueError: boom', job.error)
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        self.assertEqual(self.run_next(), Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertEqual(jobs.job_status(job)['error'], 'ValueError: boom')
+
+    def test_stale_running_jobs_are_requeued(self):
+        job = enqueue('failing')
+        claim_next()
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(timedelta(minutes=10)), 1)
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.QUEUED)
+
+    def test_yearly_report_through_the_views(self):
+        Expense.objects.create(user=self.user, label=label(self.user, 'بنزين'), amount=300, date=date(2024, 2, 3))
+        response = self.client.post(reverse('yearly_report_request'), {'year': 2024})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(self.client.get(response.json()['status_url']).json()['status'], Job.QUEUED)
+
+        self.assertEqual(self.run_next(), Job.DONE)
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(status['status'], Job.DONE)
+        self.assertEqual(status['result']['total_expense'], 300)
+
+    def test_other_users_jobs_are_hidden(self):
+        job = Job.objects.create(name='failing')
+        # Not found, which the project's handler404 turns into a redirect home
+        response = self.client.get(reverse('job_status', args=[job.pk]))
+        self.assertRedirects(response, reverse('home'), fetch_redirect_response=False)
@@ -0,0 +1,81 @@
+from datetime import date
+from unittest import mock
+
+from django.urls import reverse
+
+from expenses.models import Expense, Label, LabelStats, RecurrenceRule
+from expenses.search import index_expenses, search
+from expenses.views import save_expense
+
+from .helpers import UserTestCase, group, label
+
+
+class MergeMoveTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.trip = label(self.user, 'عطلة')  # annual group
+        self.fuel = label(self.user, 'بنزين')
+        self.trip.expected_monthly = 1200
+        self.trip.save()
+        self.kept = self.add(self.fuel, 2, 50)
+        self.moved = [self.add(self.trip, month, amount) for month, amount in ((3, 400), (3, 100), (5, 700))]
+        self.rule = RecurrenceRule.objects.create(user=self.user, label=self.trip, amount=100, next_date=date(2024, 6, 1))
+
+    def add(self, row, month, amount):
+        expense = Expense(user=self.user, label=row, amount=amount, date=date(2024, month, 1))
+        save_expense(expense)
+        return expense
+
+    def merge(self, source, target):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('label_merge', args=[source.pk]), {'merge': '1', 'target': target.pk})
+
+    def test_merge(self):
+        self.merge(self.trip, self.fuel)
+        self.assertEqual(Expense.objects.filter(label=self.fuel).count(), 4)
+        self.rule.refresh_from_db()
+        self.assertEqual(self.rule.label, self.fuel)
+        self.trip.refresh_from_db()
+        self.fuel.refresh_from_db()
+        self.assertTrue(self.trip.is_deleted)
+        # A yearly amount becomes a monthly one
+        self.assertEqual(self.fuel.expected_monthly, 100)
+        stats = LabelStats.objects.get(label=self.fuel)
+        self.assertEqual((stats.count, stats.mean), (4, 1250 / 4))
+        self.assertFalse(LabelStats.objects.filter(label=self.trip).exists())
+
+    def test_merge_reindexes_and_publishes_only_the_moved_expenses(self):
+        broadcaster = mock.Mock()
+        with mock.patch('expenses.views.get_broadcaster', return_value=broadcaster), \
+                mock.patch('expenses.views.index_expenses', wraps=index_expenses) as indexing:
+            self.merge(self.trip, self.fuel)
+        indexed = {pk for call in indexing.call_args_list for pk in call.args[0].values_list('pk', flat=True)}
+        self.assertEqual(indexed, {expense.pk for expense in self.moved})
+        self.assertEqual({expense.pk for expense in search(self.user, 'بنزين')[0]},
+                         {self.kept.pk, *(expense.pk for expense in self.moved)})
+
+        events, = [call.args[1] for call in broadcaster.publish.call_args_list]
+        self.assertEqual(sorted((e['label'], e['month'], e['amount']) for e in events), sorted([
+            (self.trip.pk, 3, -500), (self.fuel.pk, 3, 500), (self.trip.pk, 5, -700), (self.fuel.pk, 5, 700),
+        ]))
+
+    def test_merge_of_an_unused_label_publishes_nothing(self):
+        empty = label(self.user, 'قرض')
+        with mock.patch('expenses.views.get_broadcaster') as get_broadcaster:
+            self.merge(empty, self.fuel)
+        get_broadcaster.assert_not_called()
+
+    def test_move(self):
+        fixed = group(self.user, 'monthly_fixed')
+        self.client.post(reverse('label_merge', args=[self.trip.pk]), {'move': '1', 'group': fixed.pk})
+        self.trip.refresh_from_db()
+        self.assertEqual((self.trip.group, self.trip.expected_monthly), (fixed, 100))
+        self.assertEqual(self.trip.order, Label.objects.for_user(self.user).alive().filter(group=fixed).count())
+        self.assertEqual(len(search(self.user, fixed.name)[0]), len(self.moved))
+
+    def test_move_to_a_group_with_that_name_is_refused(self):
+        Label.objects.create(user=self.user, group=self.fuel.group, name='عطلة', order=99)
+        response = self.client.post(reverse('label_merge', args=[self.trip.pk]), {'move': '1', 'group': self.fuel.group_id})
+        self.assertEqual(response.status_code, 200)
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.group, group(self.user, 'annual_expenses'))
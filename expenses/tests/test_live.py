@@ -0,0 +1,82 @@
+from datetime import date
+from unittest import mock
+
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from expenses.live import expense_deltas, income_deltas
+from expenses.models import Expense, Group, Income, Label
+
+from .helpers import UserTestCase, label
+
+
+class DeltaTests(SimpleTestCase):
+    def test_amount_change_is_one_delta(self):
+        rent = Label(id=1, name='إيجار', expected_monthly=50, group=Group(id=7, code='monthly_fixed'))
+        old = Expense(label=rent, date=date(2024, 3, 1), amount=100)
+        new = Expense(label=rent, date=date(2024, 3, 9), amount=130)
+        self.assertEqual(expense_deltas(old, new), [{
+            'type': 'expense', 'label': 1, 'year': 2024, 'month': 3, 'amount': 30,
+            'name': 'إيجار', 'group': 7, 'kind': 'fixed', 'expected': 600,
+        }])
+
+    def test_month_change_is_a_removal_and_an_addition(self):
+        events = income_deltas(Income(date=date(2024, 3, 1), amount=100), Income(date=date(2024, 4, 1), amount=100))
+        self.assertEqual([(e['month'], e['amount']) for e in events], [(3, -100), (4, 100)])
+
+    def test_unchanged_row_has_no_delta(self):
+        self.assertEqual(income_deltas(Income(date=date(2024, 3, 1), amount=5), Income(date=date(2024, 3, 2), amount=5)), [])
+
+
+class LiveUpdateTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fuel = label(self.user, 'بنزين')
+        self.expense = Expense.objects.create(user=self.user, label=self.fuel, amount=100, date=date(2024, 3, 5))
+        self.broadcaster = mock.Mock()
+        self.enterContext(mock.patch('expenses.signals.get_broadcaster', return_value=self.broadcaster))
+
+    def published(self):
+        return [event for call in self.broadcaster.publish.call_args_list for event in call.args[1]]
+
+    def test_edit_publishes_the_change(self):
+        expense = Expense.objects.get(pk=self.expense.pk)
+        expense.amount = 160
+        with self.captureOnCommitCallbacks(execute=True):
+            expense.save()
+        self.assertEqual([(e['label'], e['month'], e['amount']) for e in self.published()], [(self.fuel.pk, 3, 60)])
+
+    def test_saves_not_touching_the_amounts_publish_nothing(self):
+        expense = Expense.objects.get(pk=self.expense.pk)
+        expense.note = 'x'
+        with self.captureOnCommitCallbacks(execute=True):
+            expense.save(update_fields=['note'])
+        self.assertEqual(self.published(), [])
+
+    def test_loaded_rows_are_not_read_again(self):
+        def save_queries(expense):
+            expense.amount += 1
+            with CaptureQueriesContext(connection) as queries:
+                expense.save()
+            return len(queries)
+
+        loaded = save_queries(Expense.objects.get(pk=self.expense.pk))
+        built = save_queries(Expense(pk=self.expense.pk, user_id=self.user.pk, label_id=self.fuel.pk, amount=101,
+                                     date=self.expense.date))
+        self.assertEqual(built - loaded, 1)
+        # The instance remembers what it saved: the next save diffs against it
+        with self.captureOnCommitCallbacks(execute=True):
+            save_queries(self.expense)
+        self.assertEqual(self.published()[-1]['amount'], 1)
+
+    def test_wsgi_dashboard_does_not_open_the_stream(self):
+        content = self.client.get(reverse('dashboard')).content.decode()
+        self.assertNotIn('data-live-url', content)
+        self.assertEqual(self.client.get(reverse('live_updates')).status_code, 204)
+
+    async def test_asgi_dashboard_opens_the_stream(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertIn(f'data-live-url="{reverse("live_updates")}"', response.content.decode())
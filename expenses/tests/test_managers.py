@@ -0,0 +1,64 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.urls import reverse
+
+from expenses.models import Group, Label
+
+from .helpers import UserTestCase, make_user
+
+
+class SoftDeleteManagerTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.groups = list(Group.objects.for_user(self.user).order_by('order'))
+        # Deleted between the first two groups, without the renumbering group_delete does
+        self.deleted = Group.objects.create(user=self.user, name='قديمة', order=self.groups[0].order, is_deleted=True)
+        for group in self.groups[1:]:
+            group.order += 1
+            group.save()
+        self.deleted.order += 1
+        self.deleted.save()
+
+    def test_alive_and_deleted(self):
+        make_user('other')
+        self.assertEqual(list(Group.objects.for_user(self.user).deleted()), [self.deleted])
+        self.assertEqual(set(Group.objects.for_user(self.user).alive()), set(self.groups))
+        self.assertEqual(Label.objects.for_user(self.user).alive().count(), Label.objects.filter(user=self.user).count())
+
+    def test_moves_skip_deleted_groups(self):
+        first, second = self.groups[:2]
+        self.client.post(reverse('move_group_down', args=[first.pk]))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.deleted.refresh_from_db()
+        self.assertLess(second.order, first.order)
+        self.assertEqual(self.deleted.order, 2)
+
+        self.client.post(reverse('move_group_up', args=[first.pk]))
+        first.refresh_from_db()
+        self.assertEqual(first.order, 1)
+        self.assertEqual(self.client.post(reverse('move_group_up', args=[self.deleted.pk])).status_code, 302)
+        self.deleted.refresh_from_db()
+        self.assertEqual(self.deleted.order, 2)
+
+    def test_add_expense_lists_alive_groups(self):
+        response = self.client.get(reverse('add_expense_view'))
+        self.assertNotIn(self.deleted, response.context['groups'])
+        self.assertNotContains(response, self.deleted.name)
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite query plans")
+class PartialIndexTests(UserTestCase):
+    def plan(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return ' '.join(str(row[-1]) for row in cursor.fetchall())
+
+    def test_list_queries_use_the_partial_indexes(self):
+        self.assertIn('group_alive_order', self.plan(Group.objects.for_user(self.user).alive().order_by('order')))
+        group = Group.objects.for_user(self.user).first()
+        self.assertIn('label_alive_order', self.plan(
+            Label.objects.for_user(self.user).alive().filter(group=group).order_by('order')
+        ))
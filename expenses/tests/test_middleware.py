@@ -0,0 +1,60 @@
+import gzip
+from unittest import skipUnless
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from expenses.middleware import CompressionMiddleware, brotli
+
+BODY = 'مصروف '.encode() * 1000
+
+
+def compressed(response, accept='gzip, deflate, br', **headers):
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept, **headers)
+    return CompressionMiddleware(lambda request: response)(request)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024)
+class CompressionMiddlewareTests(SimpleTestCase):
+    def test_gzip_with_vary_and_weak_etag(self):
+        response = HttpResponse(BODY)
+        response['ETag'] = '"abc"'
+        response = compressed(response, accept='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(gzip.decompress(response.content), BODY)
+
+    def test_gzip_output_is_padded(self):
+        # GZipMiddleware's random filename bytes: the length leaks nothing (BREACH)
+        lengths = {len(compressed(HttpResponse(BODY), accept='gzip').content) for _ in range(10)}
+        self.assertGreater(len(lengths), 1)
+
+    def test_skipped_responses(self):
+        cases = {
+            'small': HttpResponse(b'x' * 100),
+            'not found': HttpResponse(BODY, status=404),
+            'image': HttpResponse(BODY, content_type='image/png'),
+            'event stream': StreamingHttpResponse(iter([BODY]), content_type='text/event-stream'),
+            'no-transform': HttpResponse(BODY, headers={'Cache-Control': 'private, no-transform'}),
+        }
+        for case, response in cases.items():
+            with self.subTest(case):
+                self.assertFalse(compressed(response).has_header('Content-Encoding'))
+
+    def test_streaming_gzip(self):
+        response = compressed(StreamingHttpResponse(iter([BODY, BODY])), accept='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), BODY * 2)
+
+    @skipUnless(brotli, "brotli is not installed")
+    def test_brotli_when_accepted(self):
+        response = compressed(HttpResponse(BODY))
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), BODY)
+
+    @skipUnless(brotli, "brotli is not installed")
+    def test_pages_with_a_csrf_token_get_gzip(self):
+        response = HttpResponse(BODY)
+        response.set_cookie('csrftoken', 'x' * 32)
+        self.assertEqual(compressed(response)['Content-Encoding'], 'gzip')
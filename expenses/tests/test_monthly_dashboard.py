@@ -0,0 +1,44 @@
+from datetime import date
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from expenses.models import Expense
+
+from .helpers import UserTestCase, group, label
+
+
+class MonthlyDashboardTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fixed = group(self.user, 'monthly_fixed')
+        rent = label(self.user, 'إيجار')
+        rent.expected_monthly = 3000
+        rent.save()
+        for day, amount in ((date(2024, 2, 1), 2800), (date(2024, 2, 20), 150), (date(2024, 3, 1), 3000)):
+            Expense.objects.create(user=self.user, label=rent, amount=amount, date=day)
+
+    def get(self, month, group_id):
+        return self.client.get(reverse('monthly_dashboard'), {'month': month, 'group': group_id})
+
+    def test_month_totals_and_navigation(self):
+        context = self.get('2024-02', self.fixed.pk).context
+        rent = next(row for row in context['sublabel_data'] if row['label'].name == 'إيجار')
+        self.assertEqual((rent['expected'], rent['actual']), (3000, 2950))
+        self.assertEqual([expense.amount for expense in rent['expenses']], [2800, 150])
+        self.assertEqual((context['total_expected'], context['total_actual']), (3000, 2950))
+        self.assertEqual((context['previous_month'], context['next_month']), ('2024-01', '2024-03'))
+
+    def test_year_boundaries(self):
+        context = self.get('2024-01', self.fixed.pk).context
+        self.assertEqual((context['previous_month'], context['next_month']), ('2023-12', '2024-02'))
+        self.assertEqual(context['total_actual'], 0)
+
+    def test_queries_do_not_grow_with_labels(self):
+        counts = []
+        for code in ('annual_expenses', 'monthly_fixed'):
+            with CaptureQueriesContext(connection) as queries:
+                self.get('2024-02', group(self.user, code).pk)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from django.urls import reverse
+
+from expenses.models import PlanSummary
+from expenses.signals import RecomputePlanSummary
+
+from .helpers import UserTestCase, label, make_user
+
+
+class PlanSummaryTests(UserTestCase):
+    """Totals follow Label/Group writes, recomputed once per transaction and user."""
+
+    def recomputes(self, callbacks):
+        return [callback.user_id for callback in callbacks if isinstance(callback, RecomputePlanSummary)]
+
+    def set_expected(self, name, amount):
+        row = label(self.user, name)
+        row.expected_monthly = amount
+        row.save()
+        return row
+
+    def test_totals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.set_expected('إيجار', 3000)
+            self.set_expected('بنزين', 500)
+            self.set_expected('عطلة', 12000)
+        summary = PlanSummary.objects.get(user=self.user)
+        self.assertEqual((summary.monthly_expected, summary.annual_total), (3500, 12000))
+        self.assertEqual(summary.annual_monthly, Decimal('1000.00'))
+        self.assertEqual(summary.monthly_expense_total, 4500)
+
+    def test_signup_recomputes_once(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            user = make_user('newcomer')
+        self.assertEqual(self.recomputes(callbacks), [user.pk])
+
+    def test_several_saves_recompute_once(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.set_expected('إيجار', 3000)
+            self.set_expected('بنزين', 500)
+        self.assertEqual(self.recomputes(callbacks), [self.user.pk])
+
+    def test_reordering_and_renaming_do_not_recompute(self):
+        rent = label(self.user, 'إيجار')
+        with self.captureOnCommitCallbacks() as callbacks:
+            rent.order += 10
+            rent.name = 'كراء'
+            rent.save()
+            rent.expected_monthly = 100
+            rent.save(update_fields=['order'])
+        self.assertEqual(self.recomputes(callbacks), [])
+
+    def test_soft_delete_recomputes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            rent = self.set_expected('إيجار', 3000)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            rent.is_deleted = True
+            rent.save()
+        self.assertEqual(self.recomputes(callbacks), [self.user.pk])
+        self.assertEqual(PlanSummary.objects.get(user=self.user).monthly_expected, 0)
+
+    def test_deleting_the_user_does_not_recompute(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.delete()
+        self.assertEqual(self.recomputes(callbacks), [])
+
+    def test_planning_page_shows_the_totals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.set_expected('إيجار', 3000)
+        content = self.client.get(reverse('planning_view')).content.decode()
+        self.assertIn('3000', content)
@@ -0,0 +1,75 @@
+from datetime import date
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from expenses.jobs import claim_next, execute
+from expenses.models import CustomUser, Expense, Group, Income, Job, Label, LabelStats
+from expenses.purge import count_rows, purge_user
+from expenses.search import search
+from expenses.views import save_expense
+
+from .helpers import PASSWORD, STATIC_STORAGE, label, make_user
+
+
+# purge_user() refuses to run inside a transaction, as TestCase's tests do
+@override_settings(STORAGES=STATIC_STORAGE, WARMUP_ENABLED=False)
+class PurgeTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.other = make_user('other')
+        for user in (self.user, self.other):
+            for day in range(1, 6):
+                save_expense(Expense(user=user, label=label(user, 'بنزين'), amount=10 * day, date=date(2024, 1, day)))
+            Income.objects.create(user=user, amount=100, date=date(2024, 1, 1))
+
+    def rows(self, user):
+        return (Expense.objects.filter(user=user).count(), Income.objects.filter(user=user).count(),
+                Label.objects.filter(user=user).count(), LabelStats.objects.filter(label__user=user).count())
+
+    def test_dry_run_counts(self):
+        counts = count_rows(self.user.pk)
+        self.assertEqual(counts[Expense._meta.db_table], 5)
+        self.assertEqual(counts[Group._meta.db_table], Group.objects.filter(user=self.user).count())
+        out = StringIO()
+        call_command('purge_account', 'user', dry_run=True, stdout=out)
+        self.assertIn(f"Would delete {sum(counts.values())} row(s)", out.getvalue())
+        self.assertEqual(self.rows(self.user)[0], 5)
+
+    def test_purge_in_small_batches(self):
+        other_rows = self.rows(self.other)
+        deleted = purge_user(self.user.pk, batch_size=2, pause=0)
+        self.assertEqual(deleted[Expense._meta.db_table], 5)
+        self.assertEqual(deleted[CustomUser._meta.db_table], 1)
+        self.assertFalse(CustomUser.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(self.rows(self.other), other_rows)
+        self.assertEqual(search(self.other, 'بنزين')[1], 5)
+
+    def test_keep_account_starts_over(self):
+        purge_user(self.user.pk, keep_account=True, batch_size=3, pause=0)
+        self.assertTrue(CustomUser.objects.filter(pk=self.user.pk).exists())
+        expenses, incomes, labels, _ = self.rows(self.user)
+        self.assertEqual((expenses, incomes), (0, 0))
+        self.assertEqual(labels, Label.objects.filter(user=self.other).count())
+        self.assertEqual(search(self.user, 'بنزين'), ([], 0))
+
+    def test_refused_inside_a_transaction(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            purge_user(self.user.pk)
+        self.assertEqual(self.rows(self.user)[0], 5)
+
+    def test_deleting_the_account_closes_it_then_purges_in_the_background(self):
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('delete_account'), {'password': PASSWORD})
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+
+        self.assertEqual(execute(claim_next()), Job.DONE)
+        self.assertFalse(CustomUser.objects.filter(pk=self.user.pk).exists())
+        self.assertEqual(self.rows(self.user), (0, 0, 0, 0))
@@ -0,0 +1,84 @@
+from datetime import date
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+
+from expenses.management.commands.run_recurring import Command
+from expenses.models import Expense, Income, LabelStats, RecurrenceRule
+
+from .helpers import UserTestCase, label
+
+
+def run_recurring(day, **options):
+    out = StringIO()
+    call_command('run_recurring', date=day, stdout=out, **options)
+    return out.getvalue()
+
+
+class RecurringTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.rent = label(self.user, 'إيجار')
+        self.rule = RecurrenceRule.objects.create(
+            user=self.user, label=self.rent, amount=3000, day_of_month=31, next_date=date(2024, 1, 31),
+        )
+        self.salary = RecurrenceRule.objects.create(
+            user=self.user, amount=9000, interval_months=3, next_date=date(2024, 1, 1), end_date=date(2024, 6, 30),
+        )
+
+    def test_due_occurrences_are_created(self):
+        self.assertIn("Generated 3 expense(s) and 2 income(s)", run_recurring(date(2024, 4, 15)))
+        # Short months move the day to their last one
+        dates = Expense.objects.filter(recurrence=self.rule).order_by('date').values_list('date', flat=True)
+        self.assertEqual(list(dates), [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31)])
+        self.assertEqual(list(Income.objects.order_by('date').values_list('date', flat=True)),
+                         [date(2024, 1, 1), date(2024, 4, 1)])
+        self.rule.refresh_from_db()
+        self.assertEqual(self.rule.next_date, date(2024, 4, 30))
+        self.assertEqual(LabelStats.objects.get(label=self.rent).count, 3)
+
+    def test_running_again_creates_nothing(self):
+        run_recurring(date(2024, 4, 15))
+        self.assertIn("Generated 0 expense(s) and 0 income(s)", run_recurring(date(2024, 4, 15)))
+        self.assertEqual(Expense.objects.count(), 3)
+
+    def test_interrupted_run_is_completed_without_duplicates(self):
+        run_recurring(date(2024, 4, 15))
+        # As if the run had died after creating the rows but before moving next_date
+        RecurrenceRule.objects.update(next_date=date(2024, 1, 1), is_active=True)
+        self.assertIn("Generated 0 expense(s) and 0 income(s)", run_recurring(date(2024, 4, 15), batch_size=1))
+        self.assertEqual((Expense.objects.count(), Income.objects.count()), (3, 2))
+        self.assertEqual(LabelStats.objects.get(label=self.rent).count, 3)
+
+    def test_rows_a_concurrent_run_inserted_are_not_counted(self):
+        not_created_yet = Command.not_created_yet
+
+        def racing(command, model, rows):
+            rows = not_created_yet(command, model, rows)
+            # Inserted by another run between this one's check and its bulk_create
+            if model is Expense:
+                Expense.objects.bulk_create([Expense(user=rows[0].user, label=rows[0].label, amount=rows[0].amount,
+                                                     date=rows[0].date, recurrence=self.rule, period=rows[0].period)])
+            return rows
+
+        with mock.patch.object(Command, 'not_created_yet', racing), \
+                mock.patch('expenses.signals.get_broadcaster') as get_broadcaster, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.assertIn("Generated 2 expense(s) and 2 income(s)", run_recurring(date(2024, 4, 15)))
+        self.assertEqual(Expense.objects.count(), 3)
+        self.assertEqual(LabelStats.objects.get(label=self.rent).count, 2)
+        events, = [call.args[1] for call in get_broadcaster().publish.call_args_list]
+        self.assertEqual(sum(event['amount'] for event in events if event['type'] == 'expense'), 6000)
+
+    def test_rules_end(self):
+        run_recurring(date(2024, 12, 31))
+        self.salary.refresh_from_db()
+        self.assertFalse(self.salary.is_active)
+        self.assertEqual(Income.objects.count(), 2)
+
+    def test_rules_of_deleted_labels_are_skipped(self):
+        self.rent.is_deleted = True
+        self.rent.save()
+        run_recurring(date(2024, 4, 15))
+        self.assertFalse(Expense.objects.exists())
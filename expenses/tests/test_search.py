@@ -0,0 +1,74 @@
+from datetime import date
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from expenses.models import Expense
+from expenses.search import indexed_text, normalize, search
+
+from .helpers import UserTestCase, label, make_user
+
+
+class NormalizeTests(SimpleTestCase):
+    def test_letter_variants_marks_and_digits(self):
+        self.assertEqual(normalize('أُرْز إضافيّ ١٢٣'), 'ارز اضافي 123')
+
+    def test_indexed_text_adds_the_bare_words(self):
+        self.assertEqual(indexed_text('بر الوالدين'), 'بر الوالدين والدين')
+        self.assertEqual(indexed_text('للكهرباء'), 'للكهرباء كهرباء')
+
+
+class SearchTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.expenses = {
+            name: Expense.objects.create(user=self.user, label=label(self.user, name), amount=10, date=date(2024, 1, 1),
+                                         note=note)
+            for name, note in (('بر الوالدين', ''), ('الكهرباء', 'فاتورة يناير'), ('أرز', ''), ('بنزين', 'رحلة'))
+        }
+
+    def found(self, query):
+        expenses, total = search(self.user, query)
+        self.assertEqual(total, len(expenses))
+        return {expense.label.name for expense in expenses}
+
+    def test_article_forms(self):
+        for query in ('والدين', 'الوالدين', 'بر الوالدين', 'كهرباء', 'الكهرباء', 'بالكهرباء'):
+            with self.subTest(query):
+                self.assertTrue(self.found(query))
+        self.assertEqual(self.found('والدين'), {'بر الوالدين'})
+        self.assertEqual(self.found('كهرباء'), {'الكهرباء'})
+
+    def test_prefixes_variants_notes_and_groups(self):
+        self.assertEqual(self.found('ارز'), {'أرز'})
+        self.assertEqual(self.found('فاتور'), {'الكهرباء'})
+        self.assertEqual(self.found('بنزين رحلة'), {'بنزين'})
+        self.assertEqual(self.found('بنزين يناير'), set())
+        self.assertEqual(self.found('المتغيرة'), {'بنزين'})
+
+    def test_other_users_rows_are_not_found(self):
+        other = make_user('other')
+        self.assertEqual(search(other, 'والدين'), ([], 0))
+        Expense.objects.create(user=other, label=label(other, 'بنزين'), amount=10, date=date(2024, 1, 1))
+        # Short prefixes too, and the owner token is not searchable text
+        self.assertEqual(self.found('بن'), {'بنزين'})
+        self.assertEqual(search(other, 'بن')[1], 1)
+        self.assertEqual(self.found(f'u{self.user.pk}'), set())
+
+    def test_renames_and_deletes_reach_the_index(self):
+        rice = label(self.user, 'أرز')
+        rice.name = 'أرز بسمتي'
+        rice.save()
+        self.assertEqual(self.found('بسمتي'), {'أرز بسمتي'})
+
+        self.expenses['بنزين'].delete()
+        self.assertEqual(self.found('رحلة'), set())
+
+    def test_saves_keeping_the_name_do_not_reindex(self):
+        rice = label(self.user, 'أرز')
+        with mock.patch('expenses.signals.index_expenses') as index_expenses:
+            rice.order += 1
+            rice.save()
+            rice.name = 'شعير'
+            rice.save(update_fields=['order'])
+        index_expenses.assert_not_called()
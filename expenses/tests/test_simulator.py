@@ -0,0 +1,64 @@
+from datetime import date
+
+import numpy as np
+
+from expenses.models import Expense, Income, Label
+from expenses.simulator import evaluate, load_history, scenario, sensitivity
+
+from .helpers import UserTestCase, group, label
+
+TODAY = date(2024, 7, 15)
+
+
+class SimulatorTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.expected_monthly_income = 5000
+        self.user.save()
+        self.fuel = label(self.user, 'بنزين')
+        # Two months of history: January and June 2024
+        for month, amount in ((1, 300), (6, 500)):
+            Expense.objects.create(user=self.user, label=self.fuel, amount=amount, date=date(2024, month, 10))
+            Income.objects.create(user=self.user, amount=6000, date=date(2024, month, 1))
+
+    def set_expected(self, name, amount):
+        row = label(self.user, name)
+        row.expected_monthly = amount
+        row.save()
+
+    def schedule(self, history, name):
+        # Rows in load_history()'s order
+        names = list(Label.objects.filter(user=self.user, is_deleted=False)
+                     .order_by('group__order', 'order').values_list('name', flat=True))
+        return history['seasonal'][names.index(name)]
+
+    def test_history(self):
+        history = load_history(self.user, TODAY)
+        # Months before the first record (July to December) take the average of the covered ones
+        fuel = self.schedule(history, 'بنزين')
+        self.assertEqual((fuel[0], fuel[3], fuel[5], fuel[7]), (300, 0, 500, 800 / 6))
+        self.assertEqual(history['income'], 12000 / 6)
+        self.assertEqual(history['balance'], 12000 - 800)
+
+    def test_unused_labels_are_projected_at_their_monthly_plan(self):
+        self.set_expected('إيجار', 2000)
+        self.set_expected('عطلة', 12000)  # annual group: a yearly amount
+        history = load_history(self.user, TODAY)
+        self.assertTrue(np.all(self.schedule(history, 'إيجار') == 2000))
+        self.assertTrue(np.all(self.schedule(history, 'عطلة') == 1000))
+
+    def test_scenarios_are_evaluated_together(self):
+        history = load_history(self.user, TODAY)
+        variable = group(self.user, 'monthly_variable').pk
+        result = evaluate(history, [scenario(), scenario(cuts={variable: 100}), scenario(income_change=-100)], 12)
+        self.assertEqual(result['spending'].shape, (3, 12))
+        self.assertTrue(np.all(result['spending'][1] == 0))
+        self.assertAlmostEqual(result['spending'][0].sum(), sum(self.schedule(history, 'بنزين')))
+        self.assertTrue(np.all(result['income'] == [2000, 2000, 0]))
+        self.assertAlmostEqual(result['balance'][0, -1], history['balance'] + 12 * 2000 - result['spending'][0].sum())
+
+    def test_sensitivity_grows_with_the_cut(self):
+        history = load_history(self.user, TODAY)
+        table = sensitivity(history, scenario(), 12)
+        row = table[history['group_ids'].index(group(self.user, 'monthly_variable').pk)]
+        self.assertTrue(np.all(np.diff(row) > 0))
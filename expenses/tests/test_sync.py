@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from expenses.models import Expense, Group, Income, Label, Tombstone
+from expenses.sync import TOMBSTONE_DAYS, make_token
+
+from .helpers import ApiTestCase
+
+
+class SyncTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.expense = Expense.objects.create(user=self.user, label=self.fuel, amount=40, date=date(2024, 5, 2))
+        self.income = Income.objects.create(user=self.user, amount=900, date=date(2024, 5, 1))
+        # Everything so far was synced an hour ago
+        past = timezone.now() - timedelta(hours=1)
+        for model in (Expense, Income, Group, Label):
+            model.objects.update(updated_at=past)
+        self.token = make_token(past + timedelta(minutes=5))
+
+    def pull(self, since=None):
+        response = self.api.get('/api/v1/sync/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def push(self, *operations):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.api.post('/api/v1/sync/', {'operations': list(operations)}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_full_pull(self):
+        data = self.pull()
+        self.assertTrue(data['full'])
+        self.assertEqual([row['id'] for row in data['changed']['expenses']], [self.expense.pk])
+        self.assertEqual(len(data['changed']['labels']), Label.objects.filter(user=self.user, is_deleted=False).count())
+
+    def test_delta_pull(self):
+        self.assertEqual(self.pull(self.token)['changed'], {'groups': [], 'labels': [], 'incomes': [], 'expenses': []})
+
+        self.income.amount = 950
+        self.income.save()
+        self.rent.is_deleted = True
+        self.rent.save()
+        expense_id = self.expense.pk
+        self.expense.delete()
+
+        data = self.pull(self.token)
+        self.assertFalse(data['full'])
+        self.assertEqual([row['amount'] for row in data['changed']['incomes']], [950])
+        self.assertEqual(data['deleted'], {'groups': [], 'labels': [self.rent.pk], 'incomes': [], 'expenses': [expense_id]})
+        # The next pull starts from the returned token
+        self.assertEqual(self.pull(data['token'])['deleted']['expenses'], [expense_id])
+
+    def test_old_and_invalid_tokens(self):
+        old = make_token(timezone.now() - timedelta(days=TOMBSTONE_DAYS + 1))
+        self.assertTrue(self.pull(old)['full'])
+        self.assertEqual(self.api.get('/api/v1/sync/', {'since': 'x'}).status_code, 400)
+
+    def test_push(self):
+        seen = self.pull()['changed']['expenses'][0]['updated_at']
+        results = self.push(
+            {'kind': 'expenses', 'op': 'create', 'data': {'label': self.rent.pk, 'amount': 3000, 'date': '2024-05-01'}},
+            {'kind': 'expenses', 'op': 'update', 'id': self.expense.pk, 'updated_at': seen, 'data': {'amount': 45}},
+            {'kind': 'incomes', 'op': 'delete', 'id': self.income.pk, 'updated_at': 'stale'},
+            {'kind': 'labels', 'op': 'create', 'data': {'group': self.fuel.group_id, 'name': self.fuel.name}},
+            {'kind': 'nope', 'op': 'create'},
+        )
+        self.assertEqual([result['status'] for result in results], ['ok', 'ok', 'conflict', 'invalid', 'invalid'])
+        self.assertEqual(results[1]['row']['amount'], 45)
+        self.assertEqual(results[2]['current']['amount'], 900)
+        self.assertTrue(Expense.objects.filter(label=self.rent, amount=3000).exists())
+        self.assertTrue(Income.objects.filter(pk=self.income.pk).exists())
+
+        # The update moved updated_at: the copy read before it is stale now
+        results = self.push({'kind': 'expenses', 'op': 'delete', 'id': self.expense.pk, 'updated_at': seen})
+        self.assertEqual(results[0]['status'], 'conflict')
+        self.assertEqual(results[0]['current']['amount'], 45)
+
+    def test_tombstones_are_pruned(self):
+        self.expense.delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=TOMBSTONE_DAYS + 1))
+        call_command('prune_tombstones', stdout=StringIO())
+        self.assertFalse(Tombstone.objects.exists())
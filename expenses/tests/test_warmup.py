@@ -0,0 +1,76 @@
+from datetime import date
+from unittest import mock
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+from expenses.dashboard import cached_chart_data
+from expenses.models import DataStamp, Expense, Income, PlanSummary
+from expenses.signals import after_bulk_write
+from expenses.views import home_totals
+from expenses.warmup import pending, schedule_warmup, warm_user
+
+from .helpers import UserTestCase, label
+
+
+def writes(queries):
+    return [query['sql'] for query in queries.captured_queries
+            if query['sql'].split(None, 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE')]
+
+
+class WarmupTests(UserTestCase):
+    def setUp(self):
+        super().setUp()
+        Expense.objects.create(user=self.user, label=label(self.user, 'بنزين'), amount=70, date=date.today())
+        self.stamp = DataStamp.for_user(self.user)
+
+    def test_pages_are_cached_afterwards(self):
+        warm_user(self.user.pk)
+        today = date.today()
+        with self.assertNumQueries(0):
+            self.assertEqual(home_totals(self.user, self.stamp, (today.replace(day=1), today, None, None)), (70, 0))
+            cached_chart_data(self.user, self.stamp, today.year)
+
+    def test_warm_up_only_reads(self):
+        PlanSummary.objects.filter(user=self.user).delete()
+        with CaptureQueriesContext(connection) as queries:
+            warm_user(self.user.pk)
+        self.assertEqual(writes(queries), [])
+        self.assertFalse(PlanSummary.objects.filter(user=self.user).exists())
+
+    def test_users_without_a_stamp_are_skipped(self):
+        DataStamp.objects.filter(user=self.user).delete()
+        with CaptureQueriesContext(connection) as queries:
+            warm_user(self.user.pk)
+        self.assertEqual(writes(queries), [])
+        self.assertFalse(DataStamp.objects.filter(user=self.user).exists())
+
+    def test_bulk_writes_warm_up_on_commit(self):
+        other = self.user.__class__.objects.create_user('other', password='x')
+        rows = [Expense(user=self.user, label=label(self.user, 'بنزين'), amount=1, date=date.today())]
+        Expense.objects.bulk_create(rows)
+        with mock.patch('expenses.signals.schedule_warmup') as schedule_warmup:
+            with self.captureOnCommitCallbacks() as callbacks:
+                after_bulk_write(expenses=rows, incomes=[Income(user=other, amount=1)])
+            schedule_warmup.assert_not_called()
+            for callback in callbacks:
+                callback()
+        self.assertEqual(sorted(call.args[0] for call in schedule_warmup.call_args_list), [self.user.pk, other.pk])
+
+    @override_settings(WARMUP_ENABLED=True)
+    def test_login_warms_up_on_commit(self):
+        # warm_user, mocked away here, is what takes the user off the queue
+        self.addCleanup(pending.discard, self.user.pk)
+        with mock.patch('expenses.warmup.executor') as executor:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.force_login(self.user)
+            executor.submit.assert_not_called()
+            for callback in callbacks:
+                callback()
+        executor.submit.assert_called_once_with(warm_user, self.user.pk)
+
+    def test_disabled_by_the_setting(self):
+        with mock.patch('expenses.warmup.executor') as executor:
+            self.assertIsNone(schedule_warmup(self.user.pk))
+        executor.submit.assert_not_called()
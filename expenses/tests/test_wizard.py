@@ -0,0 +1,46 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from expenses.models import Label, PlanSummary
+
+from .helpers import UserTestCase, group
+
+
+class WizardTests(UserTestCase):
+    """Each onboarding step saves its changed amounts in one UPDATE."""
+
+    def setUp(self):
+        super().setUp()
+        self.labels = list(Label.objects.filter(group=group(self.user, 'monthly_fixed')))
+
+    def post(self, amounts):
+        data = {f'{label.pk}-expected_monthly': amounts.get(label.name, 0) for label in self.labels}
+        return self.client.post(reverse('monthly_fixed_expenses_view'), data)
+
+    def test_changed_amounts_are_saved_at_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post({'إيجار': 3000, 'الماء': 150})
+        self.assertRedirects(response, reverse('edit_remaining_groups_view'), fetch_redirect_response=False)
+        updates = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('UPDATE "expenses_label"')]
+        self.assertEqual(len(updates), 1)
+
+        amounts = dict(Label.objects.filter(pk__in=[label.pk for label in self.labels])
+                       .values_list('name', 'expected_monthly'))
+        self.assertEqual((amounts['إيجار'], amounts['الماء'], amounts['قرض']), (3000, 150, 0))
+        self.assertEqual(PlanSummary.objects.get(user=self.user).monthly_expected, 3150)
+
+    def test_nothing_is_saved_when_a_form_is_invalid(self):
+        response = self.post({'إيجار': 3000, 'الماء': 'abc'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Label.objects.filter(user=self.user, expected_monthly__gt=0).exists())
+
+    def test_remaining_groups_step_lists_every_label_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('edit_remaining_groups_view'))
+        names = [label.name for _, label, _ in response.context['label_forms']]
+        self.assertIn('بنزين', names)
+        self.assertIn('صندوق الطوارئ', names)
+        self.assertEqual(len(names), len(set(names)))
+        label_selects = [q for q in queries.captured_queries if 'FROM "expenses_label"' in q['sql']]
+        self.assertEqual(len(label_selects), 1)
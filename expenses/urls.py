@@ -1,5 +1,11 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import live, views
+
+if settings.ASYNC_VIEWS:
+    from . import async_views as read_views
+else:
+    read_views = views
 
 urlpatterns = [
     # 🔐 Auth
@@ -10,6 +16,7 @@ urlpatterns = [
     # 👤 Profile
     path('profile/', views.profile_view, name='profile'),
     path('profile/edit/', views.edit_profile_view, name='edit_profile'),
+    path('profile/delete/', views.delete_account_view, name='delete_account'),
 
     # 💰 Income
     path('incomes/', views.income_list, name='income_list'),
@@ -31,6 +38,7 @@ urlpatterns = [
     path('labels/add/', views.label_add, name='label_add'),
     path('labels/<int:pk>/edit/', views.label_edit, name='label_edit'),
     path('labels/<int:pk>/delete/', views.label_delete, name='label_delete'),
+    path('labels/<int:pk>/merge/', views.label_merge, name='label_merge'),
     path('labels/restore/<int:label_id>/', views.label_restore_view, name='label_restore_view'),
     path('labels/<int:pk>/up/', views.move_label_up, name='move_label_up'),
     path('labels/<int:pk>/down/', views.move_label_down, name='move_label_down'),
@@ -40,15 +48,28 @@ urlpatterns = [
     path('expenses/add/', views.expense_add, name='expense_add'),
     path('expenses/<int:pk>/edit/', views.expense_edit, name='expense_edit'),
     path('expenses/<int:pk>/delete/', views.expense_delete, name='expense_delete'),
+    path('expenses/search/', views.expense_search, name='expense_search'),
+    path('expenses/anomalies/', views.expense_anomalies, name='expense_anomalies'),
+    path('expenses/<int:pk>/dismiss/', views.expense_anomaly_dismiss, name='expense_anomaly_dismiss'),
+    path('recurring/', views.recurring_list, name='recurring_list'),
+    path('recurring/<int:pk>/delete/', views.recurring_delete, name='recurring_delete'),
     path('add_expense_view/', views.add_expense_view, name='add_expense_view'),
 
 
     # 📊 Dashboard
-    path('dashboard/', views.yearly_dashboard_view, name='dashboard'),
-    path('', views.home, name='home'),
-    path('planning_view/', views.planning_view, name='planning_view'),
+    path('dashboard/', read_views.yearly_dashboard_view, name='dashboard'),
+    path('dashboard/month/', views.dashboard, name='monthly_dashboard'),
+    path('dashboard/simulator/', views.budget_simulator_view, name='budget_simulator'),
+    path('', read_views.home, name='home'),
+    path('planning_view/', read_views.planning_view, name='planning_view'),
+    path('live/', live.live_updates, name='live_updates'),
+
 
 
+    # ⚙️ Jobs
+    path('jobs/', views.job_list, name='job_list'),
+    path('jobs/<int:pk>/', views.job_status_view, name='job_status'),
+    path('jobs/yearly-report/', views.yearly_report_request, name='yearly_report_request'),
 
     # 🚀 welcome
     path('welcome/income/', views.expected_monthly_income_view, name='expected_monthly_income_view'),
@@ -1,3 +1,4 @@
+from django.db import transaction
 
 from .models import Group, Label
 
@@ -57,24 +58,26 @@ def create_default_categories(user):
         },
     }
 
-    for group_order, (code, data) in enumerate(defaults.items(), start=1):
-        group = Group.objects.create(
-            user=user,
-            name=data['name'],
-            code=code,
-            protected=data['protected'],
-            order=group_order
-        )
-
-        for label_order, (label_name, expected) in enumerate(data['labels'], start=1):
-            Label.objects.create(
+    # One transaction, so the planning totals are computed once rather than after every row
+    with transaction.atomic():
+        for group_order, (code, data) in enumerate(defaults.items(), start=1):
+            group = Group.objects.create(
                 user=user,
-                group=group,
-                name=label_name.strip(),
-                expected_monthly=expected,
-                order=label_order
+                name=data['name'],
+                code=code,
+                protected=data['protected'],
+                order=group_order
             )
 
+            for label_order, (label_name, expected) in enumerate(data['labels'], start=1):
+                Label.objects.create(
+                    user=user,
+                    group=group,
+                    name=label_name.strip(),
+                    expected_monthly=expected,
+                    order=label_order
+                )
+
 
 
 # def create_default_categories(user):
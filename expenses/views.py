@@ -2,15 +2,30 @@ from collections import defaultdict
 from django.contrib import messages
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Sum, Max, Prefetch
+from django.views.decorators.http import require_POST
+from django.db import transaction
+from django.db.models import Sum, Max, Prefetch, Q
 from django.urls import reverse
-from .models import CustomUser, Expense, Group, Income, Label
+from .models import (
+    ANNUAL_GROUP_CODE, CustomUser, DataStamp, Expense, Group, Income, Job, Label, LabelStats, PlanSummary, RecurrenceRule,
+)
 from .forms import (
     AnnualLabelAddForm, AnnualLabelForm, CustomUserCreationForm, ExpectedMonthlyForm, ExpectedMonthlyIncomeForm,  ExpenseForm, FixedLabelAddForm,
     GroupForm, IncomeForm, LabelExpenseFormSet, LabelForm, ProfileForm,
-     MonthlyVariableExpenseForm, StyledAuthenticationForm,MonthlyFixedExpectedForm,AnnualExpectedForm
+     MonthlyVariableExpenseForm, StyledAuthenticationForm,MonthlyFixedExpectedForm,AnnualExpectedForm,
+    BudgetSimulatorForm, NewRecurringLabelFormSet, RecurrenceRuleForm, LabelMergeForm, LabelMoveForm, AccountDeleteForm
 )
+from .caching import bump_categories_version, get_or_compute, stamped_key
+from .conditional import get_data_stamp, user_data_condition
+from .dashboard import cached_chart_data, yearly_tables
+from .forecast import label_forecasts, touch_expenses
+from .jobs import enqueue, job_status
+from .live import expense_deltas, get_broadcaster, live_url, merge as merge_deltas
+from .rendering import is_fragment_request, render_view
+from .search import index_expenses, search
+from .simulator import HORIZONS, SENSITIVITY_STEPS, cached_history, evaluate, scenario, sensitivity
 from .utils import create_default_categories
 from datetime import date, timedelta
 from django.utils import timezone
@@ -48,6 +63,7 @@ def custom_404_view(request, exception=None):
 
 
 @login_required
+@user_data_condition('incomes')
 def income_list(request):
     incomes = Income.objects.filter(user=request.user).order_by('-date')
     return render(request, 'income/income_list.html', {'incomes': incomes})
@@ -109,10 +125,17 @@ def income_delete(request, income_id):
 
 
 
+def group_list_context(user):
+    return {
+        'groups': Group.objects.for_user(user).alive(),
+        'list_url': reverse('group_list'),
+    }
+
 @login_required
+@user_data_condition('groups')
 def group_list(request):
-    groups = Group.objects.filter(user=request.user, is_deleted=False)
-    return render(request, 'group/group_list.html', {'groups': groups})
+    return render_view(request, 'group/group_list.html', group_list_context(request.user),
+                       fragment_template='partials/group_list_items.html')
 
 @login_required
 def group_add(request):
@@ -122,13 +145,13 @@ def group_add(request):
     if request.method == 'POST' and form.is_valid():
         group = form.save(commit=False)
         group.user = request.user
-        group.order = (Group.objects.filter(user=request.user, is_deleted=False)
+        group.order = (Group.objects.for_user(request.user).alive()
                        .aggregate(Max('order'))['order__max'] or 0) + 1
         group.save()
         
         return redirect(next_url)
 
-    deleted_groups = Group.objects.filter(user=request.user, is_deleted=True)
+    deleted_groups = Group.objects.for_user(request.user).deleted()
     return render(request, 'group/group_form.html', {
         'form': form,
         'deleted_groups': deleted_groups,
@@ -159,7 +182,7 @@ def group_edit(request, group_id):
 @login_required
 def group_delete(request, group_id):
     next_url = request.GET.get('next') or reverse('group_list')
-    group = get_object_or_404(Group, id=group_id, user=request.user, is_deleted=False)
+    group = get_object_or_404(Group.objects.alive(), id=group_id, user=request.user)
 
     if group.protected:
         messages.warning(request, "⚠️ لا يمكن حذف هذه المجموعة لأنها محمية.")
@@ -170,7 +193,7 @@ def group_delete(request, group_id):
         group.save()
 
         # Reorder remaining groups
-        for i, g in enumerate(Group.objects.filter(user=request.user, is_deleted=False).order_by('order'), start=1):
+        for i, g in enumerate(Group.objects.for_user(request.user).alive().order_by('order'), start=1):
             g.order = i
             g.save()
 
@@ -190,7 +213,7 @@ def group_restore_view(request, group_id):
 
     if request.method == 'POST' and form.is_valid():
         group = form.save(commit=False)
-        group.order = (Group.objects.filter(user=request.user, is_deleted=False)
+        group.order = (Group.objects.for_user(request.user).alive()
                        .aggregate(Max('order'))['order__max'] or 0) + 1
         group.is_deleted = False
         group.save()
@@ -205,34 +228,43 @@ def group_restore_view(request, group_id):
 @login_required
 def move_group_up(request, pk):
     next_url = request.GET.get('next') or reverse('group_list')
-    group = get_object_or_404(Group, pk=pk, user=request.user)
-    above = Group.objects.filter(user=request.user, order__lt=group.order).order_by('-order').first()
+    group = get_object_or_404(Group.objects.alive(), pk=pk, user=request.user)
+    above = Group.objects.for_user(request.user).alive().filter(order__lt=group.order).order_by('-order').first()
     if above:
         group.order, above.order = above.order, group.order
         group.save()
         above.save()
+    if is_fragment_request(request):
+        return render_view(request, 'partials/group_list_items.html', group_list_context(request.user))
     return redirect(next_url)
 
 @login_required
 def move_group_down(request, pk):
     next_url = request.GET.get('next') or reverse('group_list')
-    group = get_object_or_404(Group, pk=pk, user=request.user)
-    below = Group.objects.filter(user=request.user, order__gt=group.order).order_by('order').first()
+    group = get_object_or_404(Group.objects.alive(), pk=pk, user=request.user)
+    below = Group.objects.for_user(request.user).alive().filter(order__gt=group.order).order_by('order').first()
     if below:
         group.order, below.order = below.order, group.order
         group.save()
         below.save()
+    if is_fragment_request(request):
+        return render_view(request, 'partials/group_list_items.html', group_list_context(request.user))
     return redirect(next_url)
 
 
 
 # 🏷️ Label Views
+def label_list_context(user):
+    groups = Group.objects.for_user(user).alive().prefetch_related(
+        Prefetch('labels', queryset=Label.objects.alive().order_by('order'))
+    )
+    return {'groups': groups, 'list_url': reverse('label_list')}
+
 @login_required
+@user_data_condition('groups', 'labels')
 def label_list(request):
-    groups = Group.objects.filter(user=request.user, is_deleted=False).prefetch_related(
-        Prefetch('labels', queryset=Label.objects.filter(is_deleted=False).order_by('order'))
-    )
-    return render(request, 'label/label_list.html', {'groups': groups})
+    return render_view(request, 'label/label_list.html', label_list_context(request.user),
+                       fragment_template='partials/label_list_items.html')
 
 @login_required
 def label_add(request):
@@ -245,14 +277,14 @@ def label_add(request):
         label = form.save(commit=False)
         
         group = label.group
-        max_order = Label.objects.filter(user=user, group=group, is_deleted=False).aggregate(Max('order'))['order__max'] or 0
+        max_order = Label.objects.for_user(user).alive().filter(group=group).aggregate(Max('order'))['order__max'] or 0
         label.order = max_order + 1
         
         label.user = user
         label.save()
         return redirect(next_url)
 
-    deleted_labels = Label.objects.filter(user=user, is_deleted=True)
+    deleted_labels = Label.objects.for_user(user).deleted()
     return render(request, 'label/label_form.html', {
         'form': form,
         'title': '➕ إضافة تسمية فرعية',
@@ -263,7 +295,7 @@ def label_add(request):
 @login_required
 def label_edit(request, pk):
     next_url = request.GET.get('next') or request.POST.get('next') or reverse('label_list')
-    label = get_object_or_404(Label, pk=pk, user=request.user, is_deleted=False)
+    label = get_object_or_404(Label.objects.alive(), pk=pk, user=request.user)
     form = LabelForm(request.POST or None, instance=label, user=request.user)
 
     if request.method == 'POST' and form.is_valid():
@@ -277,20 +309,111 @@ def label_edit(request, pk):
         'label': label
     })
 
+def renumber_labels(user, group_id):
+    for i, lbl in enumerate(Label.objects.for_user(user).alive().filter(group_id=group_id).order_by('order'), start=1):
+        if lbl.order != i:
+            lbl.order = i
+            lbl.save()
+
+def soft_delete_label(label):
+    label.is_deleted = True
+    label.save()
+    # Reorder remaining labels in the same group
+    renumber_labels(label.user, label.group_id)
+
+def planned_amount(amount, from_group, to_group):
+    # The annual group's labels hold a yearly amount in expected_monthly
+    if from_group.code == ANNUAL_GROUP_CODE and to_group.code != ANNUAL_GROUP_CODE:
+        return round(amount / 12)
+    if to_group.code == ANNUAL_GROUP_CODE and from_group.code != ANNUAL_GROUP_CODE:
+        return amount * 12
+    return amount
+
+# Expenses reindexed per query after a merge, below SQLite's limit on query parameters
+MERGE_INDEX_BATCH = 500
+
+def merge_labels(source, target):
+    """
+    Move every expense (and recurrence rule) of source to target with one UPDATE
+    each, fold source's stats and planned amount into target, then soft-delete
+    source. Returns the number of expenses moved.
+    """
+    user = source.user
+    with transaction.atomic():
+        # The moved rows, read before the UPDATE: the only ones to reindex and publish
+        rows = list(Expense.objects.filter(label=source).values_list('pk', 'date', 'amount'))
+        moved = Expense.objects.filter(label=source).update(label=target, updated_at=timezone.now())
+        RecurrenceRule.objects.filter(label=source).update(label=target)
+
+        stats = LabelStats.locked({source.pk, target.pk})
+        stats[target.pk].merge(stats[source.pk])
+        stats[target.pk].save()
+        stats[source.pk].delete()
+
+        target.expected_monthly += planned_amount(source.expected_monthly, source.group, target.group)
+        target.save()
+        soft_delete_label(source)
+
+        # update() sends no signal: what the Expense receivers would do
+        pks = [pk for pk, _, _ in rows]
+        for start in range(0, len(pks), MERGE_INDEX_BATCH):
+            index_expenses(Expense.objects.filter(pk__in=pks[start:start + MERGE_INDEX_BATCH]))
+        events = merge_deltas([
+            event for _, day, amount in rows
+            for event in expense_deltas(Expense(label_id=source.pk, date=day, amount=amount),
+                                        Expense(label=target, date=day, amount=amount))
+        ])
+        touch_expenses({user.pk: events})
+        if events:
+            transaction.on_commit(lambda: get_broadcaster().publish(user.pk, events))
+    return moved
+
+def move_label(label, group):
+    """Re-parent a label (its expenses follow it), last in its new group."""
+    previous_group = label.group
+    with transaction.atomic():
+        label.expected_monthly = planned_amount(label.expected_monthly, previous_group, group)
+        label.group = group
+        label.order = (Label.objects.for_user(label.user).alive().filter(group=group)
+                       .aggregate(Max('order'))['order__max'] or 0) + 1
+        label.save()
+        renumber_labels(label.user, previous_group.pk)
+        # The search index holds each expense's group name
+        index_expenses(Expense.objects.filter(label=label))
+
 @login_required
-def label_delete(request, pk):
-    label = get_object_or_404(Label, pk=pk, user=request.user, is_deleted=False)
+def label_merge(request, pk):
+    label = get_object_or_404(Label.objects.alive().select_related('group'), pk=pk, user=request.user)
     next_url = request.POST.get('next') or request.GET.get('next') or reverse('label_list')
+    merge_form = LabelMergeForm(request.POST if 'merge' in request.POST else None, label=label)
+    move_form = LabelMoveForm(request.POST if 'move' in request.POST else None, label=label)
 
-    if request.method == 'POST':
-        label.is_deleted = True
-        label.save()
+    if merge_form.is_valid():
+        target = merge_form.cleaned_data['target']
+        moved = merge_labels(label, target)
+        messages.success(request, f"✅ تم دمج {label.name} في {target.name} ({moved} مصروف)")
+        return redirect(next_url)
 
-        # Reorder remaining labels in the same group
-        for i, lbl in enumerate(Label.objects.filter(user=request.user, group=label.group, is_deleted=False).order_by('order'), start=1):
-            lbl.order = i
-            lbl.save()
+    if move_form.is_valid():
+        move_label(label, move_form.cleaned_data['group'])
+        messages.success(request, f"✅ تم نقل {label.name} إلى {label.group.name}")
+        return redirect(next_url)
+
+    return render(request, 'label/label_merge.html', {
+        'label': label,
+        'expense_count': label.expenses.count(),
+        'merge_form': merge_form,
+        'move_form': move_form,
+        'next_url': next_url,
+    })
+
+@login_required
+def label_delete(request, pk):
+    label = get_object_or_404(Label.objects.alive(), pk=pk, user=request.user)
+    next_url = request.POST.get('next') or request.GET.get('next') or reverse('label_list')
 
+    if request.method == 'POST':
+        soft_delete_label(label)
         messages.success(request, f"✅ تم حذف التصنيف: {label.name}")
         return redirect(next_url)
 
@@ -307,7 +430,7 @@ def label_restore_view(request, label_id):
 
     if request.method == 'POST' and form.is_valid():
         label = form.save(commit=False)
-        max_order = Label.objects.filter(user=request.user, is_deleted=False).aggregate(Max('order'))['order__max'] or 0
+        max_order = Label.objects.for_user(request.user).alive().aggregate(Max('order'))['order__max'] or 0
         label.order = max_order + 1
         label.is_deleted = False
         label.save()
@@ -322,11 +445,9 @@ def label_restore_view(request, label_id):
 @login_required
 def move_label_up(request, pk):
     next_url = request.GET.get('next') or reverse('label_list')
-    label = get_object_or_404(Label, pk=pk, user=request.user, is_deleted=False)
-    above = Label.objects.filter(
-        user=request.user,
+    label = get_object_or_404(Label.objects.alive(), pk=pk, user=request.user)
+    above = Label.objects.for_user(request.user).alive().filter(
         group=label.group,
-        is_deleted=False,
         order__lt=label.order
     ).order_by('-order').first()
 
@@ -335,16 +456,16 @@ def move_label_up(request, pk):
         label.save()
         above.save()
 
+    if is_fragment_request(request):
+        return render_view(request, 'partials/label_list_items.html', label_list_context(request.user))
     return redirect(next_url)
 
 @login_required
 def move_label_down(request, pk):
     next_url = request.GET.get('next') or reverse('label_list')
-    label = get_object_or_404(Label, pk=pk, user=request.user, is_deleted=False)
-    below = Label.objects.filter(
-        user=request.user,
+    label = get_object_or_404(Label.objects.alive(), pk=pk, user=request.user)
+    below = Label.objects.for_user(request.user).alive().filter(
         group=label.group,
-        is_deleted=False,
         order__gt=label.order
     ).order_by('order').first()
 
@@ -353,6 +474,8 @@ def move_label_down(request, pk):
         label.save()
         below.save()
 
+    if is_fragment_request(request):
+        return render_view(request, 'partials/label_list_items.html', label_list_context(request.user))
     return redirect(next_url)
 
 
@@ -372,10 +495,36 @@ def get_labels(request, group_id):
 
 # 💸 Expense Views
 @login_required
+@user_data_condition('expenses', 'labels', 'groups')
 def expense_list(request):
     expenses = Expense.objects.filter(user=request.user).select_related('label', 'label__group').order_by('-date')
     return render(request, 'expense/expense_list.html', {'expenses': expenses})
 
+def save_expense(expense, previous=None):
+    """
+    Save the expense and fold it into its label's LabelStats in O(1), flagging it
+    when unusually large; previous is its (label_id, amount) before an edit.
+    """
+    if previous == (expense.label_id, expense.amount):
+        expense.save()
+        return expense.is_flagged
+
+    with transaction.atomic():
+        if previous:
+            stats = LabelStats.for_label(previous[0])
+            stats.remove(previous[1])
+            stats.save()
+        stats = LabelStats.for_label(expense.label_id)
+        expense.is_flagged = stats.is_anomaly(expense.amount)
+        expense.save()
+        stats.add(expense.amount)
+        stats.save()
+    return expense.is_flagged
+
+def warn_if_flagged(request, expense):
+    if expense.is_flagged:
+        messages.warning(request, f"⚠️ مبلغ غير معتاد لـ {expense.label.name}: {expense.amount} د.م")
+
 @login_required
 def expense_add(request):
     next_url = request.GET.get('next') or request.POST.get('next') or reverse('expense_list')
@@ -384,7 +533,8 @@ def expense_add(request):
     if request.method == 'POST' and form.is_valid():
         expense = form.save(commit=False)
         expense.user = request.user
-        expense.save()
+        save_expense(expense)
+        warn_if_flagged(request, expense)
         return redirect(next_url)
 
     return render(request, 'expense/expense_form.html', {
@@ -398,7 +548,7 @@ def add_expense_view(request):
     next_url = request.GET.get("next") or request.POST.get("next") or reverse("expense_list")
     selected_group_id = request.GET.get("group")
 
-    labels = Label.objects.filter(group_id=selected_group_id, user=request.user, is_deleted=False) if selected_group_id else []
+    labels = Label.objects.for_user(request.user).alive().filter(group_id=selected_group_id) if selected_group_id else []
 
     initial_data = [
         {"label_id": label.id, "label_name": label.name}
@@ -410,21 +560,24 @@ def add_expense_view(request):
     if request.method == "POST":
         formset = LabelExpenseFormSet(request.POST)
         if formset.is_valid():
-            for form in formset:
-                label_id = form.cleaned_data.get("label_id")
-                amount = form.cleaned_data.get("amount")
-                if amount:
-                    Expense.objects.create(
-                        label_id=label_id,
-                        amount=amount,
-                        date=timezone.now(),
-                        user=request.user
-                    )
+            with transaction.atomic():
+                for form in formset:
+                    label_id = form.cleaned_data.get("label_id")
+                    amount = form.cleaned_data.get("amount")
+                    if amount:
+                        expense = Expense(
+                            label_id=label_id,
+                            amount=amount,
+                            date=timezone.now(),
+                            user=request.user
+                        )
+                        save_expense(expense)
+                        warn_if_flagged(request, expense)
             return redirect(next_url)
 
     return render(request, "expense/add_expense_form.html", {
         "formset": formset,
-        "groups": Group.objects.for_user(request.user),
+        "groups": Group.objects.for_user(request.user).alive(),
         "selected_group_id": selected_group_id,
         "next": next_url
     })
@@ -433,10 +586,12 @@ def add_expense_view(request):
 def expense_edit(request, pk):
     next_url = request.GET.get('next') or request.POST.get('next') or reverse('expense_list')
     expense = get_object_or_404(Expense, pk=pk, user=request.user)
+    previous = (expense.label_id, expense.amount)
     form = ExpenseForm(request.POST or None, instance=expense, user=request.user)
 
     if request.method == 'POST' and form.is_valid():
-        form.save()
+        save_expense(form.save(commit=False), previous)
+        warn_if_flagged(request, expense)
         return redirect(next_url)
 
     return render(request, 'expense/expense_form.html', {
@@ -452,7 +607,11 @@ def expense_delete(request, pk):
     expense = get_object_or_404(Expense, pk=pk, user=request.user)
 
     if request.method == 'POST':
-        expense.delete()
+        with transaction.atomic():
+            stats = LabelStats.for_label(expense.label_id)
+            stats.remove(expense.amount)
+            stats.save()
+            expense.delete()
         return redirect(next_url)
 
     return render(request, 'expense/expense_confirm_delete.html', {
@@ -461,15 +620,73 @@ def expense_delete(request, pk):
         'next': next_url
     })
 
+SEARCH_PAGE_SIZE = 20
+
+@login_required
+def expense_search(request):
+    query = request.GET.get('q', '').strip()
+    page = request.GET.get('page', '1')
+    page = int(page) if page.isdigit() and int(page) > 0 else 1
+
+    expenses, total = search(request.user, query, offset=(page - 1) * SEARCH_PAGE_SIZE, limit=SEARCH_PAGE_SIZE)
+    return render(request, 'expense/expense_search.html', {
+        'query': query,
+        'expenses': expenses,
+        'total': total,
+        'page': page,
+        'previous_page': page - 1 if page > 1 else None,
+        'next_page': page + 1 if page * SEARCH_PAGE_SIZE < total else None,
+    })
+
+@login_required
+def expense_anomalies(request):
+    expenses = (
+        Expense.objects.filter(user=request.user, is_flagged=True)
+        .select_related('label', 'label__group', 'label__stats')
+        .order_by('-date')
+    )
+    return render(request, 'expense/expense_anomalies.html', {'expenses': expenses})
 
+@login_required
+@require_POST
+def expense_anomaly_dismiss(request, pk):
+    if Expense.objects.filter(pk=pk, user=request.user).update(is_flagged=False, updated_at=timezone.now()):
+        # update() sends no signal, and the expense list shows the flag
+        touch_expenses({request.user.pk: []})
+    return redirect('expense_anomalies')
 
 
+# 🔁 Recurring expenses and incomes (created by `manage.py run_recurring`)
 @login_required
-def home(request):
-    user = request.user
-    today = date.today()
+def recurring_list(request):
+    form = RecurrenceRuleForm(request.POST or None, user=request.user)
+
+    if request.method == 'POST' and form.is_valid():
+        rule = form.save(commit=False)
+        rule.user = request.user
+        rule.save()
+        messages.success(request, "✅ تمت إضافة العملية المتكررة")
+        return redirect('recurring_list')
+
+    rules = RecurrenceRule.objects.for_user(request.user).select_related('label', 'label__group')
+    return render(request, 'recurring/recurring_list.html', {'form': form, 'rules': rules})
+
+@login_required
+@require_POST
+def recurring_delete(request, pk):
+    # Occurrences already created stay; they only lose their link to the rule
+    get_object_or_404(RecurrenceRule, pk=pk, user=request.user).delete()
+    return redirect('recurring_list')
+
 
-    # Parse filters
+
+HOME_TOTALS_SOURCES = ('expenses', 'incomes', 'labels')
+PLANNING_SOURCES = ('groups', 'labels')
+
+
+def home_filters(request):
+    """Period (defaults to the current month) and group/label filters from the query string."""
+    today = date.today()
     start_str = request.GET.get('start_date')
     end_str = request.GET.get('end_date')
     group_id = request.GET.get('group')
@@ -485,6 +702,10 @@ def home(request):
     except ValueError:
         end_date = today
 
+    return start_date, end_date, group_id, label_id
+
+
+def home_querysets(user, start_date, end_date, group_id, label_id):
     expenses = Expense.objects.filter(user=user, date__range=(start_date, end_date)).select_related('label', 'label__group')
     incomes = Income.objects.filter(user=user, date__range=(start_date, end_date))
 
@@ -492,42 +713,71 @@ def home(request):
         expenses = expenses.filter(label_id=int(label_id))
     elif group_id and group_id.isdigit():
         expenses = expenses.filter(label__group_id=int(group_id))
+    return expenses, incomes
+
+
+def home_totals_key(user, stamp, filters):
+    start_date, end_date, group_id, label_id = filters
+    ids = [value if value and value.isdigit() else '' for value in (group_id, label_id)]
+    return stamped_key('home_totals', user.pk, stamp, HOME_TOTALS_SOURCES, start_date, end_date, *ids)
+
 
-    total_expense = expenses.aggregate(total=Sum('amount'))['total'] or 0
-    total_income = incomes.aggregate(total=Sum('amount'))['total'] or 0
-    balance = total_income - total_expense
+def home_totals(user, stamp, filters):
+    """(total_expense, total_income) for the filtered period, cached until the data changes."""
+    def compute():
+        expenses, incomes = home_querysets(user, *filters)
+        return (
+            expenses.aggregate(total=Sum('amount'))['total'] or 0,
+            incomes.aggregate(total=Sum('amount'))['total'] or 0,
+        )
+    return get_or_compute(home_totals_key(user, stamp, filters), compute)
 
+
+def group_by_label(expenses):
     grouped_expenses = defaultdict(lambda: {'items': [], 'total': 0})
     for expense in expenses:
         label = expense.label
         label_key = label if label else "(بدون تسمية)"
         grouped_expenses[label_key]['items'].append(expense)
         grouped_expenses[label_key]['total'] += expense.amount
+    return dict(grouped_expenses)
 
 
-
-
-
-    # grouped_expenses = defaultdict(lambda: {'items': [], 'total': 0})
-    # for expense in expenses:
-    #     label_name = expense.label.name if expense.label else "(بدون تسمية)"
-    #     grouped_expenses[label_name]['items'].append(expense)
-    #     grouped_expenses[label_name]['total'] += expense.amount
-
-    context = {
+def home_context(filters, total_expense, total_income, expenses, groups, labels):
+    start_date, end_date, group_id, label_id = filters
+    return {
         'start_date': start_date.isoformat(),
         'end_date': end_date.isoformat(),
         'total_expense': total_expense,
         'total_income': total_income,
-        'balance': balance,
-        'grouped_expenses': dict(grouped_expenses),
-        'groups': Group.objects.filter(user=user, is_deleted=False),
-        'labels': Label.objects.filter(user=user, is_deleted=False),
+        'balance': total_income - total_expense,
+        'grouped_expenses': group_by_label(expenses),
+        'groups': groups,
+        'labels': labels,
         'selected_group': int(group_id) if group_id and group_id.isdigit() else '',
         'selected_label': int(label_id) if label_id and label_id.isdigit() else '',
     }
 
-    return render(request, 'home.html', context)
+
+@login_required
+@user_data_condition('expenses', 'incomes', 'groups', 'labels',
+                     vary=lambda request: [request.GET.urlencode()], daily=True)
+def home(request):
+    user = request.user
+    filters = home_filters(request)
+    expenses, _ = home_querysets(user, *filters)
+    total_expense, total_income = home_totals(user, get_data_stamp(request), filters)
+
+    context = home_context(
+        filters,
+        total_expense=total_expense,
+        total_income=total_income,
+        expenses=expenses,
+        groups=Group.objects.for_user(user).alive(),
+        labels=Label.objects.for_user(user).alive(),
+    )
+    context['forecasts'] = label_forecasts(user, get_data_stamp(request))
+    return render_view(request, 'home.html', context, fragment_template='partials/home_results.html')
 
 
 
@@ -548,47 +798,75 @@ def edit_profile_view(request):
 
     return render(request, 'auths/edit_profile.html', {'form': form})
 
+@login_required
+def delete_account_view(request):
+    user = request.user
+    form = AccountDeleteForm(request.POST or None, user=user)
 
+    if request.method == 'POST' and form.is_valid():
+        # The account is closed at once; its rows are deleted in the background (expenses.purge)
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        enqueue('purge_account', user_id=user.pk)
+        logout(request)
+        messages.success(request, "✅ تم إغلاق حسابك، وسيتم حذف جميع بياناتك.")
+        return redirect('login')
+
+    return render(request, 'auths/delete_account.html', {
+        'form': form,
+        'expense_count': Expense.objects.for_user(user).count(),
+        'income_count': Income.objects.for_user(user).count(),
+    })
 
 
-@login_required
-def planning_view(request):
-    user = request.user
-    monthly_income = user.expected_monthly_income
 
-    # Identify the annual group (by name or flag)
-    annual_group = Group.objects.for_user(user).filter(name__icontains='سنوي').first()
 
-    # All groups except annual
-    groups = Group.objects.for_user(user).filter(is_deleted=False).exclude(id=annual_group.id if annual_group else None).prefetch_related(
-        Prefetch('labels', queryset=Label.objects.filter(is_deleted=False).order_by('order'))
-    )
+def planning_data(user, stamp):
+    """The planning page context, cached until groups, labels or the expected income change."""
+    def compute():
+        groups, annual_labels = planning_querysets(user)
+        return planning_context(user.expected_monthly_income, PlanSummary.for_user(user), list(groups), list(annual_labels))
+    return get_or_compute(planning_key(user, stamp), compute)
 
-    # Annual labels
-    annual_labels = Label.objects.for_user(user).filter(group=annual_group, is_deleted=False) if annual_group else []
-    annual_total = sum(label.expected_monthly for label in annual_labels)
-    annual_monthly_equiv = annual_total / 12
 
-    # Monthly expenses from non-annual groups
-    monthly_expense_total = sum(
-        label.expected_monthly for group in groups for label in group.labels.all()
-    ) + annual_monthly_equiv
+def planning_key(user, stamp):
+    return stamped_key('planning', user.pk, stamp, PLANNING_SOURCES, user.expected_monthly_income)
+
 
-    net_balance = monthly_income - monthly_expense_total
+def planning_querysets(user):
+    # All groups except annual, each with its total from the same query
+    groups = Group.objects.for_user(user).alive().exclude(code=ANNUAL_GROUP_CODE).annotate(
+        total_expected=Sum('labels__expected_monthly', filter=Q(labels__is_deleted=False), default=0)
+    ).prefetch_related(
+        Prefetch('labels', queryset=Label.objects.alive().order_by('order'))
+    )
+
+    # Annual labels
+    annual_labels = Label.objects.for_user(user).alive().filter(group__code=ANNUAL_GROUP_CODE)
+    return groups, annual_labels
 
-    # Add group-level totals
-    for group in groups:
-        group.total_expected = sum(label.expected_monthly for label in group.labels.all())
 
-    return render(request, 'planning_page.html', {
+def planning_context(monthly_income, summary, groups, annual_labels):
+    # Totals come from PlanSummary, maintained on Label/Group writes (see signals)
+    return {
         'monthly_income': monthly_income,
-        'monthly_expense_total': monthly_expense_total,
-        'net_balance': net_balance,
+        'monthly_expense_total': summary.monthly_expense_total,
+        'net_balance': monthly_income - summary.monthly_expense_total,
         'groups': groups,
         'annual_labels': annual_labels,
-        'annual_total': annual_total,
-        'annual_monthly_equiv': annual_monthly_equiv,
-    })
+        'annual_total': summary.annual_total,
+        'annual_monthly_equiv': summary.annual_monthly,
+    }
+
+
+@login_required
+@user_data_condition('groups', 'labels', 'expenses', vary=lambda request: [request.user.expected_monthly_income],
+                     daily=True)
+def planning_view(request):
+    stamp = get_data_stamp(request)
+    # The forecasts move with every expense, so they stay out of the cached planning data
+    context = {**planning_data(request.user, stamp), 'forecasts': label_forecasts(request.user, stamp)}
+    return render_view(request, 'planning_page.html', context)
 
 @login_required
 def expected_monthly_income_view(request):
@@ -606,13 +884,32 @@ def expected_monthly_income_view(request):
         'next': next_url
     })
 
+def save_expected_monthly(user, forms):
+    """
+    Validate every wizard form, then write the changed expected_monthly values
+    in one bulk_update. Returns False (nothing saved) when any form is invalid.
+    """
+    if not all([form.is_valid() for form in forms]):  # a list, so every form gets its errors
+        return False
+
+    changed = [form.instance for form in forms if form.has_changed()]
+    if changed:
+        now = timezone.now()
+        for label in changed:
+            label.updated_at = now
+        with transaction.atomic():
+            Label.objects.bulk_update(changed, ['expected_monthly', 'updated_at'])
+            # bulk_update sends no post_save: do what the Label receivers in signals.py would
+            DataStamp.touch(user.pk, 'labels')
+            PlanSummary.recompute(user.pk)
+        bump_categories_version(user.pk)
+    return True
+
 @login_required
 def annual_expenses_view(request):
-
-    
     group = get_object_or_404(Group, user=request.user, code='annual_expenses')
 
-    labels = Label.objects.filter(group=group, user=request.user, is_deleted=False)
+    labels = Label.objects.for_user(request.user).alive().filter(group=group)
 
     label_forms = [
         (label, AnnualExpectedForm(request.POST or None, instance=label, prefix=str(label.id)))
@@ -620,18 +917,7 @@ def annual_expenses_view(request):
     ]
 
     if request.method == 'POST':
-        all_valid = True
-        any_changed = True
-
-        for label, form in label_forms:
-            if form.has_changed():
-                if form.is_valid():
-                    form.save()
-                    any_changed = True
-                else:
-                    all_valid = False
-
-        if all_valid and any_changed:
+        if save_expected_monthly(request.user, [form for label, form in label_forms]):
             return redirect(monthly_fixed_expenses_view)
 
     return render(request, 'welcome/annual_expenses_view.html', {
@@ -649,7 +935,7 @@ def add_annual_label_view(request):
         label = form.save(commit=False)
         label.user = request.user
         label.group = group
-        label.order = Label.objects.filter(user=request.user, group=group, is_deleted=False).count() + 1
+        label.order = Label.objects.for_user(request.user).alive().filter(group=group).count() + 1
         label.save()
         return redirect('annual_expenses_view')
 
@@ -664,7 +950,7 @@ def monthly_fixed_expenses_view(request):
 
     group = get_object_or_404(Group, user=request.user, code='monthly_fixed')
 
-    labels = Label.objects.filter(group=group, user=request.user, is_deleted=False)
+    labels = Label.objects.for_user(request.user).alive().filter(group=group)
 
     label_forms = [
         (label, MonthlyFixedExpectedForm(request.POST or None, instance=label, prefix=str(label.id)))
@@ -672,18 +958,7 @@ def monthly_fixed_expenses_view(request):
     ]
 
     if request.method == 'POST':
-        all_valid = True
-        any_changed = True
-
-        for label, form in label_forms:
-            if form.has_changed():
-                if form.is_valid():
-                    form.save()
-                    any_changed = True
-                else:
-                    all_valid = False
-
-        if all_valid and any_changed:
+        if save_expected_monthly(request.user, [form for label, form in label_forms]):
             return redirect(edit_remaining_groups_view)
 
     return render(request, 'welcome/monthly_fixed_expenses_view.html', {
@@ -701,7 +976,7 @@ def add_fixed_label_view(request):
         label = form.save(commit=False)
         label.user = request.user
         label.group = group
-        label.order = Label.objects.filter(user=request.user, group=group, is_deleted=False).count() + 1
+        label.order = Label.objects.for_user(request.user).alive().filter(group=group).count() + 1
         label.save()
         return redirect('monthly_fixed_expenses_view')
 
@@ -716,32 +991,23 @@ def edit_remaining_groups_view(request):
     group_codes = ['monthly_variable', 'groceries', 'emergency']
     groups = Group.objects.filter(user=request.user, code__in=group_codes)
 
+    # Labels of all three groups in one query
+    labels = Label.objects.for_user(request.user).alive().filter(group__in=groups).select_related('group')
+
     label_forms = []
 
-    for group in groups:
-        labels = Label.objects.filter(group=group, user=request.user, is_deleted=False)
-        for label in labels:
-            prefix = f"{group.code}_{label.id}"
-            form = ExpectedMonthlyForm(
-                data=request.POST if request.method == 'POST' else None,
-                instance=label,
-                prefix=prefix
-            )
-            label_forms.append((group, label, form))
+    for label in labels:
+        group = label.group
+        prefix = f"{group.code}_{label.id}"
+        form = ExpectedMonthlyForm(
+            data=request.POST if request.method == 'POST' else None,
+            instance=label,
+            prefix=prefix
+        )
+        label_forms.append((group, label, form))
 
     if request.method == 'POST':
-        all_valid = True
-        any_changed = True
-
-        for group, label, form in label_forms:
-            if form.is_valid():
-                if form.has_changed():
-                    form.save()
-                    any_changed = True
-            else:
-                all_valid = False
-
-        if all_valid and any_changed:
+        if save_expected_monthly(request.user, [form for group, label, form in label_forms]):
             return redirect(planning_view)
 
     return render(request, 'welcome/edit_remaining_groups.html', {
@@ -751,174 +1017,71 @@ def edit_remaining_groups_view(request):
 
 
 
-import json
-
-
 @login_required
 def yearly_dashboard_view(request):
-    user = request.user
     year = int(request.GET.get('year', date.today().year))
 
-    # Get all expenses and incomes for the year
-    start_date = date(year, 1, 1)
-    end_date = date(year, 12, 31)
-
-    expenses = Expense.objects.filter(user=user, date__range=(start_date, end_date)).select_related('label', 'label__group')
-    incomes = Income.objects.filter(user=user, date__range=(start_date, end_date))
-
-    # Monthly breakdown
-    monthly_data = []
-    for month in range(1, 13):
-        month_start = date(year, month, 1)
-        month_end = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
-
-        month_expenses = expenses.filter(date__range=(month_start, month_end))
-        month_incomes = incomes.filter(date__range=(month_start, month_end))
-
-        fixed = month_expenses.filter(label__group__name="المصاريف الشهرية الثابتة").aggregate(total=Sum('amount'))['total'] or 0
-        variable = month_expenses.filter(label__group__name="المصاريف الشهرية المتغيرة").aggregate(total=Sum('amount'))['total'] or 0
-        installment = month_expenses.filter(label__name="القسط الشهري للنفقات السنوية").aggregate(total=Sum('amount'))['total'] or 0
-        income = month_incomes.aggregate(total=Sum('amount'))['total'] or 0
-        balance = income - (fixed + variable + installment)
-
-        monthly_data.append({
-            'name': month_start.strftime('%B'),
-            'income': income,
-            'fixed': fixed,
-            'variable': variable,
-            'installment': installment,
-            'balance': balance
-        })
-
-    # Totals
-    total_income = incomes.aggregate(total=Sum('amount'))['total'] or 0
-    total_expense = expenses.aggregate(total=Sum('amount'))['total'] or 0
-    balance = total_income - total_expense
-
-    # Category totals
-    category_totals = {}
-    for label in Label.objects.filter(user=user, is_deleted=False):
-        label_expenses = expenses.filter(label=label).aggregate(total=Sum('amount'))['total'] or 0
-        category_totals[label.name] = {
-            'actual': label_expenses,
-            'expected': label.expected_monthly * 12,
-            'diff': label_expenses - (label.expected_monthly * 12)
-        }
-    # Pie/Donut chart data
-    pie_data = [
-        {'label': label, 'value': data['actual']}
-        for label, data in category_totals.items()
-        if data['actual'] > 0
-    ]
-    # Line chart: monthly income vs. expenses
-    line_data = [
-        {'month': m['name'], 'income': m['income'], 'expense': m['fixed'] + m['variable'] + m['installment']}
-        for m in monthly_data
-    ]
-    # Bar chart: category-wise actual vs expected
-    bar_data = [
-        {'label': label, 'actual': data['actual'], 'expected': data['expected']}
-        for label, data in category_totals.items()
-    ]
-    # Heatmap: spending intensity by month
-    heatmap_data = [
-        {'month': m['name'], 'intensity': m['fixed'] + m['variable'] + m['installment']}
-        for m in monthly_data
-    ]
-
-    donut_labels = [label for label, data in category_totals.items() if data['actual'] > 0]
-    donut_values = [data['actual'] for label, data in category_totals.items() if data['actual'] > 0]
-    
-    group_totals = {}
-    for group in Group.objects.filter(user=user, is_deleted=False):
-        group_expenses = expenses.filter(label__group=group).aggregate(total=Sum('amount'))['total'] or 0
-        if group_expenses > 0:
-            group_totals[group.name] = group_expenses
-
-    group_labels = list(group_totals.keys())
-    group_values = list(group_totals.values())
-    
-    savings_label = Label.objects.filter(user=user, name__icontains="ادخار", is_deleted=False).first()
-    savings_progress = []
-    for month in range(1, 13):
-        month_start = date(year, month, 1)
-        month_end = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
-
-        if savings_label:
-            monthly_savings = expenses.filter(
-                label=savings_label,
-                date__range=(month_start, month_end)
-            ).aggregate(total=Sum('amount'))['total'] or 0
-        else:
-            monthly_savings = 0
-
-        savings_progress.append({
-            'month': month_start.strftime('%B'),
-            'saved': monthly_savings
-        })
-
+    # One normalized payload feeds every chart (json_script + static/js/dashboard.js)
+    chart_data = cached_chart_data(request.user, get_data_stamp(request), year)
     context = {
         'year': year,
         'year_range': range(2020, 2031),  # 2031 is exclusive
-        'monthly_data': monthly_data,
-        'total_income': total_income,
-        'total_expense': total_expense,
-        'balance': balance,
-        'category_totals': category_totals,
-
-
-        'pie_labels': json.dumps([item['label'] for item in pie_data]),
-        'pie_values': json.dumps([item['value'] for item in pie_data]),
-
-        'line_months': json.dumps([item['month'] for item in line_data]),
-        'line_income': json.dumps([item['income'] for item in line_data]),
-        'line_expense': json.dumps([item['expense'] for item in line_data]),
-
-        'bar_labels': json.dumps([item['label'] for item in bar_data]),
-        'bar_actual': json.dumps([item['actual'] for item in bar_data]),
-        'bar_expected': json.dumps([item['expected'] for item in bar_data]),
-
-        'heatmap_months': json.dumps([item['month'] for item in heatmap_data]),
-        'heatmap_intensity': json.dumps([item['intensity'] for item in heatmap_data]),
-        
-        'donut_labels': json.dumps(donut_labels),
-        'donut_values': json.dumps(donut_values),
-        
-        'group_labels': json.dumps(group_labels),
-        'group_values': json.dumps(group_values),
-        
-        'savings_labels': json.dumps([item['month'] for item in savings_progress]),
-        'savings_values': json.dumps([item['saved'] for item in savings_progress]),
+        'chart_data': chart_data,
+        'live_url': live_url(request),
+        **yearly_tables(chart_data),
     }
 
-    
-    
-
-    return render(request, 'yearly_dashboard.html', context)
+    return render_view(request, 'yearly_dashboard.html', context)
 
 
 
 @login_required
 def budget_simulator_view(request):
     user = request.user
-    labels = Label.objects.filter(user=user, is_deleted=False)
-
-    simulated_values = {}
-    if request.method == 'POST':
-        for label in labels:
-            key = f'label_{label.id}'
-            value = int(request.POST.get(key, 0))
-            simulated_values[label.name] = value
-
-        total_simulated = sum(simulated_values.values())
-        simulated_balance = (Income.objects.filter(user=user).aggregate(total=Sum('amount'))['total'] or 0) - total_simulated
-    else:
-        simulated_balance = None
+    history = cached_history(user, get_data_stamp(request))
+    groups = Group.objects.filter(user=user, pk__in=history['group_ids']).order_by('order')
+
+    data = request.GET if 'horizon' in request.GET else None
+    form = BudgetSimulatorForm(data, groups=groups)
+    formset = NewRecurringLabelFormSet(data, prefix='new')
+
+    plan = scenario()
+    if form.is_valid() and formset.is_valid():
+        plan = scenario(
+            cuts=form.cuts(),
+            income_change=float(form.cleaned_data['income_change'] or 0),
+            new_labels=[row.get('amount') or 0 for row in formset.cleaned_data],
+        )
+    horizon = form.cleaned_data['horizon'] if form.is_bound and form.is_valid() else HORIZONS[0]
+
+    # Current habits and the what-if, projected together
+    projection = evaluate(history, [scenario(), plan], horizon)
+    balance = projection['balance'].round().astype(int)
+    savings = projection['savings'].round().astype(int)
+    simulation = {
+        'months': projection['months'],
+        'balance': balance.tolist(),
+        'savings': savings.tolist(),
+    }
+    group_names = dict(zip(history['group_ids'], history['group_names']))
+    sensitivity_rows = [
+        (group_names[group_id], row)
+        for group_id, row in zip(history['group_ids'], sensitivity(history, plan, horizon).round().astype(int).tolist())
+    ]
 
     context = {
-        'labels': labels,
-        'simulated_values': simulated_values,
-        'simulated_balance': simulated_balance
+        'form': form,
+        'formset': formset,
+        'horizon': horizon,
+        'simulation': simulation,
+        'monthly_income': round(projection['income'][1]),
+        'monthly_spending': round(projection['spending'][1].mean()),
+        'current_balance': round(history['balance']),
+        'baseline_end': balance[0, -1],
+        'scenario_end': balance[1, -1],
+        'difference': balance[1, -1] - balance[0, -1],
+        'sensitivity_steps': SENSITIVITY_STEPS,
+        'sensitivity_rows': sensitivity_rows,
     }
     return render(request, 'dashboard/budget_simulator.html', context)
 
@@ -935,9 +1098,17 @@ def budget_simulator_view(request):
 
 
 # 📊 Dashboard Views
-def get_month_bounds():
-    today = date.today()
-    start_date = today.replace(day=1)
+def month_from_query(value):
+    """First day of the month given as YYYY-MM, the current month when missing or invalid."""
+    try:
+        year, month = map(int, value.split('-'))
+        return date(year, month, 1)
+    except (AttributeError, ValueError):
+        return date.today().replace(day=1)
+
+
+def get_month_bounds(month_start=None):
+    start_date = month_start or date.today().replace(day=1)
     next_month = start_date.replace(day=28) + timedelta(days=4)
     end_date = next_month.replace(day=1) - timedelta(days=1)
     return start_date, end_date
@@ -945,7 +1116,7 @@ def get_month_bounds():
 @login_required
 def dashboard(request):
     user = request.user
-    start_date, end_date = get_month_bounds()
+    start_date, end_date = get_month_bounds(month_from_query(request.GET.get('month')))
     group_id = request.GET.get('group')
 
     selected_group = None
@@ -953,40 +1124,69 @@ def dashboard(request):
     total_expected = 0
     total_actual = 0
 
-    groups = Group.objects.filter(user=user, is_deleted=False)
+    groups = Group.objects.for_user(user).alive()
 
-    if group_id:
+    if group_id and group_id.isdigit():
         selected_group = get_object_or_404(groups, pk=group_id)
-        labels = Label.objects.filter(group=selected_group, user=user, is_deleted=False).prefetch_related('expenses')
 
-        total_expected = labels.aggregate(total=Sum('expected_monthly'))['total'] or 0
+        # Actuals from one grouped query, line items from one prefetch limited to the month
+        in_month = Q(expenses__date__range=(start_date, end_date))
+        month_expenses = Expense.objects.filter(date__range=(start_date, end_date)).order_by('date')
+        labels = Label.objects.for_user(user).alive().filter(group=selected_group).annotate(
+            actual=Sum('expenses__amount', filter=in_month, default=0)
+        ).prefetch_related(Prefetch('expenses', queryset=month_expenses, to_attr='month_expenses'))
 
         for label in labels:
-            filtered_expenses = label.expenses.filter(date__range=(start_date, end_date))
-            actual_total = filtered_expenses.aggregate(Sum('amount'))['amount__sum'] or 0
-            total_actual += actual_total
+            total_expected += label.expected_monthly
+            total_actual += label.actual
 
             sublabel_data.append({
                 'label': label,
                 'expected': label.expected_monthly or 0,
-                'actual': actual_total,
-                'expenses': filtered_expenses
+                'actual': label.actual,
+                'expenses': label.month_expenses
             })
 
+    previous_month = (start_date - timedelta(days=1)).replace(day=1)
+    next_month = end_date + timedelta(days=1)
     context = {
         'groups': groups,
         'selected_group': selected_group,
-        'selected_id': int(group_id) if group_id else '',
+        'selected_id': int(group_id) if group_id and group_id.isdigit() else '',
         'sublabel_data': sublabel_data,
         'total_expected': total_expected,
         'total_actual': total_actual,
         'start_date': start_date.isoformat(),
         'end_date': end_date.isoformat(),
+        'month': start_date.strftime('%Y-%m'),
+        'previous_month': previous_month.strftime('%Y-%m'),
+        'next_month': next_month.strftime('%Y-%m'),
     }
 
     return render(request, 'dashboard.html', context)
 
 
+# ⚙️ Job Views (work handed to `manage.py run_workers`)
+@login_required
+@require_POST
+def yearly_report_request(request):
+    year = int(request.POST.get('year', date.today().year))
+    job = enqueue('yearly_report', user=request.user, year=year)
+    return JsonResponse({'id': job.pk, 'status_url': reverse('job_status', args=[job.pk])}, status=202)
+
+
+@login_required
+def job_status_view(request, pk):
+    job = get_object_or_404(Job, pk=pk, user=request.user)
+    return JsonResponse(job_status(job))
+
+
+@login_required
+def job_list(request):
+    jobs = Job.objects.filter(user=request.user)[:20]
+    return JsonResponse({'jobs': [job_status(job) for job in jobs]})
+
+
 # @login_required
 # def monthly_variable_expenses_view(request):
 #     redirect_url = reverse('planning_view') 
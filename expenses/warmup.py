@@ -0,0 +1,55 @@
+# warmup.py
+# 🔥 Precompute the pages a user opens right after logging in (home, dashboard,
+# planning, and their label forecasts) into the cache, in the background. The
+# cached values are keyed on DataStamp, so a warm-up finds them current and
+# skips the work unless data changed. A warm-up only reads: rows that are
+# missing (stamp, plan summary) are left for the request that needs them.
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.conf import settings
+from django.db import connections
+
+from .dashboard import cached_chart_data
+from .forecast import label_forecasts
+from .models import CustomUser, DataStamp, PlanSummary
+from .views import home_totals, planning_data
+
+# At most WARMUP_CONCURRENCY users are warmed at the same time; the rest wait their turn
+executor = ThreadPoolExecutor(max_workers=settings.WARMUP_CONCURRENCY, thread_name_prefix='warmup')
+pending = set()
+pending_lock = threading.Lock()
+
+
+def schedule_warmup(user_id):
+    """Queue a warm-up for the user (after login, or after a bulk import); no-op if one is already queued."""
+    if not settings.WARMUP_ENABLED:
+        return None
+    with pending_lock:
+        if user_id in pending:
+            return None
+        pending.add(user_id)
+    return executor.submit(warm_user, user_id)
+
+
+def warm_user(user_id):
+    try:
+        user = CustomUser.objects.filter(pk=user_id).first()
+        stamp = DataStamp.objects.filter(user_id=user_id).first()
+        # Without a stamp the first request creates one, newer than anything cached now
+        if user is None or stamp is None:
+            return
+        today = date.today()
+
+        # Same keys as the default (unfiltered, current month/year) requests
+        home_totals(user, stamp, (today.replace(day=1), today, None, None))
+        cached_chart_data(user, stamp, today.year)
+        if PlanSummary.objects.filter(user_id=user_id).exists():
+            planning_data(user, stamp)
+        label_forecasts(user, stamp, today)
+    finally:
+        with pending_lock:
+            pending.discard(user_id)
+        # Pool threads are long-lived: do not keep their connections open between warm-ups
+        connections.close_all()
@@ -0,0 +1,194 @@
+// 📊 Yearly dashboard charts
+// Every chart is derived from the single #dashboard-data payload (see expenses/dashboard.py):
+// labels are listed once and spent[label][month] holds the amounts. window.yearlyDashboard.refresh()
+// re-derives every series after the payload has been patched in place, which is what the
+// live updates stream (data-live-url, only set under ASGI, see expenses/live.py) does for each delta.
+(function () {
+  const payload = document.getElementById('dashboard-data');
+  if (!payload || typeof Chart === 'undefined') return;
+
+  const data = JSON.parse(payload.textContent);
+  const PALETTE = [
+    '#f44336', '#2196f3', '#4caf50', '#ff9800', '#9c27b0',
+    '#00bcd4', '#8bc34a', '#e91e63', '#3f51b5', '#ff5722'
+  ];
+  const GROUP_PALETTE = ['#4caf50', '#f44336', '#2196f3', ...PALETTE.slice(3)];
+  const CURRENCY = ' د.م';
+  const sum = values => values.reduce((a, b) => a + b, 0);
+  const round = value => Math.round(value * 100) / 100;
+
+  function series() {
+    const labels = data.labels;
+    const active = labels.name.map((_, i) => i).filter(i => labels.active[i]);
+    const totals = data.spent.map(row => round(sum(row)));
+    const spending = active.filter(i => totals[i] > 0);
+
+    const groupTotals = data.groups.name.map(() => 0);
+    totals.forEach((total, i) => {
+      if (labels.group[i] !== null) groupTotals[labels.group[i]] += total;
+    });
+    const groups = data.groups.name.map((_, g) => g).filter(g => groupTotals[g] > 0);
+
+    const monthlyExpense = data.months.map((_, m) =>
+      round(sum(data.spent.filter((_, i) => labels.kind[i]).map(row => row[m])))
+    );
+
+    return {
+      spending: {
+        labels: spending.map(i => labels.name[i]),
+        values: spending.map(i => totals[i])
+      },
+      groups: {
+        labels: groups.map(g => data.groups.name[g]),
+        values: groups.map(g => round(groupTotals[g]))
+      },
+      budget: {
+        labels: active.map(i => labels.name[i]),
+        actual: active.map(i => totals[i]),
+        expected: active.map(i => labels.expected[i])
+      },
+      income: data.income,
+      expense: monthlyExpense,
+      savings: data.savings === null ? data.months.map(() => 0) : data.spent[data.savings]
+    };
+  }
+
+  const currencyTooltip = prefix => ({
+    callbacks: { label: context => `${prefix(context)}: ${context.parsed}${CURRENCY}` }
+  });
+
+  function build() {
+    const s = series();
+    const charts = {};
+    const canvas = id => document.getElementById(id);
+
+    charts.groups = new Chart(canvas('groupDonutChart'), {
+      type: 'doughnut',
+      data: {
+        labels: s.groups.labels,
+        datasets: [{ data: s.groups.values, backgroundColor: GROUP_PALETTE, borderWidth: 1 }]
+      },
+      options: {
+        responsive: true,
+        plugins: {
+          legend: { position: 'bottom', labels: { font: { size: 12 } } },
+          tooltip: currencyTooltip(context => context.label)
+        }
+      }
+    });
+
+    charts.pie = new Chart(canvas('pieChart'), {
+      type: 'pie',
+      data: {
+        labels: s.spending.labels,
+        datasets: [{ data: s.spending.values, backgroundColor: PALETTE.slice(0, 5) }]
+      }
+    });
+
+    charts.line = new Chart(canvas('lineChart'), {
+      type: 'line',
+      data: {
+        labels: data.months,
+        datasets: [
+          { label: 'الدخل', data: s.income, borderColor: '#4caf50', fill: false },
+          { label: 'المصاريف', data: s.expense, borderColor: '#f44336', fill: false }
+        ]
+      }
+    });
+
+    charts.bar = new Chart(canvas('barChart'), {
+      type: 'bar',
+      data: {
+        labels: s.budget.labels,
+        datasets: [
+          { label: 'الفعلي', data: s.budget.actual, backgroundColor: '#2196f3' },
+          { label: 'المتوقع', data: s.budget.expected, backgroundColor: '#9c27b0' }
+        ]
+      }
+    });
+
+    charts.heatmap = new Chart(canvas('heatmapChart'), {
+      type: 'bar',
+      data: {
+        labels: data.months,
+        datasets: [{ label: 'شدة الإنفاق', data: s.expense, backgroundColor: '#ff9800' }]
+      }
+    });
+
+    charts.savings = new Chart(canvas('savingsChart'), {
+      type: 'line',
+      data: {
+        labels: data.months,
+        datasets: [{
+          label: 'الادخار',
+          data: s.savings,
+          borderColor: '#4caf50',
+          backgroundColor: 'rgba(76, 175, 80, 0.2)',
+          fill: true,
+          tension: 0.3
+        }]
+      },
+      options: {
+        responsive: true,
+        plugins: {
+          legend: { display: false },
+          tooltip: currencyTooltip(() => 'ادخار')
+        },
+        scales: {
+          y: { beginAtZero: true, ticks: { callback: value => value + CURRENCY } }
+        }
+      }
+    });
+    return charts;
+  }
+
+  const charts = build();
+
+  function refresh() {
+    const s = series();
+    const set = (chart, labels, ...datasets) => {
+      if (labels) chart.data.labels = labels;
+      datasets.forEach((values, n) => { chart.data.datasets[n].data = values; });
+      chart.update();
+    };
+    set(charts.groups, s.groups.labels, s.groups.values);
+    set(charts.pie, s.spending.labels, s.spending.values);
+    set(charts.line, null, s.income, s.expense);
+    set(charts.bar, s.budget.labels, s.budget.actual, s.budget.expected);
+    set(charts.heatmap, null, s.expense);
+    set(charts.savings, null, s.savings);
+  }
+
+  // 📡 Deltas pushed after Expense/Income writes: {type, year, month, amount[, label, ...]}
+  function apply(event) {
+    if (event.year !== data.year) return;
+    const m = event.month - 1;
+    if (event.type === 'income') {
+      data.income[m] = round(data.income[m] + event.amount);
+      return;
+    }
+    let i = data.labels.id.indexOf(event.label);
+    if (i === -1) {
+      if (event.name === undefined) return;
+      const group = data.groups.id.indexOf(event.group);
+      i = data.labels.id.push(event.label) - 1;
+      data.labels.name.push(event.name);
+      data.labels.group.push(group === -1 ? null : group);
+      data.labels.expected.push(event.expected);
+      data.labels.active.push(1);
+      data.labels.kind.push(event.kind);
+      data.spent.push(data.months.map(() => 0));
+    }
+    data.spent[i][m] = round(data.spent[i][m] + event.amount);
+  }
+
+  const liveUrl = document.getElementById('dashboard-charts')?.dataset.liveUrl;
+  if (liveUrl && window.EventSource) {
+    new EventSource(liveUrl).onmessage = message => {
+      JSON.parse(message.data).forEach(apply);
+      refresh();
+    };
+  }
+
+  window.yearlyDashboard = { data, charts, refresh };
+})();
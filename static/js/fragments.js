@@ -0,0 +1,49 @@
+// 🧩 Partial-page updates
+// Forms and links marked with data-fragment fetch only the changed regions of the page
+// (the server answers X-Fragment requests with a partial) and swap them in by id.
+(function () {
+  function openPanels(root) {
+    return Array.from(root.querySelectorAll('.accordion-collapse.show[id]')).map(el => el.id);
+  }
+
+  function swap(html) {
+    const doc = new DOMParser().parseFromString(html, 'text/html');
+    doc.body.querySelectorAll(':scope > [id]').forEach(fresh => {
+      const current = document.getElementById(fresh.id);
+      if (!current) return;
+      const open = openPanels(current);
+      current.replaceWith(fresh);
+      open.forEach(id => {
+        const panel = document.getElementById(id);
+        if (panel) panel.classList.add('show');
+      });
+    });
+  }
+
+  function load(url, pushUrl) {
+    return fetch(url, { headers: { 'X-Fragment': '1' }, credentials: 'same-origin' })
+      .then(response => {
+        if (!response.ok) throw new Error(response.status);
+        return response.text();
+      })
+      .then(html => {
+        swap(html);
+        if (pushUrl) history.replaceState(null, '', pushUrl);
+      });
+  }
+
+  document.addEventListener('submit', event => {
+    const form = event.target.closest('form[data-fragment]');
+    if (!form || form.method.toLowerCase() !== 'get') return;
+    event.preventDefault();
+    const url = (form.getAttribute('action') || window.location.pathname) + '?' + new URLSearchParams(new FormData(form));
+    load(url, url).catch(() => form.submit());
+  });
+
+  document.addEventListener('click', event => {
+    const link = event.target.closest('a[data-fragment]');
+    if (!link) return;
+    event.preventDefault();
+    load(link.href).catch(() => { window.location = link.href; });
+  });
+})();
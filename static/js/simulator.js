@@ -0,0 +1,32 @@
+// 🧪 Budget simulator curves, drawn from the #simulator-data payload (see expenses/simulator.py):
+// row 0 of balance/savings is the current habits, row 1 the simulated scenario.
+(function () {
+  const payload = document.getElementById('simulator-data');
+  if (!payload || typeof Chart === 'undefined') return;
+
+  const data = JSON.parse(payload.textContent);
+  const CURRENCY = ' د.م';
+  const NAMES = ['الوضع الحالي', 'السيناريو'];
+  const COLORS = ['#9e9e9e', '#2196f3'];
+
+  function curves(canvasId, rows) {
+    new Chart(document.getElementById(canvasId), {
+      type: 'line',
+      data: {
+        labels: data.months,
+        datasets: rows.map((values, i) => ({
+          label: NAMES[i], data: values, borderColor: COLORS[i], pointRadius: 0, fill: false
+        }))
+      },
+      options: {
+        responsive: true,
+        plugins: {
+          tooltip: { callbacks: { label: context => `${context.dataset.label}: ${context.parsed.y}${CURRENCY}` } }
+        }
+      }
+    });
+  }
+
+  curves('balanceChart', data.balance);
+  curves('savingsChart', data.savings);
+})();